@@ -2,13 +2,20 @@
 
 解耦设计：
 - logic.py: 游戏逻辑
-- ai.py: AI引擎（Minimax + Alpha-Beta）
+- move.py: 整数走法编码
+- bitboard.py: 位棋盘攻击表
+- zobrist.py: Zobrist 哈希键
+- pst.py: 子力位置表（中局/残局）
+- ai.py: AI引擎（迭代加深 Alpha-Beta + 置换表）
+- book.py / polyglot.py: Polyglot 开局库
+- perft.py: 走法生成的 perft 测试与基准
+- tablebase.py: 残局库（逆向分析生成 + 内存映射查询）
+- uci.py: UCI 协议前端（python -m games.chess.uci）
 - ui.py: GTK/Adwaita UI
 """
 
 from .logic import ChessLogic, Player, GameState
 from .ai import ChessAI
-from .ui import ChessUI, GameMode
 
 
 class Chess:
@@ -17,6 +24,7 @@ class Chess:
     def __init__(self, score_manager):
         self.score_manager = score_manager
         self.logic = ChessLogic()
+        from .ui import ChessUI
         self.ui = ChessUI(self.logic, on_game_over=self._on_game_over)
 
     def get_widget(self):
@@ -26,7 +34,7 @@ class Chess:
         self.ui.reset()
 
     def stop(self):
-        pass
+        self.ui.stop()
 
     def _on_game_over(self):
         winner = self.logic.get_winner()
@@ -34,4 +42,12 @@ class Chess:
             self.score_manager.record_score("chess", self.logic.move_count)
 
 
+def __getattr__(name):
+    # UI 依赖 GTK，按需导入，使 logic/ai/perft 等可以在无界面环境中使用
+    if name in ('ChessUI', 'GameMode'):
+        from . import ui
+        return getattr(ui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ['Chess', 'ChessLogic', 'ChessAI', 'Player', 'GameState', 'GameMode']
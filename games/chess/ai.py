@@ -1,24 +1,132 @@
 """国际象棋AI模块"""
 
+import multiprocessing
+import os
 import random
-from typing import Optional, Tuple, List
+import time
+from typing import Optional, Tuple, List, Callable
 from .logic import ChessLogic, Player, GameState
+from .book import OpeningBook
+from .tablebase import Tablebase, DEFAULT_DIRECTORY as DEFAULT_TABLEBASE_PATH, WIN, LOSS
+from .move import PROMOTION_QUEEN, PROMOTION_PIECES, FLAG_CAPTURE, FLAG_EN_PASSANT, move_to_tuple
+from ..search import TranspositionTable, MoveOrderer, sort_by_scores, EXACT, LOWER, UPPER
+
+
+MATE_SCORE = 100000
+MAX_DEPTH = 64
+# 距根节点的最大层数：静态搜索中连续将军的应将可能无限延续，超过后直接返回静态评估
+MAX_PLY = 128
+INFINITY = MATE_SCORE + 1
+# 超过这个分数的是将杀分（MATE_SCORE - 距根节点的层数）
+MATE_BOUND = MATE_SCORE - 1000
+# 静态搜索的 delta 剪枝余量：即使吃到目标子再加上这个余量也追不上 alpha 的吃子不再搜索
+DELTA_MARGIN = 200
+# 空着裁剪：剩余深度至少为 NULL_MIN_DEPTH 时尝试，空着后少搜 NULL_REDUCTION 层
+NULL_MIN_DEPTH = 3
+NULL_REDUCTION = 2
+# 后期走法削减（LMR）：排序在 LMR_MIN_INDEX 之后的安静走法先用较浅的深度试探
+LMR_MIN_DEPTH = 3
+LMR_MIN_INDEX = 3
+# 并行根节点拆分的最小深度：更浅的搜索进程间通信开销大于收益
+PARALLEL_MIN_DEPTH = 4
+# 吃子或升变（排序和杀手走法中与"安静"走法区分）
+_NOISY = FLAG_CAPTURE | (7 << 12)
+# 默认开局库位置（文件不存在时不使用开局库）
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
 
 
 class ChessAI:
-    """国际象棋AI - Minimax + Alpha-Beta"""
+    """国际象棋AI - 迭代加深负极大值搜索（PVS + 空着裁剪 + LMR） + 置换表 + 静态搜索"""
 
-    def __init__(self, difficulty: int = 2):
+    def __init__(self, difficulty: int = 2, workers: Optional[int] = None,
+                 book_path: Optional[str] = DEFAULT_BOOK_PATH, book_depth: int = 16,
+                 tablebase_path: Optional[str] = DEFAULT_TABLEBASE_PATH):
+        """
+        Args:
+            difficulty: 难度（1 简单、2 中等、3 困难、4 专家）
+            workers: 并行搜索的进程数；为 None 时单进程搜索（并行搜索的加速比尚未在
+                多核机器上测得，需要时显式指定，可先用 perft --bench-parallel 测量）
+            book_path: Polyglot 开局库文件，为 None 或文件不存在时不使用开局库
+            book_depth: 只在前多少个半回合内查询开局库
+            tablebase_path: 残局库目录，为 None 或其中没有残局文件时不使用残局库
+        """
         self.difficulty = difficulty
-        self._depth_map = {1: 1, 2: 2, 3: 3}
+        self.workers = workers
+        self.book_path = book_path
+        self.book_depth = book_depth
+        self._book: Optional[OpeningBook] = None
+        self._book_loaded = False
+        self.tablebase_path = tablebase_path
+        self._tablebase: Optional[Tablebase] = None
+        self._tablebase_loaded = False
+        # 难度对应的最大搜索深度和默认思考时间（毫秒）
+        self._depth_map = {1: 1, 2: 2, 3: MAX_DEPTH, 4: MAX_DEPTH}
+        self._time_map = {1: 0, 2: 1000, 3: 2000, 4: 5000}
+        # 置换表在多次走棋之间保留
+        self.tt = TranspositionTable()
+        self.orderer = MoveOrderer()
+        self.nodes = 0
+        self.completed_depth = 0
+        self._deadline = float('inf')
+        self._stopped = False
+        # 外部停止请求（例如工作进程中的取消），返回 True 时尽快结束搜索
+        self.stop_check: Optional[Callable[[], bool]] = None
+        # 每完成一轮迭代加深后调用：(深度, 分数, 节点数, 用时（秒）, 主要变例)
+        self.on_iteration: Optional[Callable[[int, int, int, float, List[int]], None]] = None
+        self._pool = None
+        self._pool_size = 0
+        self._pool_abort = None
+        # 并行搜索中各进程共享的根节点 alpha（已证明的最好分数）
+        self._pool_alpha = None
+        self._search_id = 0
 
     @property
     def search_depth(self) -> int:
         return self._depth_map.get(self.difficulty, 2)
 
-    def get_best_move(self, game: ChessLogic) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
-        """获取最佳移动"""
-        moves = game.get_all_moves()
+    @property
+    def time_budget_ms(self) -> int:
+        return self._time_map.get(self.difficulty, 1000)
+
+    @property
+    def worker_count(self) -> int:
+        """实际使用的搜索进程数"""
+        return max(1, self.workers) if self.workers is not None else 1
+
+    def get_best_move(self, game: ChessLogic,
+                      time_budget_ms: Optional[int] = None) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """获取最佳移动
+
+        从深度 1 开始迭代加深，直到达到难度的最大深度或用完时间预算，
+        返回最后一轮完成的搜索结果。每一轮都先搜索上一轮的最佳走法，
+        更深层则由置换表中记录的主要变例（PV）走法引导排序。
+
+        Args:
+            game: 游戏状态（搜索过程中会被临时修改，结束后复原）
+            time_budget_ms: 思考时间预算（毫秒），为 None 时使用难度的默认值
+        """
+        # 返回值只能表示升变为后，根节点不考虑其他升变
+        moves = [move for move in game.generate_moves()
+                 if (move >> 12) & 7 in (0, PROMOTION_QUEEN)]
+        move = self._select_move(game, moves, time_budget_ms, self.search_depth)
+        return move_to_tuple(move) if move is not None else None
+
+    def search(self, game: ChessLogic, time_budget_ms: Optional[float] = None,
+               max_depth: int = MAX_DEPTH) -> Optional[int]:
+        """搜索最佳走法，返回整数编码（包括升变为后以外的走法），供 UCI 等外部接口使用
+
+        Args:
+            time_budget_ms: 思考时间预算（毫秒），为 None 时使用难度的默认值
+            max_depth: 最大搜索深度
+        """
+        return self._select_move(game, game.generate_moves(), time_budget_ms, max_depth)
+
+    def _select_move(self, game: ChessLogic, moves: List[int], time_budget_ms: Optional[float],
+                     max_depth: int) -> Optional[int]:
+        """依次尝试随机（难度1）、唯一走法、开局库、残局库，最后迭代加深搜索"""
+        # 不经过搜索的走法节点数为 0，避免沿用上一次搜索的统计
+        self.nodes = 0
+        self.completed_depth = 0
         if not moves:
             return None
 
@@ -26,96 +134,547 @@ class ChessAI:
         if self.difficulty == 1:
             return random.choice(moves)
 
-        is_maximizing = game.current_player == Player.WHITE
+        if len(moves) == 1:
+            return moves[0]
+
+        book_move = self._probe_book(game)
+        if book_move is not None:
+            (from_row, from_col), (to_row, to_col) = book_move
+            return game.find_move(from_row, from_col, to_row, to_col)
+
+        # 残局库中的局面直接按距将杀的步数走，不需要搜索
+        tablebase_move = self._probe_tablebase(game, moves)
+        if tablebase_move is not None:
+            return tablebase_move
+
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        start = time.perf_counter()
+        self._deadline = start + time_budget_ms / 1000
+        self._stopped = False
+        self.tt.new_search()
+        self.orderer.new_search()
+        self._search_id += 1
+        parallel = self.worker_count > 1
+
         best_move = None
-        best_score = float('-inf') if is_maximizing else float('inf')
+        for depth in range(1, max_depth + 1):
+            if parallel and depth >= PARALLEL_MIN_DEPTH:
+                move, score = self._search_root_parallel(game, moves, depth, best_move)
+            else:
+                move, score = self._search_root(game, moves, depth, best_move)
+            if move is not None:
+                best_move = move
+            if self._stopped:
+                break
+            self.completed_depth = depth
+            if self.on_iteration is not None:
+                self.on_iteration(depth, score, self.nodes, time.perf_counter() - start,
+                                  self.principal_variation(game, depth))
+            # 已找到将杀，不必继续加深
+            if abs(score) >= MATE_BOUND:
+                break
 
-        # 移动排序
-        moves = self._order_moves(game, moves)
+        return best_move if best_move is not None else moves[0]
 
-        for (from_pos, to_pos) in moves:
-            captured = self._make_move_fast(game, from_pos, to_pos)
+    def principal_variation(self, game: ChessLogic, max_length: int) -> List[int]:
+        """沿置换表中记录的最佳走法得到主要变例（遇到非法走法或重复局面时截断）"""
+        pv = []
+        seen = set()
+        while len(pv) < max_length and game.hash not in seen:
+            seen.add(game.hash)
+            move = self.tt.get_move(game.hash)
+            if move is None or move not in game.generate_moves():
+                break
+            pv.append(move)
+            game.push(move)
+        for _move in pv:
+            game.pop()
+        return pv
 
-            score = self._minimax(
-                game,
-                self.search_depth - 1,
-                float('-inf'),
-                float('inf'),
-                not is_maximizing
-            )
+    def predict_move(self, game: ChessLogic) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """猜测走棋方的走法（后台思考时用来预测对手的应着）
 
-            self._undo_move_fast(game, from_pos, to_pos, captured)
+        上一次搜索的主要变例中通常已经有这个局面的最佳走法，直接从置换表
+        中取出；没有时用十分之一的时间预算搜索一次。
+        """
+        move = self.tt.get_move(game.hash)
+        if move is not None and move in game.generate_moves():
+            return move_to_tuple(move)
+        return self.get_best_move(game, self.time_budget_ms // 10)
 
-            if is_maximizing:
-                if score > best_score:
-                    best_score = score
-                    best_move = (from_pos, to_pos)
-            else:
-                if score < best_score:
-                    best_score = score
-                    best_move = (from_pos, to_pos)
+    def _probe_book(self, game: ChessLogic) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """查询开局库（首次使用时打开），不在库中时返回 None"""
+        if game.move_count >= self.book_depth or self.book_path is None:
+            return None
+        if not self._book_loaded:
+            self._book_loaded = True
+            if os.path.exists(self.book_path):
+                try:
+                    self._book = OpeningBook(self.book_path)
+                except OSError:
+                    self._book = None
+        if self._book is None:
+            return None
+        return self._book.choose(game)
+
+    def _get_tablebase(self) -> Optional[Tablebase]:
+        """打开残局库（首次使用时），目录中没有残局文件时返回 None"""
+        if not self._tablebase_loaded:
+            self._tablebase_loaded = True
+            if self.tablebase_path is not None:
+                tablebase = Tablebase(self.tablebase_path)
+                self._tablebase = tablebase if tablebase.max_pieces else None
+        return self._tablebase
+
+    def _probe_tablebase(self, game: ChessLogic, moves: List[int]) -> Optional[int]:
+        """按残局库选择走法：能胜时最快将杀，不能胜时保持和棋，必败时尽量拖延
 
+        局面或任何一个走法之后的局面不在残局库中时返回 None。
+        """
+        tablebase = self._get_tablebase()
+        if tablebase is None or tablebase.probe(game) is None:
+            return None
+        best_move = None
+        best_key = None
+        for move in moves:
+            game.push(move)
+            result = tablebase.probe(game)
+            game.pop()
+            if result is None:
+                return None
+            outcome, dtm = result
+            # result 是对方的结果：对方必败时越快越好，对方必胜时越慢越好
+            key = (-outcome, -dtm if outcome == LOSS else dtm)
+            if best_key is None or key > best_key:
+                best_key = key
+                best_move = move
         return best_move
 
-    def _minimax(self, game: ChessLogic, depth: int, alpha: float,
-                 beta: float, is_maximizing: bool) -> int:
-        """Minimax + Alpha-Beta"""
-        if depth == 0:
-            return game.evaluate()
+    def _search_root(self, game: ChessLogic, moves: List[int], depth: int,
+                     pv_move=None) -> Tuple[Optional[int], int]:
+        """搜索根节点，返回 (最佳走法, 走棋方视角的分数)
 
-        moves = game.get_all_moves()
-        if not moves:
-            if game.is_in_check(game.current_player):
-                return -100000 if is_maximizing else 100000
+        时间用完时返回本轮已完整搜索过的走法中最好的一个。
+        """
+        best_move = None
+        best_score = -INFINITY
+        alpha, beta = -INFINITY, INFINITY
+
+        # 移动排序：上一轮的最佳走法最先搜索
+        moves = self._order_moves(game, moves, 0, pv_move or self.tt.get_move(game.hash))
+
+        for index, move in enumerate(moves):
+            game.push(move)
+            if index == 0:
+                score = -self._negamax(game, depth - 1, 1, -beta, -alpha)
+            else:
+                # PVS：先用零窗口证明该走法不比当前最佳好，失败再用完整窗口重搜
+                score = -self._negamax(game, depth - 1, 1, -alpha - 1, -alpha)
+                if score > alpha and not self._stopped:
+                    score = -self._negamax(game, depth - 1, 1, -beta, -alpha)
+            game.pop()
+
+            if self._stopped:
+                break
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                alpha = max(alpha, score)
+
+        if not self._stopped:
+            self.tt.store(game.hash, depth, EXACT, best_score, best_move)
+        return best_move, best_score
+
+    def _search_root_parallel(self, game: ChessLogic, moves: List[int], depth: int,
+                              pv_move=None) -> Tuple[Optional[int], int]:
+        """根节点拆分的并行搜索，返回 (最佳走法, 走棋方视角的分数)
+
+        先在本进程中用完整窗口搜索排在最前的走法，其分数作为共享的 alpha；
+        其余走法以快照的形式分发给进程池。工作进程开始搜索时读取当前的
+        alpha，先用零窗口证明走法不比它好，失败再用 (alpha, +∞) 的窗口重搜，
+        得到的更好分数立即写回共享的 alpha，后面的走法都用更紧的界。
+        每个走法都附带本进程置换表中沿最佳走法的表项，工作进程的搜索
+        从上一轮的主要变例开始；工作进程搜索结束后把同样的表项带回来。
+        """
+        moves = self._order_moves(game, moves, 0, pv_move or self.tt.get_move(game.hash))
+
+        first = moves[0]
+        game.push(first)
+        best_score = -self._negamax(game, depth - 1, 1, -INFINITY, INFINITY)
+        game.pop()
+        if self._stopped:
+            return None, 0
+        best_move = first
+
+        pool = self._get_pool()
+        self._pool_abort.value = 0
+        self._pool_alpha.value = best_score
+        snapshot = game.snapshot()
+        time_left = self._deadline - time.perf_counter()
+        pending = []
+        for move in moves[1:]:
+            game.push(move)
+            entries = self._tt_line(game, depth)
+            game.pop()
+            pending.append(pool.apply_async(
+                _pool_search_move, (self._search_id, snapshot, move, depth, entries, time_left)))
+
+        # 等待结果期间检查时间和外部停止请求，停止时通知所有工作进程
+        for result in pending:
+            while not result.ready():
+                result.wait(0.01)
+                if not self._stopped:
+                    self._poll_stop()
+                    if self._stopped:
+                        self._pool_abort.value = 1
+
+        for result in pending:
+            move, score, exact, nodes, stopped, entries = result.get()
+            self.nodes += nodes
+            for key, entry_depth, bound, entry_score, entry_move, _gen in entries:
+                self.tt.store(key, entry_depth, bound, entry_score, entry_move)
+            if stopped:
+                self._stopped = True
+                continue
+            # 上界（没有超过 alpha）的分数即使与当前最佳相等也不能采用
+            if exact and score > best_score:
+                best_score = score
+                best_move = move
+
+        if not self._stopped:
+            self.tt.store(game.hash, depth, EXACT, best_score, best_move)
+        return best_move, best_score
+
+    def _tt_line(self, game: ChessLogic, max_length: int) -> List[tuple]:
+        """沿置换表中的最佳走法收集表项（用于在并行搜索的进程之间传递）"""
+        entries = []
+        pushed = 0
+        while len(entries) < max_length:
+            entry = self.tt.probe(game.hash)
+            if entry is None:
+                break
+            entries.append(entry)
+            move = entry[4]
+            if move is None or move not in game.generate_moves():
+                break
+            game.push(move)
+            pushed += 1
+        for _ in range(pushed):
+            game.pop()
+        return entries
+
+    def _get_pool(self):
+        """按需创建（或按进程数重建）搜索进程池"""
+        size = self.worker_count
+        if self._pool is not None and self._pool_size != size:
+            self.close()
+        if self._pool is None:
+            ctx = multiprocessing.get_context('spawn')
+            self._pool_abort = ctx.Value('b', 0, lock=False)
+            self._pool_alpha = ctx.Value('i', 0)
+            self._pool = ctx.Pool(size, initializer=_pool_init,
+                                  initargs=(self._pool_abort, self._pool_alpha))
+            self._pool_size = size
+        return self._pool
+
+    def close(self):
+        """关闭并行搜索的进程池、开局库和残局库"""
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+            self._book_loaded = False
+        if self._tablebase is not None:
+            self._tablebase.close()
+            self._tablebase = None
+            self._tablebase_loaded = False
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def _poll_stop(self):
+        """检查时间预算和外部停止请求"""
+        if time.perf_counter() >= self._deadline or (self.stop_check and self.stop_check()):
+            self._stopped = True
+
+    def _negamax(self, game: ChessLogic, depth: int, ply: int, alpha: int, beta: int,
+                 allow_null: bool = True) -> int:
+        """负极大值搜索 + Alpha-Beta（分数以走棋方视角）
+
+        第一个走法用完整窗口搜索，其余走法用零窗口（PVS）；不被将军且有子力时
+        先尝试空着裁剪；排序靠后的安静走法先少搜一层（LMR），试探结果超过
+        alpha 时再按原深度重搜。
+        """
+        self.nodes += 1
+        if not self.nodes & 127:
+            self._poll_stop()
+        if self._stopped:
             return 0
+        # 重复局面和五十步规则：按和棋处理，不再展开
+        if game.is_repetition() or game.halfmove_clock >= 100:
+            return 0
+        # 残局库命中：直接得到精确的将杀距离
+        if self._tablebase is not None:
+            result = self._tablebase.probe(game)
+            if result is not None:
+                outcome, dtm = result
+                if outcome == WIN:
+                    return MATE_SCORE - ply - dtm
+                if outcome == LOSS:
+                    return -MATE_SCORE + ply + dtm
+                return 0
+
+        pv_node = beta - alpha > 1
+        key = game.hash
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            _key, entry_depth, bound, score, tt_move, _gen = entry
+            if entry_depth >= depth and not pv_node:
+                score = _score_from_tt(score, ply)
+                if bound == EXACT:
+                    return score
+                if bound == LOWER and score >= beta:
+                    return score
+                if bound == UPPER and score <= alpha:
+                    return score
+
+        in_check = game.is_in_check(game.current_player)
+        if in_check:
+            depth += 1  # 将军延伸
+        if depth <= 0:
+            return self._quiescence(game, alpha, beta, ply)
+
+        # 空着裁剪：让对方连走两步仍然 >= beta，说明这个局面几乎必然会被剪掉。
+        # 只剩兵和王时容易出现"被迫走棋反而吃亏"（zugzwang），不做空着。
+        if (allow_null and not pv_node and not in_check and depth >= NULL_MIN_DEPTH and
+                self._has_pieces(game) and self._static_eval(game) >= beta):
+            reduction = NULL_REDUCTION + (1 if depth >= 6 else 0)
+            game.push_null()
+            score = -self._negamax(game, depth - 1 - reduction, ply + 1, -beta, -beta + 1, False)
+            game.pop_null()
+            if self._stopped:
+                return 0
+            if score >= beta:
+                # 空着得到的将杀分不可信
+                return beta if score >= MATE_BOUND else score
+
+        moves = game.generate_moves()
+        if not moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        moves = self._order_moves(game, moves, ply, tt_move)
+        killers = self.orderer.killers[ply] if ply < self.orderer.max_ply else ()
+        alpha_orig = alpha
+        best_score = -INFINITY
+        best_move = None
 
-        if is_maximizing:
-            max_eval = float('-inf')
-            for (from_pos, to_pos) in moves:
-                captured = self._make_move_fast(game, from_pos, to_pos)
-                eval_score = self._minimax(game, depth - 1, alpha, beta, False)
-                self._undo_move_fast(game, from_pos, to_pos, captured)
-
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            return max_eval
+        for index, move in enumerate(moves):
+            game.push(move)
+            if index == 0:
+                score = -self._negamax(game, depth - 1, ply + 1, -beta, -alpha)
+            else:
+                reduction = 0
+                if (depth >= LMR_MIN_DEPTH and index >= LMR_MIN_INDEX and not in_check and
+                        not move & _NOISY and move not in killers and
+                        not game.is_in_check(game.current_player)):
+                    reduction = 1 if index < 8 else 2
+                score = -self._negamax(game, depth - 1 - reduction, ply + 1, -alpha - 1, -alpha)
+                if score > alpha and reduction:
+                    score = -self._negamax(game, depth - 1, ply + 1, -alpha - 1, -alpha)
+                if alpha < score < beta:
+                    score = -self._negamax(game, depth - 1, ply + 1, -beta, -alpha)
+            game.pop()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not move & _NOISY:
+                            self.orderer.record_cutoff(move, ply, depth)
+                        break
+
+        if best_score <= alpha_orig:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
         else:
-            min_eval = float('inf')
-            for (from_pos, to_pos) in moves:
-                captured = self._make_move_fast(game, from_pos, to_pos)
-                eval_score = self._minimax(game, depth - 1, alpha, beta, True)
-                self._undo_move_fast(game, from_pos, to_pos, captured)
-
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            return min_eval
-
-    def _order_moves(self, game: ChessLogic, moves: List) -> List:
-        """移动排序"""
-        def score_move(move):
-            to_pos = move[1]
-            target = game.board[to_pos[0]][to_pos[1]]
-            if target:
-                return game.PIECE_VALUES.get(target, 0)
+            bound = EXACT
+        self.tt.store(key, depth, bound, _score_to_tt(best_score, ply), best_move)
+        return best_score
+
+    def _quiescence(self, game: ChessLogic, alpha: int, beta: int, ply: int) -> int:
+        """静态搜索：只搜索吃子和升变，直到局面平静
+
+        不被将军时，走棋方可以选择不吃子而接受静态评估（stand pat），
+        因此静态评估本身就是一个界；被将军时必须搜索所有应将走法。
+        """
+        self.nodes += 1
+        if not self.nodes & 127:
+            self._poll_stop()
+        if self._stopped:
             return 0
-        return sorted(moves, key=score_move, reverse=True)
-
-    def _make_move_fast(self, game: ChessLogic, from_pos, to_pos):
-        """快速移动"""
-        piece = game.board[from_pos[0]][from_pos[1]]
-        captured = game.board[to_pos[0]][to_pos[1]]
-        game.board[to_pos[0]][to_pos[1]] = piece
-        game.board[from_pos[0]][from_pos[1]] = None
-        game.current_player = game.current_player.opposite()
-        return captured
-
-    def _undo_move_fast(self, game: ChessLogic, from_pos, to_pos, captured):
-        """撤销移动"""
-        piece = game.board[to_pos[0]][to_pos[1]]
-        game.board[from_pos[0]][from_pos[1]] = piece
-        game.board[to_pos[0]][to_pos[1]] = captured
-        game.current_player = game.current_player.opposite()
+        if ply >= MAX_PLY:
+            return self._static_eval(game)
+
+        if game.is_in_check(game.current_player):
+            # 应将包括安静走法，互相将军可能回到重复局面
+            if game.is_repetition():
+                return 0
+            moves = game.generate_moves()
+            if not moves:
+                return -MATE_SCORE + ply
+            stand_pat = None
+            best_score = -INFINITY
+        else:
+            stand_pat = self._static_eval(game)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = game.generate_moves(captures_only=True)
+            if not moves:
+                return stand_pat
+            best_score = stand_pat
+
+        for move in sort_by_scores(moves, self._capture_scores(game, moves)):
+            # delta 剪枝：吃到的子加上余量仍然无法改善局面
+            if stand_pat is not None and stand_pat + self._capture_gain(game, move) + DELTA_MARGIN <= alpha:
+                continue
+
+            game.push(move)
+            score = -self._quiescence(game, -beta, -alpha, ply + 1)
+            game.pop()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return best_score
+
+    @staticmethod
+    def _static_eval(game: ChessLogic) -> int:
+        """走棋方视角的静态评估"""
+        score = game.evaluate()
+        return score if game.current_player == Player.WHITE else -score
+
+    @staticmethod
+    def _has_pieces(game: ChessLogic) -> bool:
+        """走棋方是否还有兵以外的子力（马、象、车、后）"""
+        bitboards = game.bitboards
+        if game.current_player == Player.WHITE:
+            return bool(bitboards['N'] | bitboards['B'] | bitboards['R'] | bitboards['Q'])
+        return bool(bitboards['n'] | bitboards['b'] | bitboards['r'] | bitboards['q'])
+
+    def _capture_gain(self, game: ChessLogic, move: int) -> int:
+        """吃子/升变能带来的最大子力收益"""
+        values = game.PIECE_VALUES
+        if move & FLAG_EN_PASSANT:
+            gain = values['P']
+        elif move & FLAG_CAPTURE:
+            to_sq = (move >> 6) & 63
+            gain = values[game.board[to_sq >> 3][to_sq & 7]]
+        else:
+            gain = 0
+        promotion = (move >> 12) & 7
+        if promotion:
+            gain += values[PROMOTION_PIECES[promotion]] - values['P']
+        return gain
+
+    def _capture_scores(self, game: ChessLogic, moves: List[int]) -> List[int]:
+        """MVV-LVA 分数：先吃价值最高的子，同等情况下用价值最低的子去吃；非吃子为 0"""
+        board = game.board
+        values = game.PIECE_VALUES
+        scores = []
+        for move in moves:
+            if move & _NOISY:
+                from_sq = move & 63
+                piece = board[from_sq >> 3][from_sq & 7]
+                scores.append(self._capture_gain(game, move) * 10 - values[piece] // 100)
+            else:
+                scores.append(0)
+        return scores
+
+    def _order_moves(self, game: ChessLogic, moves: List, ply: int, tt_move=None) -> List:
+        """移动排序：置换表走法 > 吃子（MVV-LVA） > 杀手走法 > 历史启发"""
+        return self.orderer.order(moves, ply, tt_move, self._capture_scores(game, moves))
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """将杀分存入置换表时改为相对当前节点的距离，使其与到达该局面的路径无关"""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    """从置换表取出的将杀分换算回相对根节点的距离"""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+# 并行搜索工作进程中的 AI 实例（每个进程一个，置换表在多次走棋之间保留）
+_pool_ai: Optional[ChessAI] = None
+_pool_alpha = None
+
+
+def _pool_init(abort, alpha):
+    """进程池初始化：创建本进程的 AI，停止请求来自共享的 abort 标志"""
+    global _pool_ai, _pool_alpha
+    _pool_ai = ChessAI(workers=1, book_path=None)
+    _pool_ai.stop_check = lambda: bool(abort.value)
+    _pool_ai._get_tablebase()
+    _pool_alpha = alpha
+
+
+def _pool_search_move(search_id: int, snapshot, move: int, depth: int, entries: List[tuple],
+                      time_left: float):
+    """在工作进程中搜索一个根节点走法
+
+    Returns:
+        (走法, 分数, 分数是否精确, 节点数, 是否被中断, 走法之后沿最佳走法的置换表表项)；
+        分数不超过 alpha 时不精确，返回搜索所用的 alpha
+    """
+    ai = _pool_ai
+    if ai._search_id != search_id:
+        ai._search_id = search_id
+        ai.tt.new_search()
+        ai.orderer.new_search()
+    for key, entry_depth, bound, score, entry_move, _gen in entries:
+        ai.tt.store(key, entry_depth, bound, score, entry_move)
+    game = ChessLogic.from_snapshot(snapshot)
+    ai._deadline = time.perf_counter() + time_left
+    ai._stopped = False
+    ai.nodes = 0
+    game.push(move)
+
+    alpha = _pool_alpha.value
+    exact = False
+    score = -ai._negamax(game, depth - 1, 1, -alpha - 1, -alpha)
+    if score > alpha and not ai._stopped:
+        # 零窗口搜索失败：用最新的 alpha 重搜得到精确分数
+        alpha = max(alpha, _pool_alpha.value)
+        score = -ai._negamax(game, depth - 1, 1, -INFINITY, -alpha)
+        exact = score > alpha and not ai._stopped
+        if exact:
+            with _pool_alpha.get_lock():
+                if score > _pool_alpha.value:
+                    _pool_alpha.value = score
+    if not exact:
+        score = alpha
+    return move, score, exact, ai.nodes, ai._stopped, ai._tt_line(game, depth)
@@ -0,0 +1,138 @@
+"""国际象棋位棋盘（Bitboard）工具模块
+
+格子编号：sq = row * 8 + col，与 ChessLogic.board 的行列一致
+（row 0 为黑方底线，row 7 为白方底线）。每个位棋盘是一个 64 位整数，
+第 sq 位为 1 表示该格被占据。
+
+滑动棋子（车、象、后）采用经典射线法：预先计算每个格子八个方向的射线，
+用占据位棋盘找出射线上的第一个阻挡子，再截断射线。
+"""
+
+from typing import List, Tuple
+
+WHITE = 0
+BLACK = 1
+
+# 方向：(行增量, 列增量)。前四个方向格子编号递增，后四个递减
+_DIRECTIONS = [
+    (1, 0), (0, 1), (1, 1), (1, -1),      # 南、东、东南、西南
+    (-1, 0), (0, -1), (-1, -1), (-1, 1),  # 北、西、西北、东北
+]
+
+
+def _offset_table(offsets: List[Tuple[int, int]]) -> List[int]:
+    """根据偏移量生成每个格子的攻击位棋盘"""
+    table = []
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        bb = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << (r * 8 + c)
+        table.append(bb)
+    return table
+
+
+def _ray_table() -> List[List[int]]:
+    """生成每个方向、每个格子的射线（不含起点）"""
+    rays = []
+    for dr, dc in _DIRECTIONS:
+        table = []
+        for sq in range(64):
+            r, c = (sq >> 3) + dr, (sq & 7) + dc
+            bb = 0
+            while 0 <= r < 8 and 0 <= c < 8:
+                bb |= 1 << (r * 8 + c)
+                r += dr
+                c += dc
+            table.append(bb)
+        rays.append(table)
+    return rays
+
+
+KNIGHT_ATTACKS = _offset_table([(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                                (1, -2), (1, 2), (2, -1), (2, 1)])
+KING_ATTACKS = _offset_table([(-1, -1), (-1, 0), (-1, 1), (0, -1),
+                              (0, 1), (1, -1), (1, 0), (1, 1)])
+# PAWN_ATTACKS[side][sq]：位于 sq 的兵能吃到的格子（白兵向上，黑兵向下）
+PAWN_ATTACKS = (
+    _offset_table([(-1, -1), (-1, 1)]),
+    _offset_table([(1, -1), (1, 1)]),
+)
+
+RAYS = _ray_table()
+_RAY_S, _RAY_E, _RAY_SE, _RAY_SW, _RAY_N, _RAY_W, _RAY_NW, _RAY_NE = RAYS
+
+
+def _between_table() -> List[List[int]]:
+    """BETWEEN[a][b]：a、b 在同一直线或斜线上时两者之间的格子（不含两端），否则为 0"""
+    table = [[0] * 64 for _ in range(64)]
+    for rays in RAYS:
+        for a in range(64):
+            for b in squares(rays[a]):
+                table[a][b] = rays[a] & ~rays[b] & ~(1 << b)
+    return table
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    """车从 sq 出发的攻击范围（包含第一个阻挡子）
+
+    编号递增方向的第一个阻挡子是最低位，递减方向是最高位。
+    """
+    south = _RAY_S[sq]
+    blockers = south & occupied
+    if blockers:
+        south ^= _RAY_S[(blockers & -blockers).bit_length() - 1]
+    east = _RAY_E[sq]
+    blockers = east & occupied
+    if blockers:
+        east ^= _RAY_E[(blockers & -blockers).bit_length() - 1]
+    north = _RAY_N[sq]
+    blockers = north & occupied
+    if blockers:
+        north ^= _RAY_N[blockers.bit_length() - 1]
+    west = _RAY_W[sq]
+    blockers = west & occupied
+    if blockers:
+        west ^= _RAY_W[blockers.bit_length() - 1]
+    return south | east | north | west
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    """象从 sq 出发的攻击范围（包含第一个阻挡子）"""
+    south_east = _RAY_SE[sq]
+    blockers = south_east & occupied
+    if blockers:
+        south_east ^= _RAY_SE[(blockers & -blockers).bit_length() - 1]
+    south_west = _RAY_SW[sq]
+    blockers = south_west & occupied
+    if blockers:
+        south_west ^= _RAY_SW[(blockers & -blockers).bit_length() - 1]
+    north_west = _RAY_NW[sq]
+    blockers = north_west & occupied
+    if blockers:
+        north_west ^= _RAY_NW[blockers.bit_length() - 1]
+    north_east = _RAY_NE[sq]
+    blockers = north_east & occupied
+    if blockers:
+        north_east ^= _RAY_NE[blockers.bit_length() - 1]
+    return south_east | south_west | north_west | north_east
+
+
+def queen_attacks(sq: int, occupied: int) -> int:
+    """后从 sq 出发的攻击范围"""
+    return rook_attacks(sq, occupied) | bishop_attacks(sq, occupied)
+
+
+def squares(bb: int) -> List[int]:
+    """列出位棋盘中所有为 1 的格子编号"""
+    result = []
+    while bb:
+        bit = bb & -bb
+        result.append(bit.bit_length() - 1)
+        bb ^= bit
+    return result
+
+
+BETWEEN = _between_table()
@@ -0,0 +1,108 @@
+"""Polyglot 格式开局库
+
+开局库文件由若干 16 字节的条目组成（大端序）：
+    key: uint64     局面的 Polyglot 键
+    move: uint16    走法（低位起：目标列、目标行、起点列、起点行、升变，各 3 位）
+    weight: uint16  权重
+    learn: uint32   学习数据（不使用）
+条目按 key 升序排列，因此用内存映射加二分查找即可定位，无需整体读入内存。
+"""
+
+import mmap
+import os
+import random
+import struct
+from typing import List, Optional, Tuple
+
+from .logic import ChessLogic
+from .polyglot import polyglot_key
+
+ENTRY_SIZE = 16
+_ENTRY = struct.Struct('>QHHI')
+_KEY = struct.Struct('>Q')
+
+# Polyglot 升变编码：0 不升变，1-4 依次为马、象、车、后
+_PROMOTE_QUEEN = 4
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+class OpeningBook:
+    """只读的 Polyglot 开局库"""
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            OSError: 文件无法打开
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件不能映射
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._count = size // ENTRY_SIZE
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def _lower_bound(self, key: int) -> int:
+        """第一个 key 不小于给定值的条目序号"""
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if _KEY.unpack_from(self._data, mid * ENTRY_SIZE)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def entries(self, game: ChessLogic) -> List[Tuple[Move, int]]:
+        """当前局面在开局库中的所有合法走法及其权重
+
+        库中的升变走法只保留升变为后的（与 AI 的走法表示一致）。
+        """
+        key = polyglot_key(game)
+        result = []
+        index = self._lower_bound(key)
+        while index < self._count:
+            entry_key, raw_move, weight, _learn = _ENTRY.unpack_from(self._data, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            index += 1
+            move = self._decode_move(game, raw_move)
+            if move is not None:
+                result.append((move, weight))
+        return result
+
+    def choose(self, game: ChessLogic, rng: Optional[random.Random] = None) -> Optional[Move]:
+        """按权重随机选择一个开局库走法，局面不在库中时返回 None"""
+        entries = [(move, weight) for move, weight in self.entries(game) if weight > 0]
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return (rng or random).choices(moves, weights=weights)[0]
+
+    @staticmethod
+    def _decode_move(game: ChessLogic, raw_move: int) -> Optional[Move]:
+        """把 Polyglot 走法转换为 ((行, 列), (行, 列))，非法走法返回 None"""
+        to_col = raw_move & 7
+        to_row = 7 - ((raw_move >> 3) & 7)
+        from_col = (raw_move >> 6) & 7
+        from_row = 7 - ((raw_move >> 9) & 7)
+        if (raw_move >> 12) & 7 not in (0, _PROMOTE_QUEEN):
+            return None
+
+        piece = game.board[from_row][from_col]
+        if piece is None or not game.is_own_piece(piece):
+            return None
+        # Polyglot 用"王吃己方车"表示王车易位
+        if piece in 'Kk' and from_col == 4 and to_col in (0, 7) and from_row == to_row:
+            to_col = 6 if to_col == 7 else 2
+        if (to_row, to_col) not in game.get_valid_moves(from_row, from_col):
+            return None
+        return (from_row, from_col), (to_row, to_col)
@@ -1,8 +1,18 @@
 """国际象棋游戏逻辑模块"""
 
 from enum import Enum
-from typing import Optional, List, Tuple
-import copy
+from typing import Optional, List, Tuple, Dict
+
+from .bitboard import (
+    WHITE, BLACK, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN,
+    rook_attacks, bishop_attacks, queen_attacks, squares,
+)
+from .zobrist import ZOBRIST_PIECES, ZOBRIST_SIDE, ZOBRIST_CASTLING, ZOBRIST_EP
+from .pst import PST_MG, PST_EG, PHASE_WEIGHTS, MAX_PHASE
+from .move import (
+    PROMOTION_QUEEN, PROMOTION_PIECES, FLAG_CAPTURE, FLAG_EN_PASSANT, FLAG_CASTLE,
+    FLAG_DOUBLE_PUSH, square_name, parse_square,
+)
 
 
 class Player(Enum):
@@ -20,10 +30,71 @@ class GameState(Enum):
     WHITE_WINS = 1
     BLACK_WINS = 2
     STALEMATE = 3
+    DRAW = 4  # 三次重复局面或五十步规则
+
+
+# 易位权位掩码
+CASTLE_WHITE_KING = 1
+CASTLE_WHITE_QUEEN = 2
+CASTLE_BLACK_KING = 4
+CASTLE_BLACK_QUEEN = 8
+CASTLE_ALL = 15
+CASTLING_FLAGS = (('K', CASTLE_WHITE_KING), ('Q', CASTLE_WHITE_QUEEN),
+                  ('k', CASTLE_BLACK_KING), ('q', CASTLE_BLACK_QUEEN))
+
+# 易位权成立所需的王和车：(易位权, 王的格子, 车的格子, 王, 车)
+_CASTLING_HOMES = ((CASTLE_WHITE_KING, (7, 4), (7, 7), 'K', 'R'),
+                   (CASTLE_WHITE_QUEEN, (7, 4), (7, 0), 'K', 'R'),
+                   (CASTLE_BLACK_KING, (0, 4), (0, 7), 'k', 'r'),
+                   (CASTLE_BLACK_QUEEN, (0, 4), (0, 0), 'k', 'r'))
+
+# 每种易位权组合对应的哈希分量
+_CASTLING_KEYS = [0] * 16
+for _rights in range(16):
+    for _i in range(4):
+        if _rights >> _i & 1:
+            _CASTLING_KEYS[_rights] ^= ZOBRIST_CASTLING[_i]
+
+# 走法的起点或终点落在这些格子上时保留的易位权：
+# 王或车离开原位、车在原位被吃，都会失去对应的易位权
+_CASTLING_MASKS = [CASTLE_ALL] * 64
+_CASTLING_MASKS[60] = CASTLE_ALL & ~(CASTLE_WHITE_KING | CASTLE_WHITE_QUEEN)  # e1
+_CASTLING_MASKS[63] = CASTLE_ALL & ~CASTLE_WHITE_KING  # h1
+_CASTLING_MASKS[56] = CASTLE_ALL & ~CASTLE_WHITE_QUEEN  # a1
+_CASTLING_MASKS[4] = CASTLE_ALL & ~(CASTLE_BLACK_KING | CASTLE_BLACK_QUEEN)  # e8
+_CASTLING_MASKS[7] = CASTLE_ALL & ~CASTLE_BLACK_KING  # h8
+_CASTLING_MASKS[0] = CASTLE_ALL & ~CASTLE_BLACK_QUEEN  # a8
+
+
+class UndoRecord:
+    """撤销一步走法所需的状态
+
+    记录对象放在 ChessLogic 的悔棋栈中循环使用，走子时不再创建新对象。
+    """
+
+    __slots__ = ('move', 'piece', 'captured', 'castling', 'ep_square',
+                 'halfmove_clock', 'hash', 'last_move', 'repetitions')
+
+    def __init__(self):
+        self.move = 0
+        self.piece: Optional[str] = None
+        self.captured: Optional[str] = None
+        self.castling = 0
+        self.ep_square: Optional[int] = None
+        self.halfmove_clock = 0
+        self.hash = 0
+        self.last_move: Optional[Tuple] = None
+        # 不可逆走法和空着会换用新的重复局面计数表，旧表保存在这里
+        self.repetitions: Optional[Dict[int, int]] = None
 
 
 class ChessLogic:
-    """国际象棋逻辑类"""
+    """国际象棋逻辑类
+
+    棋盘同时保存两种表示：board 是供 UI 和外部使用的 8x8 二维数组；
+    bitboards 是每种棋子一个 64 位整数的位棋盘，走法生成和攻击判断都基于它。
+    两者必须通过 _put_piece / _remove_piece 同步修改。
+    """
 
     PIECES = {
         'K': '♔', 'Q': '♕', 'R': '♖', 'B': '♗', 'N': '♘', 'P': '♙',
@@ -46,27 +117,109 @@ class ChessLogic:
     def reset(self):
         """重置游戏"""
         self.board: List[List[Optional[str]]] = [[None] * 8 for _ in range(8)]
+        self.bitboards: Dict[str, int] = {p: 0 for p in 'PNBRQKpnbrqk'}
+        self.occupancy = [0, 0]  # [白方占据, 黑方占据]
+        self.king_squares: List[Optional[int]] = [None, None]  # [白王, 黑王] 所在格
+        self.ep_square: Optional[int] = None  # 可吃过路兵的目标格
+        self.hash = 0  # Zobrist 哈希，随走子增量更新
+        # 评估分的累计值（白方视角，含子力），随走子增量更新
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
         self.current_player = Player.WHITE
         self.state = GameState.PLAYING
         self.move_count = 0
+        self.halfmove_clock = 0  # 自上次吃子或动兵以来的半回合数（五十步规则）
         self.captured_white: List[str] = []
         self.captured_black: List[str] = []
         self.last_move: Optional[Tuple] = None
-        self.can_castle = {
-            Player.WHITE: {'king_side': True, 'queen_side': True},
-            Player.BLACK: {'king_side': True, 'queen_side': True}
-        }
-        self.move_history: List[dict] = []  # 移动历史记录
+        self.castling = CASTLE_ALL  # 易位权位掩码
+        # 悔棋栈：_undo_stack[:_ply] 为已走的步，记录对象按需增长后循环使用
+        self._undo_stack: List[UndoRecord] = []
+        self._ply = 0
+        # 重复局面计数：哈希 -> 自上次不可逆走法以来出现的次数（不含当前局面），
+        # 与悔棋栈中记录的哈希同步增减，查询重复为 O(1)
+        self._repetitions: Dict[int, int] = {}
         self._setup_board()
+        self.hash = self._compute_hash()
 
     def _setup_board(self):
         """初始化棋盘"""
-        # 黑棋
-        self.board[0] = ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r']
-        self.board[1] = ['p'] * 8
-        # 白棋
-        self.board[6] = ['P'] * 8
-        self.board[7] = ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
+        back_rank = ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r']
+        for col, piece in enumerate(back_rank):
+            # 黑棋
+            self._put_piece(0, col, piece)
+            self._put_piece(1, col, 'p')
+            # 白棋
+            self._put_piece(6, col, 'P')
+            self._put_piece(7, col, piece.upper())
+
+    def _put_piece(self, row: int, col: int, piece: str):
+        """在空格上放置棋子（同步更新位棋盘）"""
+        sq = row * 8 + col
+        bit = 1 << sq
+        self.board[row][col] = piece
+        self.bitboards[piece] |= bit
+        self.occupancy[WHITE if piece.isupper() else BLACK] |= bit
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+        self.mg_score += PST_MG[piece][sq]
+        self.eg_score += PST_EG[piece][sq]
+        self.phase += PHASE_WEIGHTS[piece]
+        if piece in 'Kk':
+            self.king_squares[WHITE if piece == 'K' else BLACK] = sq
+
+    def _remove_piece(self, row: int, col: int) -> Optional[str]:
+        """移除格子上的棋子并返回它（同步更新位棋盘）"""
+        piece = self.board[row][col]
+        if piece:
+            sq = row * 8 + col
+            bit = 1 << sq
+            self.board[row][col] = None
+            self.bitboards[piece] ^= bit
+            self.occupancy[WHITE if piece.isupper() else BLACK] ^= bit
+            self.hash ^= ZOBRIST_PIECES[piece][sq]
+            self.mg_score -= PST_MG[piece][sq]
+            self.eg_score -= PST_EG[piece][sq]
+            self.phase -= PHASE_WEIGHTS[piece]
+            if piece in 'Kk':
+                self.king_squares[WHITE if piece == 'K' else BLACK] = None
+        return piece
+
+    def _move_piece(self, from_row: int, from_col: int, to_row: int, to_col: int) -> str:
+        """把棋子移到空格上（等价于 _remove_piece + _put_piece，但更快）"""
+        piece = self.board[from_row][from_col]
+        from_sq = from_row * 8 + from_col
+        to_sq = to_row * 8 + to_col
+        bits = 1 << from_sq | 1 << to_sq
+        self.board[from_row][from_col] = None
+        self.board[to_row][to_col] = piece
+        self.bitboards[piece] ^= bits
+        self.occupancy[WHITE if piece.isupper() else BLACK] ^= bits
+        keys = ZOBRIST_PIECES[piece]
+        self.hash ^= keys[from_sq] ^ keys[to_sq]
+        table = PST_MG[piece]
+        self.mg_score += table[to_sq] - table[from_sq]
+        table = PST_EG[piece]
+        self.eg_score += table[to_sq] - table[from_sq]
+        if piece in 'Kk':
+            self.king_squares[WHITE if piece == 'K' else BLACK] = to_sq
+        return piece
+
+    def _castling_hash(self) -> int:
+        """当前易位权对应的哈希分量"""
+        return _CASTLING_KEYS[self.castling]
+
+    def _compute_hash(self) -> int:
+        """从头计算局面的 Zobrist 哈希"""
+        key = 0
+        for piece, bb in self.bitboards.items():
+            for sq in squares(bb):
+                key ^= ZOBRIST_PIECES[piece][sq]
+        if self.current_player == Player.BLACK:
+            key ^= ZOBRIST_SIDE
+        if self.ep_square is not None:
+            key ^= ZOBRIST_EP[self.ep_square & 7]
+        return key ^ self._castling_hash()
 
     def get_board(self) -> List[List[Optional[str]]]:
         """获取棋盘状态"""
@@ -88,358 +241,194 @@ class ChessLogic:
             return piece.isupper()
         return piece.islower()
 
-    def is_enemy_piece(self, piece: str, player: Optional[Player] = None) -> bool:
-        """判断是否是对方棋子"""
-        if player is None:
-            player = self.current_player
-        if player == Player.WHITE:
-            return piece.islower()
-        return piece.isupper()
-
     def get_valid_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
         """获取棋子的有效移动"""
         piece = self.board[row][col]
         if not piece:
             return []
 
-        piece_type = piece.upper()
-        moves = []
-
-        if piece_type == 'P':
-            moves = self._get_pawn_moves(row, col, piece.isupper())
-        elif piece_type == 'R':
-            moves = self._get_rook_moves(row, col)
-        elif piece_type == 'N':
-            moves = self._get_knight_moves(row, col)
-        elif piece_type == 'B':
-            moves = self._get_bishop_moves(row, col)
-        elif piece_type == 'Q':
-            moves = self._get_queen_moves(row, col)
-        elif piece_type == 'K':
-            moves = self._get_king_moves(row, col)
+        targets = self._get_pseudo_moves(row * 8 + col, piece)
 
         # 过滤会导致被将的移动
         valid_moves = []
-        for move in moves:
-            if not self._would_be_in_check(row, col, move[0], move[1]):
-                valid_moves.append(move)
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            to = bit.bit_length() - 1
+            if not self._would_be_in_check(row, col, to >> 3, to & 7):
+                valid_moves.append((to >> 3, to & 7))
 
         return valid_moves
 
-    def _get_pawn_moves(self, row: int, col: int, is_white: bool) -> List[Tuple[int, int]]:
+    def _get_pseudo_moves(self, sq: int, piece: str) -> int:
+        """获取棋子的伪合法目标格（位棋盘，不考虑将军）"""
+        side = WHITE if piece.isupper() else BLACK
+        own = self.occupancy[side]
+        occupied = own | self.occupancy[side ^ 1]
+        piece_type = piece.upper()
+
+        if piece_type == 'P':
+            return self._get_pawn_moves(sq, side, occupied)
+        if piece_type == 'N':
+            return KNIGHT_ATTACKS[sq] & ~own
+        if piece_type == 'B':
+            return bishop_attacks(sq, occupied) & ~own
+        if piece_type == 'R':
+            return rook_attacks(sq, occupied) & ~own
+        if piece_type == 'Q':
+            return queen_attacks(sq, occupied) & ~own
+        return self._get_king_moves(sq, side, occupied)
+
+    def _get_pawn_moves(self, sq: int, side: int, occupied: int) -> int:
         """获取兵的移动"""
-        moves = []
-        direction = -1 if is_white else 1
-        start_row = 6 if is_white else 1
+        enemy = self.occupancy[side ^ 1]
 
-        # 前进
-        new_row = row + direction
-        if 0 <= new_row < 8 and self.board[new_row][col] is None:
-            moves.append((new_row, col))
-            if row == start_row:
-                new_row2 = row + 2 * direction
-                if self.board[new_row2][col] is None:
-                    moves.append((new_row2, col))
+        # 吃过路兵：目标格必须在己方第六横线上
+        if self.ep_square is not None and self.ep_square >> 3 == (2 if side == WHITE else 5):
+            enemy |= 1 << self.ep_square
 
         # 斜吃
-        for dc in [-1, 1]:
-            new_col = col + dc
-            if 0 <= new_col < 8 and 0 <= new_row < 8:
-                target = self.board[new_row][new_col]
-                if target and self.is_enemy_piece(target):
-                    moves.append((new_row, new_col))
-
-                # 吃过路兵
-                if self.last_move:
-                    last_piece, (from_r, from_c), (to_r, to_c) = self.last_move
-                    if (last_piece.upper() == 'P' and
-                        abs(from_r - to_r) == 2 and
-                        to_r == row and to_c == new_col):
-                        moves.append((new_row, new_col))
-
-        return moves
-
-    def _get_rook_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """获取车的移动"""
-        moves = []
-        for dr, dc in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-            for i in range(1, 8):
-                new_row, new_col = row + dr * i, col + dc * i
-                if not (0 <= new_row < 8 and 0 <= new_col < 8):
-                    break
-                target = self.board[new_row][new_col]
-                if target is None:
-                    moves.append((new_row, new_col))
-                elif self.is_enemy_piece(target):
-                    moves.append((new_row, new_col))
-                    break
-                else:
-                    break
-        return moves
+        moves = PAWN_ATTACKS[side][sq] & enemy
 
-    def _get_knight_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """获取马的移动"""
-        moves = []
-        offsets = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                   (1, -2), (1, 2), (2, -1), (2, 1)]
-        for dr, dc in offsets:
-            new_row, new_col = row + dr, col + dc
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                target = self.board[new_row][new_col]
-                if target is None or self.is_enemy_piece(target):
-                    moves.append((new_row, new_col))
-        return moves
+        # 前进
+        step = -8 if side == WHITE else 8
+        one = sq + step
+        if 0 <= one < 64 and not (occupied >> one) & 1:
+            moves |= 1 << one
+            start_row = 6 if side == WHITE else 1
+            if sq >> 3 == start_row and not (occupied >> (one + step)) & 1:
+                moves |= 1 << (one + step)
 
-    def _get_bishop_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """获取象的移动"""
-        moves = []
-        for dr, dc in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            for i in range(1, 8):
-                new_row, new_col = row + dr * i, col + dc * i
-                if not (0 <= new_row < 8 and 0 <= new_col < 8):
-                    break
-                target = self.board[new_row][new_col]
-                if target is None:
-                    moves.append((new_row, new_col))
-                elif self.is_enemy_piece(target):
-                    moves.append((new_row, new_col))
-                    break
-                else:
-                    break
         return moves
 
-    def _get_queen_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """获取皇后的移动"""
-        return self._get_rook_moves(row, col) + self._get_bishop_moves(row, col)
-
-    def _get_king_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
+    def _get_king_moves(self, sq: int, side: int, occupied: int) -> int:
         """获取国王的移动"""
-        moves = []
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                new_row, new_col = row + dr, col + dc
-                if 0 <= new_row < 8 and 0 <= new_col < 8:
-                    target = self.board[new_row][new_col]
-                    if target is None or self.is_enemy_piece(target):
-                        moves.append((new_row, new_col))
-
-        # 王车易位
-        if not self.is_in_check(self.current_player):
-            castle = self.can_castle[self.current_player]
-            if castle['king_side']:
-                if (self.board[row][5] is None and
-                    self.board[row][6] is None and
+        moves = KING_ATTACKS[sq] & ~self.occupancy[side]
+
+        # 王车易位（rights 低位为王翼，高位为后翼）
+        rights = (self.castling >> (2 * side)) & 3
+        if rights and not self._is_square_attacked(sq, side ^ 1, occupied):
+            row, col = sq >> 3, sq & 7
+            rooks = self.bitboards['R' if side == WHITE else 'r']
+            if rights & 1 and (rooks >> (row * 8 + 7)) & 1:
+                if (not occupied & (0b01100000 << (row * 8)) and
                     not self._would_be_in_check(row, col, row, 5) and
                     not self._would_be_in_check(row, col, row, 6)):
-                    moves.append((row, 6))
-            if castle['queen_side']:
-                if (self.board[row][1] is None and
-                    self.board[row][2] is None and
-                    self.board[row][3] is None and
+                    moves |= 1 << (row * 8 + 6)
+            if rights & 2 and (rooks >> (row * 8)) & 1:
+                if (not occupied & (0b00001110 << (row * 8)) and
                     not self._would_be_in_check(row, col, row, 3) and
                     not self._would_be_in_check(row, col, row, 2)):
-                    moves.append((row, 2))
+                    moves |= 1 << (row * 8 + 2)
 
         return moves
 
     def _would_be_in_check(self, from_row: int, from_col: int,
                            to_row: int, to_col: int) -> bool:
-        """检查移动后是否会被将军"""
-        piece = self.board[from_row][from_col]
-        captured = self.board[to_row][to_col]
-        self.board[from_row][from_col] = None
-        self.board[to_row][to_col] = piece
-
-        in_check = self.is_in_check(self.current_player)
-
-        self.board[from_row][from_col] = piece
-        self.board[to_row][to_col] = captured
+        """检查移动后是否会被将军
 
-        return in_check
+        不修改棋盘，只用移动后的占据位棋盘从己方国王所在格向外探测。
+        """
+        piece = self.board[from_row][from_col]
+        side = WHITE if piece.isupper() else BLACK
+        from_bit = 1 << (from_row * 8 + from_col)
+        to_sq = to_row * 8 + to_col
+        to_bit = 1 << to_sq
+
+        occupied = ((self.occupancy[WHITE] | self.occupancy[BLACK]) ^ from_bit) | to_bit
+        removed = to_bit  # 被吃的棋子不再参与攻击
+
+        # 吃过路兵：被吃的兵不在目标格上
+        if (piece in 'Pp' and from_col != to_col and self.board[to_row][to_col] is None):
+            ep_bit = 1 << (from_row * 8 + to_col)
+            occupied ^= ep_bit
+            removed |= ep_bit
+
+        king_sq = to_sq if piece in 'Kk' else self.king_squares[side]
+        if king_sq is None:
+            return False
+        return self._is_square_attacked(king_sq, side ^ 1, occupied, removed)
 
     def is_in_check(self, player: Player) -> bool:
         """检查玩家是否被将军"""
-        king = 'K' if player == Player.WHITE else 'k'
-        king_pos = None
-        for row in range(8):
-            for col in range(8):
-                if self.board[row][col] == king:
-                    king_pos = (row, col)
-                    break
-            if king_pos:
-                break
-
-        if not king_pos:
+        side = WHITE if player == Player.WHITE else BLACK
+        king_sq = self.king_squares[side]
+        if king_sq is None:
             return False
-
-        return self._is_under_attack(king_pos[0], king_pos[1], player)
-
-    def _is_under_attack(self, row: int, col: int, player: Player) -> bool:
-        """检查位置是否被攻击"""
-        enemy = player.opposite()
-        original = self.current_player
-        self.current_player = enemy
-
-        for r in range(8):
-            for c in range(8):
-                piece = self.board[r][c]
-                if piece and self.is_own_piece(piece):
-                    piece_type = piece.upper()
-                    moves = []
-                    if piece_type == 'P':
-                        direction = -1 if piece.isupper() else 1
-                        for dc in [-1, 1]:
-                            nr, nc = r + direction, c + dc
-                            if 0 <= nr < 8 and 0 <= nc < 8:
-                                moves.append((nr, nc))
-                    elif piece_type == 'R':
-                        moves = self._get_rook_moves(r, c)
-                    elif piece_type == 'N':
-                        moves = self._get_knight_moves(r, c)
-                    elif piece_type == 'B':
-                        moves = self._get_bishop_moves(r, c)
-                    elif piece_type == 'Q':
-                        moves = self._get_queen_moves(r, c)
-                    elif piece_type == 'K':
-                        for dr in [-1, 0, 1]:
-                            for dc in [-1, 0, 1]:
-                                if dr == 0 and dc == 0:
-                                    continue
-                                nr, nc = r + dr, c + dc
-                                if 0 <= nr < 8 and 0 <= nc < 8:
-                                    moves.append((nr, nc))
-
-                    if (row, col) in moves:
-                        self.current_player = original
-                        return True
-
-        self.current_player = original
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        return self._is_square_attacked(king_sq, side ^ 1, occupied)
+
+    def _is_square_attacked(self, sq: int, by_side: int, occupied: int,
+                            removed: int = 0) -> bool:
+        """格子是否被 by_side 一方攻击
+
+        从目标格向外探测：马的跳点、兵的斜线、国王相邻格，以及车/象方向上
+        遇到第一个阻挡子为止的射线，看能否碰到对应的敌方棋子。
+
+        Args:
+            occupied: 用于计算滑动射线的占据位棋盘
+            removed: 视为已被吃掉的格子（这些格子上的棋子不参与攻击）
+        """
+        bitboards = self.bitboards
+        if by_side == WHITE:
+            pawn, knight, bishop, rook, queen, king = 'PNBRQK'
+        else:
+            pawn, knight, bishop, rook, queen, king = 'pnbrqk'
+        alive = ~removed
+
+        if KNIGHT_ATTACKS[sq] & bitboards[knight] & alive:
+            return True
+        # 能吃到 sq 的兵位于 sq 向己方反方向的斜前格
+        if PAWN_ATTACKS[by_side ^ 1][sq] & bitboards[pawn] & alive:
+            return True
+        if KING_ATTACKS[sq] & bitboards[king]:
+            return True
+        diagonal = (bitboards[bishop] | bitboards[queen]) & alive
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = (bitboards[rook] | bitboards[queen]) & alive
+        if straight and rook_attacks(sq, occupied) & straight:
+            return True
         return False
 
     def make_move(self, from_row: int, from_col: int,
-                  to_row: int, to_col: int) -> bool:
-        """执行移动"""
-        if (to_row, to_col) not in self.get_valid_moves(from_row, from_col):
+                  to_row: int, to_col: int, promotion: str = 'Q') -> bool:
+        """执行移动
+
+        Args:
+            promotion: 兵到达底线时升变的棋子（'Q'、'R'、'B'、'N'），默认升变为后
+        """
+        move = self.find_move(from_row, from_col, to_row, to_col, promotion)
+        if move is None:
             return False
 
         piece = self.board[from_row][from_col]
-        captured = self.board[to_row][to_col]
-
-        # 保存移动前的状态用于悔棋
-        move_record = {
-            'from_pos': (from_row, from_col),
-            'to_pos': (to_row, to_col),
-            'piece': piece,
-            'captured': captured,
-            'last_move': self.last_move,
-            'can_castle': {
-                Player.WHITE: dict(self.can_castle[Player.WHITE]),
-                Player.BLACK: dict(self.can_castle[Player.BLACK])
-            },
-            'en_passant_capture': None,
-            'castling': None,
-            'promotion': None,
-        }
-
-        # 记录被吃棋子
+        last_move = self.last_move
+        self.push(move)
+        record = self._undo_stack[self._ply - 1]
+        record.last_move = last_move
+
+        # 记录被吃棋子（包括吃过路兵）
+        captured = record.captured
         if captured:
             if captured.isupper():
                 self.captured_white.append(captured)
             else:
                 self.captured_black.append(captured)
 
-        # 吃过路兵
-        if piece.upper() == 'P' and captured is None and from_col != to_col:
-            en_passant_pawn = self.board[from_row][to_col]
-            if en_passant_pawn:
-                move_record['en_passant_capture'] = (from_row, to_col, en_passant_pawn)
-                if en_passant_pawn.isupper():
-                    self.captured_white.append(en_passant_pawn)
-                else:
-                    self.captured_black.append(en_passant_pawn)
-                self.board[from_row][to_col] = None
-
-        # 王车易位
-        if piece.upper() == 'K' and abs(to_col - from_col) == 2:
-            if to_col == 6:
-                move_record['castling'] = ('king_side', to_row)
-                self.board[to_row][5] = self.board[to_row][7]
-                self.board[to_row][7] = None
-            elif to_col == 2:
-                move_record['castling'] = ('queen_side', to_row)
-                self.board[to_row][3] = self.board[to_row][0]
-                self.board[to_row][0] = None
-
-        # 执行移动
-        self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = None
-
-        # 兵升变
-        if piece.upper() == 'P':
-            if (piece.isupper() and to_row == 0) or (piece.islower() and to_row == 7):
-                move_record['promotion'] = piece
-                self.board[to_row][to_col] = 'Q' if piece.isupper() else 'q'
-
-        # 更新易位权限
-        if piece.upper() == 'K':
-            self.can_castle[self.current_player]['king_side'] = False
-            self.can_castle[self.current_player]['queen_side'] = False
-        elif piece.upper() == 'R':
-            if from_col == 0:
-                self.can_castle[self.current_player]['queen_side'] = False
-            elif from_col == 7:
-                self.can_castle[self.current_player]['king_side'] = False
-
         self.last_move = (piece, (from_row, from_col), (to_row, to_col))
-        self.move_count += 1
-        self.current_player = self.current_player.opposite()
-
-        # 保存移动记录
-        self.move_history.append(move_record)
-
         self._check_game_over()
         return True
 
     def undo(self) -> bool:
         """悔棋，返回是否成功"""
-        if not self.move_history:
+        if not self._ply:
             return False
 
-        record = self.move_history.pop()
-
-        from_row, from_col = record['from_pos']
-        to_row, to_col = record['to_pos']
-        piece = record['piece']
-        captured = record['captured']
-
-        # 如果有升变，恢复原来的兵
-        if record['promotion']:
-            piece = record['promotion']
-
-        # 恢复棋子位置
-        self.board[from_row][from_col] = piece
-        self.board[to_row][to_col] = captured
-
-        # 恢复吃过路兵
-        if record['en_passant_capture']:
-            ep_row, ep_col, ep_pawn = record['en_passant_capture']
-            self.board[ep_row][ep_col] = ep_pawn
-            if ep_pawn.isupper():
-                self.captured_white.pop()
-            else:
-                self.captured_black.pop()
-
-        # 恢复王车易位
-        if record['castling']:
-            side, row = record['castling']
-            if side == 'king_side':
-                self.board[row][7] = self.board[row][5]
-                self.board[row][5] = None
-            else:
-                self.board[row][0] = self.board[row][3]
-                self.board[row][3] = None
+        record = self._undo_stack[self._ply - 1]
+        captured = record.captured
+        self.last_move = record.last_move
+        self.pop()
 
         # 恢复被吃棋子的记录
         if captured:
@@ -448,95 +437,472 @@ class ChessLogic:
             else:
                 self.captured_black.pop()
 
-        # 恢复其他状态
-        self.last_move = record['last_move']
-        self.can_castle = record['can_castle']
-        self.move_count -= 1
-        self.current_player = self.current_player.opposite()
         self.state = GameState.PLAYING
-
         return True
 
+    def find_move(self, from_row: int, from_col: int, to_row: int, to_col: int,
+                  promotion: str = 'Q') -> Optional[int]:
+        """查找对应的合法走法编码，不合法时返回 None"""
+        piece = self.board[from_row][from_col]
+        if not piece or not self.is_own_piece(piece):
+            return None
+        from_sq = from_row * 8 + from_col
+        target = 1 << (to_row * 8 + to_col)
+        moves: List[int] = []
+        self._append_moves(moves, from_sq, piece, self._get_pseudo_moves(from_sq, piece) & target)
+        for move in moves:
+            code = (move >> 12) & 7
+            if not code or PROMOTION_PIECES[code] == promotion.upper():
+                return move
+        return None
+
+    def push(self, move: int):
+        """执行走法（不检查合法性）
+
+        供搜索使用：完整处理吃子、吃过路兵、王车易位、升变、易位权、过路兵格、
+        哈希和五十步计数，但不更新 last_move、被吃棋子列表和胜负状态。
+        走法必须来自 generate_moves / find_move（依赖其中的标志位）。
+        """
+        stack = self._undo_stack
+        if self._ply == len(stack):
+            stack.append(UndoRecord())
+        record = stack[self._ply]
+        self._ply += 1
+        record.move = move
+        record.castling = self.castling
+        record.ep_square = self.ep_square
+        record.halfmove_clock = self.halfmove_clock
+        record.hash = self.hash
+
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        from_row, from_col = from_sq >> 3, from_sq & 7
+        to_row, to_col = to_sq >> 3, to_sq & 7
+
+        if move & FLAG_EN_PASSANT:
+            captured = self._remove_piece(from_row, to_col)
+        elif move & FLAG_CAPTURE:
+            captured = self._remove_piece(to_row, to_col)
+        else:
+            captured = None
+        record.captured = captured
+
+        promotion = (move >> 12) & 7
+        if promotion:
+            piece = self._remove_piece(from_row, from_col)
+            self._put_piece(to_row, to_col, PROMOTION_PIECES[promotion]
+                            if piece == 'P' else PROMOTION_PIECES[promotion].lower())
+        else:
+            piece = self._move_piece(from_row, from_col, to_row, to_col)
+        record.piece = piece
+        if move & FLAG_CASTLE:
+            if to_col == 6:
+                self._move_piece(to_row, 7, to_row, 5)
+            else:
+                self._move_piece(to_row, 0, to_row, 3)
+
+        castling = self.castling & _CASTLING_MASKS[from_sq] & _CASTLING_MASKS[to_sq]
+        if castling != self.castling:
+            self.hash ^= _CASTLING_KEYS[self.castling] ^ _CASTLING_KEYS[castling]
+            self.castling = castling
+
+        if self.ep_square is not None:
+            self.hash ^= ZOBRIST_EP[self.ep_square & 7]
+        if move & FLAG_DOUBLE_PUSH:
+            self.ep_square = (from_sq + to_sq) >> 1
+            self.hash ^= ZOBRIST_EP[to_col]
+        else:
+            self.ep_square = None
+
+        if captured or piece in 'Pp':
+            # 吃子和动兵之后不可能再出现之前的局面，换用新的计数表
+            self.halfmove_clock = 0
+            record.repetitions = self._repetitions
+            self._repetitions = {}
+        else:
+            self.halfmove_clock += 1
+            record.repetitions = None
+            repetitions = self._repetitions
+            repetitions[record.hash] = repetitions.get(record.hash, 0) + 1
+        self.move_count += 1
+        self.current_player = Player.BLACK if self.current_player == Player.WHITE else Player.WHITE
+        self.hash ^= ZOBRIST_SIDE
+
+    def pop(self):
+        """撤销最近一次 push"""
+        self._ply -= 1
+        record = self._undo_stack[self._ply]
+        move = record.move
+        from_sq = move & 63
+        to_sq = (move >> 6) & 63
+        from_row, from_col = from_sq >> 3, from_sq & 7
+        to_row, to_col = to_sq >> 3, to_sq & 7
+
+        if move & FLAG_CASTLE:
+            if to_col == 6:
+                self._move_piece(to_row, 5, to_row, 7)
+            else:
+                self._move_piece(to_row, 3, to_row, 0)
+        if (move >> 12) & 7:
+            self._remove_piece(to_row, to_col)
+            self._put_piece(from_row, from_col, record.piece)
+        else:
+            self._move_piece(to_row, to_col, from_row, from_col)
+        captured = record.captured
+        if captured:
+            if move & FLAG_EN_PASSANT:
+                self._put_piece(from_row, to_col, captured)
+            else:
+                self._put_piece(to_row, to_col, captured)
+
+        self.castling = record.castling
+        self.ep_square = record.ep_square
+        self.halfmove_clock = record.halfmove_clock
+        self.hash = record.hash
+        if record.repetitions is not None:
+            self._repetitions = record.repetitions
+        else:
+            repetitions = self._repetitions
+            count = repetitions[record.hash] - 1
+            if count:
+                repetitions[record.hash] = count
+            else:
+                del repetitions[record.hash]
+        self.move_count -= 1
+        self.current_player = Player.BLACK if self.current_player == Player.WHITE else Player.WHITE
+
+    def push_null(self):
+        """空着：只交换走棋方（供搜索中的空着裁剪使用）
+
+        空着前后的局面不算重复，空着之后使用新的重复局面计数表。
+        """
+        stack = self._undo_stack
+        if self._ply == len(stack):
+            stack.append(UndoRecord())
+        record = stack[self._ply]
+        self._ply += 1
+        record.move = 0
+        record.captured = None
+        record.ep_square = self.ep_square
+        record.halfmove_clock = self.halfmove_clock
+        record.hash = self.hash
+        record.repetitions = self._repetitions
+        self._repetitions = {}
+
+        if self.ep_square is not None:
+            self.hash ^= ZOBRIST_EP[self.ep_square & 7]
+            self.ep_square = None
+        self.halfmove_clock += 1
+        self.current_player = Player.BLACK if self.current_player == Player.WHITE else Player.WHITE
+        self.hash ^= ZOBRIST_SIDE
+
+    def pop_null(self):
+        """撤销 push_null"""
+        self._ply -= 1
+        record = self._undo_stack[self._ply]
+        self.ep_square = record.ep_square
+        self.halfmove_clock = record.halfmove_clock
+        self.hash = record.hash
+        self._repetitions = record.repetitions
+        self.current_player = Player.BLACK if self.current_player == Player.WHITE else Player.WHITE
+
+    def is_repetition(self, count: int = 1) -> bool:
+        """当前局面此前是否已出现过至少 count 次
+
+        搜索中出现一次重复即可按和棋处理（双方都可以继续重复）；
+        对局中 count=2 即三次重复局面。
+        """
+        return self._repetitions.get(self.hash, 0) >= count
+
+    def is_fifty_moves(self) -> bool:
+        """是否已满足五十步规则（双方各五十步没有吃子和动兵）"""
+        return self.halfmove_clock >= 100
+
     def can_undo(self) -> bool:
         """是否可以悔棋"""
-        return len(self.move_history) > 0
+        return self._ply > 0
 
     def _check_game_over(self):
         """检查游戏是否结束"""
-        has_legal_moves = False
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and self.is_own_piece(piece):
-                    if self.get_valid_moves(row, col):
-                        has_legal_moves = True
-                        break
-            if has_legal_moves:
-                break
-
-        if not has_legal_moves:
+        side = WHITE if self.current_player == Player.WHITE else BLACK
+        if not self._has_legal_move(side):
             if self.is_in_check(self.current_player):
                 self.state = (GameState.BLACK_WINS
                               if self.current_player == Player.WHITE
                               else GameState.WHITE_WINS)
             else:
                 self.state = GameState.STALEMATE
+        elif self.is_fifty_moves() or self.is_repetition(2):
+            self.state = GameState.DRAW
+
+    def _has_legal_move(self, side: int) -> bool:
+        """一方是否存在合法移动（找到第一个即返回）"""
+        for sq in squares(self.occupancy[side]):
+            row, col = sq >> 3, sq & 7
+            targets = self._get_pseudo_moves(sq, self.board[row][col])
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to = bit.bit_length() - 1
+                if not self._would_be_in_check(row, col, to >> 3, to & 7):
+                    return True
+        return False
+
+    def generate_moves(self, captures_only: bool = False) -> List[int]:
+        """生成走棋方的全部合法走法（整数编码）
+
+        Args:
+            captures_only: 只生成吃子（含吃过路兵）和升变为后的走法，供静态搜索使用
+        """
+        side = WHITE if self.current_player == Player.WHITE else BLACK
+        enemy = self.occupancy[side ^ 1]
+        occupied = enemy | self.occupancy[side]
+
+        # 不被将军时，只有王、被牵制的子（以及吃过路兵）的走法需要逐个检查合法性
+        king_sq = self.king_squares[side]
+        if king_sq is None:
+            unsafe = 0
+        elif self._is_square_attacked(king_sq, side ^ 1, occupied):
+            unsafe = -1
+        else:
+            unsafe = self._pinned(king_sq, side, occupied) | 1 << king_sq
+
+        if captures_only:
+            pawn_targets = enemy | (0xFF if side == WHITE else 0xFF << 56)
+            if self.ep_square is not None:
+                pawn_targets |= 1 << self.ep_square
+
+        moves: List[int] = []
+        board = self.board
+        for sq in squares(self.occupancy[side]):
+            piece = board[sq >> 3][sq & 7]
+            if not captures_only:
+                targets = self._get_pseudo_moves(sq, piece)
+            elif piece in 'Kk':
+                targets = KING_ATTACKS[sq] & enemy
+            elif piece in 'Pp':
+                targets = self._get_pseudo_moves(sq, piece) & pawn_targets
+            else:
+                targets = self._get_pseudo_moves(sq, piece) & enemy
+            if targets:
+                self._append_moves(moves, sq, piece, targets, captures_only, unsafe)
+        return moves
+
+    def _pinned(self, king_sq: int, side: int, occupied: int) -> int:
+        """被牵制在己方国王前的己方棋子（位棋盘）"""
+        if side == WHITE:
+            straight = self.bitboards['r'] | self.bitboards['q']
+            diagonal = self.bitboards['b'] | self.bitboards['q']
+        else:
+            straight = self.bitboards['R'] | self.bitboards['Q']
+            diagonal = self.bitboards['B'] | self.bitboards['Q']
+        # 只把敌方棋子当作阻挡，找出能隔着己方棋子瞄准国王的滑动子
+        enemy = self.occupancy[side ^ 1]
+        snipers = ((rook_attacks(king_sq, enemy) & straight) |
+                   (bishop_attacks(king_sq, enemy) & diagonal))
+        pinned = 0
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = BETWEEN[king_sq][bit.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers
+        return pinned & self.occupancy[side]
+
+    def _append_moves(self, moves: List[int], from_sq: int, piece: str, targets: int,
+                      queen_promotions_only: bool = False, unsafe: int = -1):
+        """把 targets 中不会导致被将军的目标格编码为走法加入 moves
+
+        Args:
+            unsafe: 需要逐个检查合法性的起点格（位棋盘），默认全部检查
+        """
+        board = self.board
+        from_row, from_col = from_sq >> 3, from_sq & 7
+        is_pawn = piece in 'Pp'
+        is_king = piece in 'Kk'
+        must_check = (unsafe >> from_sq) & 1
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            to_sq = bit.bit_length() - 1
+            to_row, to_col = to_sq >> 3, to_sq & 7
+            captured = board[to_row][to_col]
+            en_passant = is_pawn and from_col != to_col and captured is None
+            if (must_check or en_passant) and self._would_be_in_check(from_row, from_col, to_row, to_col):
+                continue
+
+            move = from_sq | to_sq << 6
+            if captured is not None:
+                move |= FLAG_CAPTURE
+            if is_pawn:
+                if en_passant:
+                    move |= FLAG_CAPTURE | FLAG_EN_PASSANT
+                elif to_sq - from_sq in (16, -16):
+                    move |= FLAG_DOUBLE_PUSH
+                if to_row == 0 or to_row == 7:
+                    moves.append(move | PROMOTION_QUEEN << 12)
+                    if not queen_promotions_only:
+                        moves.append(move | 3 << 12)
+                        moves.append(move | 2 << 12)
+                        moves.append(move | 1 << 12)
+                    continue
+            elif is_king and (to_col - from_col == 2 or from_col - to_col == 2):
+                move |= FLAG_CASTLE
+            moves.append(move)
 
     def get_all_moves(self, player: Optional[Player] = None) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
         """获取指定玩家的所有合法移动"""
         if player is None:
             player = self.current_player
+        side = WHITE if player == Player.WHITE else BLACK
         moves = []
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece and self.is_own_piece(piece, player):
-                    for move in self.get_valid_moves(row, col):
-                        moves.append(((row, col), move))
+        for sq in squares(self.occupancy[side]):
+            from_pos = (sq >> 3, sq & 7)
+            for move in self.get_valid_moves(sq >> 3, sq & 7):
+                moves.append((from_pos, move))
         return moves
 
     def clone(self) -> 'ChessLogic':
         """克隆游戏状态"""
         new_game = ChessLogic.__new__(ChessLogic)
         new_game.board = [row[:] for row in self.board]
+        new_game.bitboards = dict(self.bitboards)
+        new_game.occupancy = self.occupancy[:]
+        new_game.king_squares = self.king_squares[:]
+        new_game.ep_square = self.ep_square
+        new_game.hash = self.hash
+        new_game.mg_score = self.mg_score
+        new_game.eg_score = self.eg_score
+        new_game.phase = self.phase
         new_game.current_player = self.current_player
         new_game.state = self.state
         new_game.move_count = self.move_count
+        new_game.halfmove_clock = self.halfmove_clock
         new_game.captured_white = self.captured_white[:]
         new_game.captured_black = self.captured_black[:]
         new_game.last_move = self.last_move
-        new_game.can_castle = {
-            Player.WHITE: dict(self.can_castle[Player.WHITE]),
-            Player.BLACK: dict(self.can_castle[Player.BLACK])
-        }
+        new_game.castling = self.castling
+        new_game._undo_stack = []
+        new_game._ply = 0
+        new_game._repetitions = dict(self._repetitions)
         return new_game
 
+    def set_fen(self, fen: str):
+        """按 FEN 字符串设置局面（清空悔棋记录）
+
+        Raises:
+            ValueError: FEN 格式错误
+        """
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen}")
+        placement, side, castling, ep_field = fields[:4]
+        halfmove = int(fields[4]) if len(fields) > 4 else 0
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+        ranks = placement.split('/')
+        if (len(ranks) != 8 or side not in ('w', 'b') or
+                (castling != '-' and not set(castling) <= set('KQkq'))):
+            raise ValueError(f"Invalid FEN: {fen}")
+
+        self.reset()
+        for sq in squares(self.occupancy[WHITE] | self.occupancy[BLACK]):
+            self._remove_piece(sq >> 3, sq & 7)
+        for row, rank in enumerate(ranks):
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                elif char in self.PIECES and col < 8:
+                    self._put_piece(row, col, char)
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN: {fen}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN: {fen}")
+
+        self.current_player = Player.WHITE if side == 'w' else Player.BLACK
+        self.castling = 0
+        for flag, mask in CASTLING_FLAGS:
+            if flag in castling:
+                self.castling |= mask
+        # 王或车不在原位的易位权无效，清除以免生成非法的易位走法
+        for mask, (king_row, king_col), (rook_row, rook_col), king, rook in _CASTLING_HOMES:
+            if (self.board[king_row][king_col] != king or
+                    self.board[rook_row][rook_col] != rook):
+                self.castling &= ~mask
+        self.ep_square = None
+        if ep_field != '-':
+            ep_row, ep_col = parse_square(ep_field)
+            self.ep_square = ep_row * 8 + ep_col
+        self.halfmove_clock = halfmove
+        self.move_count = (fullmove - 1) * 2 + (1 if side == 'b' else 0)
+        self.hash = self._compute_hash()
+        self._check_game_over()
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'ChessLogic':
+        """从 FEN 字符串创建局面"""
+        game = cls()
+        game.set_fen(fen)
+        return game
+
+    def to_fen(self) -> str:
+        """导出当前局面的 FEN 字符串"""
+        return f"{self.position_key()} {self.halfmove_clock} {self.move_count // 2 + 1}"
+
+    def position_key(self) -> str:
+        """局面键：FEN 的前四个字段（棋盘、走棋方、易位权、过路兵格）
+
+        不含步数计数，相同局面的键相同，可用于缓存和进程间传递。
+        """
+        ranks = []
+        for row in self.board:
+            text = ''
+            empty = 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += piece
+            if empty:
+                text += str(empty)
+            ranks.append(text)
+
+        side = 'w' if self.current_player == Player.WHITE else 'b'
+        castling = ''.join(flag for flag, mask in CASTLING_FLAGS if self.castling & mask) or '-'
+        ep = square_name(self.ep_square >> 3, self.ep_square & 7) if self.ep_square is not None else '-'
+        return f"{'/'.join(ranks)} {side} {castling} {ep}"
+
+    def snapshot(self) -> tuple:
+        """导出紧凑的局面快照（用于进程间传递）：FEN 字符串和重复局面计数"""
+        return self.to_fen(), tuple(sorted(self._repetitions.items()))
+
+    @classmethod
+    def from_snapshot(cls, data: tuple) -> 'ChessLogic':
+        """从 snapshot() 的结果恢复局面"""
+        fen, repetitions = data
+        game = cls.from_fen(fen)
+        game._repetitions = dict(repetitions)
+        return game
+
     def evaluate(self) -> int:
-        """评估棋盘局面（正值对白方有利）"""
+        """评估棋盘局面（正值对白方有利）
+
+        子力和位置分在 _put_piece / _remove_piece 中增量累计，这里只需
+        按阶段在中局分和残局分之间插值。
+        """
         if self.state == GameState.WHITE_WINS:
             return 100000
         elif self.state == GameState.BLACK_WINS:
             return -100000
-        elif self.state == GameState.STALEMATE:
+        elif self.state in (GameState.STALEMATE, GameState.DRAW):
             return 0
 
-        score = 0
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece:
-                    value = self.PIECE_VALUES.get(piece, 0)
-                    if piece.isupper():
-                        score += value
-                        # 位置奖励
-                        if piece == 'P':
-                            score += (6 - row) * 10  # 兵越前越好
-                    else:
-                        score -= value
-                        if piece == 'p':
-                            score -= (row - 1) * 10
-
-        return score
+        phase = min(self.phase, MAX_PHASE)
+        return (self.mg_score * phase + self.eg_score * (MAX_PHASE - phase)) // MAX_PHASE
 
     def is_game_over(self) -> bool:
         return self.state != GameState.PLAYING
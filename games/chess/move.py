@@ -0,0 +1,68 @@
+"""国际象棋走法的整数编码
+
+一个走法打包为一个整数，避免在搜索中创建嵌套元组：
+    位 0-5    起点格（row * 8 + col）
+    位 6-11   终点格
+    位 12-14  升变棋子（0 不升变，1-4 依次为马、象、车、后）
+    位 15-18  标志：吃子、吃过路兵、王车易位、兵走两步
+"""
+
+from typing import Tuple
+
+FILES = 'abcdefgh'
+
+PROMOTION_NONE = 0
+PROMOTION_KNIGHT = 1
+PROMOTION_BISHOP = 2
+PROMOTION_ROOK = 3
+PROMOTION_QUEEN = 4
+# 升变编码对应的（白方）棋子字母
+PROMOTION_PIECES = ' NBRQ'
+
+FLAG_CAPTURE = 1 << 15
+FLAG_EN_PASSANT = 1 << 16
+FLAG_CASTLE = 1 << 17
+FLAG_DOUBLE_PUSH = 1 << 18
+
+
+def square_name(row: int, col: int) -> str:
+    """格子的代数记法名称（如 (6, 4) -> 'e2'）"""
+    return f"{FILES[col]}{8 - row}"
+
+
+def parse_square(name: str) -> Tuple[int, int]:
+    """代数记法名称转换为 (行, 列)"""
+    if len(name) != 2 or name[0] not in FILES or name[1] not in '12345678':
+        raise ValueError(f"Invalid square: {name}")
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = PROMOTION_NONE, flags: int = 0) -> int:
+    """打包走法"""
+    return from_sq | to_sq << 6 | promotion << 12 | flags
+
+
+def move_from(move: int) -> int:
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def move_promotion(move: int) -> int:
+    return (move >> 12) & 7
+
+
+def move_to_tuple(move: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """转换为 ((起点行, 列), (终点行, 列))"""
+    from_sq, to_sq = move & 63, (move >> 6) & 63
+    return (from_sq >> 3, from_sq & 7), (to_sq >> 3, to_sq & 7)
+
+
+def move_name(move: int) -> str:
+    """走法的坐标记法（如 e2e4、e7e8q）"""
+    from_sq, to_sq = move & 63, (move >> 6) & 63
+    name = square_name(from_sq >> 3, from_sq & 7) + square_name(to_sq >> 3, to_sq & 7)
+    promotion = (move >> 12) & 7
+    return name + PROMOTION_PIECES[promotion].lower() if promotion else name
@@ -0,0 +1,211 @@
+"""国际象棋走法生成的 perft 测试与基准
+
+perft(n) 统计从某个局面出发走 n 步（半回合）能到达的所有叶子节点数，
+与公认的参考值比对即可验证走法生成（易位、吃过路兵、升变、牵制、将军）
+是否正确，同时给出每秒节点数作为 generate_moves / push / pop 的性能基准。
+
+用法：
+    python -m games.chess.perft                         # 运行参考局面测试
+    python -m games.chess.perft --max-nodes 5000000     # 测到更深的层数
+    python -m games.chess.perft --fen "<FEN>" --depth 3 --divide
+    python -m games.chess.perft --bench                 # push/pop 与复制局面的吞吐量对比
+    python -m games.chess.perft --bench-parallel 4      # 4 进程并行搜索与单进程的对比
+"""
+
+import argparse
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from .logic import ChessLogic
+from .move import move_name
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# 参考局面与各深度的期望叶子节点数（来自 Chess Programming Wiki 的 Perft Results）
+REFERENCE_POSITIONS = [
+    ('initial', START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     [48, 2039, 97862, 4085603]),
+    ('position3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     [14, 191, 2812, 43238, 674624]),
+    ('position4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     [6, 264, 9467, 422333]),
+    ('position5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     [44, 1486, 62379, 2103487]),
+    ('position6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(game: ChessLogic, depth: int) -> int:
+    """统计 depth 步后的叶子节点数（结束后局面复原）"""
+    if depth == 0:
+        return 1
+    moves = game.generate_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+    return nodes
+
+
+def divide(game: ChessLogic, depth: int) -> List[Tuple[str, int]]:
+    """分走法统计叶子节点数，用于与其他引擎逐个走法比对定位错误"""
+    results = []
+    for move in game.generate_moves():
+        game.push(move)
+        results.append((move_name(move), perft(game, depth - 1)))
+        game.pop()
+    return sorted(results)
+
+
+def run_suite(max_nodes: int = 100000, out=sys.stdout) -> bool:
+    """运行参考局面测试，只测期望节点数不超过 max_nodes 的深度
+
+    Returns:
+        是否全部通过
+    """
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in REFERENCE_POSITIONS:
+        game = ChessLogic.from_fen(fen)
+        for depth, count in enumerate(expected, 1):
+            if count > max_nodes:
+                break
+            start = time.perf_counter()
+            nodes = perft(game, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            ok = nodes == count
+            passed = passed and ok
+            print(f"{name:<10} depth {depth}: {nodes:>9} "
+                  f"{'ok' if ok else f'FAIL (expected {count})':<24}"
+                  f"{elapsed:8.2f}s {nodes / max(elapsed, 1e-9):10.0f} nps", file=out)
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s, "
+          f"{total_nodes / max(total_time, 1e-9):.0f} nps", file=out)
+    return passed
+
+
+def bench_make_unmake(rounds: int = 200, out=sys.stdout) -> Tuple[float, float]:
+    """测量走子的吞吐量：对每个参考局面的全部走法反复执行和撤销
+
+    同时测量复制局面的做法（clone 后在副本上 push，丢弃副本即撤销）作为对照，
+    即改用 push/pop 之前搜索复制或临时修改局面的开销。
+
+    Returns:
+        (push/pop 每秒次数, clone + push 每秒次数)
+    """
+    def push_pop(game: ChessLogic, moves: List[int]):
+        push, pop = game.push, game.pop
+        for move in moves:
+            push(move)
+            pop()
+
+    def copy_make(game: ChessLogic, moves: List[int]):
+        clone = game.clone
+        for move in moves:
+            clone().push(move)
+
+    rates = []
+    for label, run in (('push/pop', push_pop), ('clone+push', copy_make)):
+        total = 0
+        elapsed = 0.0
+        for name, fen, _expected in REFERENCE_POSITIONS:
+            game = ChessLogic.from_fen(fen)
+            moves = game.generate_moves()
+            start = time.perf_counter()
+            for _ in range(rounds):
+                run(game, moves)
+            spent = time.perf_counter() - start
+            total += rounds * len(moves)
+            elapsed += spent
+            print(f"{label:<10} {name:<10} {rounds * len(moves) / max(spent, 1e-9):10.0f} "
+                  f"make/unmake per second", file=out)
+        rates.append(total / max(elapsed, 1e-9))
+        print(f"{label:<10} total: {rates[-1]:.0f} make/unmake per second", file=out)
+    print(f"push/pop is {rates[0] / max(rates[1], 1e-9):.1f}x the copy-based baseline", file=out)
+    return rates[0], rates[1]
+
+
+def bench_parallel(workers: int, depth: int = 5, out=sys.stdout) -> float:
+    """比较单进程与 workers 个进程的 AI 搜索到固定深度的用时和节点数
+
+    进程池先启动并预热，用时不包括创建进程。
+
+    Returns:
+        并行搜索相对单进程的加速比
+    """
+    from .ai import ChessAI
+
+    totals = []
+    for count in (1, workers):
+        ai = ChessAI(difficulty=3, workers=count, book_path=None, tablebase_path=None)
+        if count > 1:
+            ai._get_pool().map(abs, range(count))
+        total_nodes = 0
+        total_time = 0.0
+        for name, fen, _expected in REFERENCE_POSITIONS:
+            game = ChessLogic.from_fen(fen)
+            start = time.perf_counter()
+            ai.search(game, time_budget_ms=float('inf'), max_depth=depth)
+            spent = time.perf_counter() - start
+            total_nodes += ai.nodes
+            total_time += spent
+            print(f"workers {count:<3} {name:<10} {ai.nodes:>9} nodes {spent:8.2f}s", file=out)
+        ai.close()
+        totals.append((total_nodes, total_time))
+        print(f"workers {count:<3} total: {total_nodes} nodes in {total_time:.2f}s", file=out)
+    (serial_nodes, serial_time), (parallel_nodes, parallel_time) = totals
+    speedup = serial_time / max(parallel_time, 1e-9)
+    print(f"{workers} workers: {parallel_nodes / max(serial_nodes, 1):.2f}x the nodes, "
+          f"{speedup:.2f}x the speed of one process", file=out)
+    return speedup
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Chess move generation perft')
+    parser.add_argument('--fen', help='position to test (default: run the reference suite)')
+    parser.add_argument('--depth', type=int,
+                        help='perft depth for --fen (default 3), search depth for --bench-parallel (default 5)')
+    parser.add_argument('--divide', action='store_true', help='print node counts per root move')
+    parser.add_argument('--bench', action='store_true', help='measure push/pop throughput against clone+push')
+    parser.add_argument('--bench-parallel', type=int, metavar='WORKERS',
+                        help='compare AI search with this many processes against one process')
+    parser.add_argument('--max-nodes', type=int, default=100000,
+                        help='skip suite depths with more expected nodes than this')
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        bench_make_unmake()
+        return 0
+    if args.bench_parallel:
+        bench_parallel(args.bench_parallel, args.depth or 5)
+        return 0
+    if args.fen is None:
+        return 0 if run_suite(args.max_nodes) else 1
+
+    game = ChessLogic.from_fen(args.fen)
+    start = time.perf_counter()
+    if args.divide:
+        results = divide(game, args.depth or 3)
+        for name, nodes in results:
+            print(f"{name}: {nodes}")
+        nodes = sum(count for _name, count in results)
+        print(f"\nmoves: {len(results)}")
+    else:
+        nodes = perft(game, args.depth or 3)
+    elapsed = time.perf_counter() - start
+    print(f"nodes: {nodes}  time: {elapsed:.2f}s  nps: {nodes / max(elapsed, 1e-9):.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,566 @@
+"""国际象棋残局库：逆向分析生成与内存映射查询
+
+每种子力组合（如 KQvK：白方王后对黑方单王）一个文件，文件中每个字节对应
+一个局面。局面先按棋盘对称性规范化：没有兵时有 8 种对称（左右、上下翻转
+和沿对角线翻转），把白王变换到 a1-d1-d4 三角区内（白王在对角线上时黑王也
+在对角线上或以下）；有兵时只能左右翻转，把白王变换到 a-d 列。仍有多种
+变换可选时（两个王都在对角线上）取下标最小的一种。下标为：
+    下标 = (走棋方（0 白、1 黑） * 王的位置组合数 + 王的位置组合序号) 依次接上其余棋子的格子
+王的位置组合只包括规范区域内、两王不重叠也不相邻的组合（无兵 462 种，
+有兵 1806 种）；其余棋子每个占 64 格，兵只占 48 格（不会在底线）。
+棋子顺序为白方在前、黑方在后，每方按 KQRBNP 排列。
+字节值 0 表示和棋（或非法局面），否则为 距将杀的半回合数 + 1：
+半回合数为奇数时走棋方获胜，为偶数时走棋方被将杀（0 即已被将死）。
+四子无兵残局约 3.8 MB，有兵约 15 MB（两个兵约 8 MB）。
+
+黑方子力较强的局面通过上下翻转、交换颜色查询同一个文件。
+表中的局面都假定没有易位权，也不能吃过路兵。
+
+生成方法是逆向分析（retrograde analysis）：先找出所有被将死的局面，
+然后逐层向前推：能走到"对方必败"局面的一方必胜，所有走法都走到
+"对方必胜"局面的一方必败；吃子和升变走到更小的残局，查询已生成的子残局。
+
+用法：
+    python -m games.chess.tablebase                    # 生成 KQvK、KRvK、KPvK
+    python -m games.chess.tablebase KQvKR KPvKP         # 生成指定残局（自动先生成子残局）
+    python -m games.chess.tablebase --probe "<FEN>"     # 查询局面
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .bitboard import (WHITE, BLACK, KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS,
+                       rook_attacks, bishop_attacks, queen_attacks, squares)
+from .logic import ChessLogic, Player
+
+TABLE_SUFFIX = '.tb'
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+DEFAULT_ENDINGS = ('KQvK', 'KRvK', 'KPvK')
+MAX_PIECES = 4
+
+# 查询结果：走棋方胜、和、负
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+_PIECE_ORDER = 'KQRBNP'
+_PROMOTIONS = 'QRBN'
+
+Result = Tuple[int, int]
+
+
+def _transform_table(flip_file: bool, flip_rank: bool, transpose: bool) -> List[int]:
+    """棋盘对称变换：格子的映射表"""
+    table = []
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        if transpose:
+            # 沿 a1-h8 对角线翻转
+            row, col = 7 - col, 7 - row
+        if flip_file:
+            col = 7 - col
+        if flip_rank:
+            row = 7 - row
+        table.append(row * 8 + col)
+    return table
+
+
+# 前两个为恒等和左右翻转（有兵时只能用这两个）
+_TRANSFORMS = [_transform_table(flip_file, flip_rank, transpose)
+               for transpose in (False, True) for flip_rank in (False, True)
+               for flip_file in (False, True)]
+
+
+def _in_triangle(sq: int) -> bool:
+    """a1-d1-d4 三角区"""
+    rank, col = 7 - (sq >> 3), sq & 7
+    return col <= 3 and rank <= col
+
+
+def _below_diagonal(sq: int) -> bool:
+    """在 a1-h8 对角线上或以下"""
+    return 7 - (sq >> 3) <= (sq & 7)
+
+
+def _on_diagonal(sq: int) -> bool:
+    return 7 - (sq >> 3) == (sq & 7)
+
+
+class _Layout:
+    """一种子力组合的文件布局：局面规范化后的下标与下标对应的局面"""
+
+    def __init__(self, pieces: str):
+        """
+        Args:
+            pieces: 棋子字符串，白方在前（大写）、黑方在后（小写），各方按 KQRBNP 排列
+        """
+        self.pieces = pieces
+        self.kings = (0, pieces.index('k'))
+        self.others = [(i, piece in 'Pp') for i, piece in enumerate(pieces) if piece not in 'Kk']
+        has_pawns = any(pawn for _i, pawn in self.others)
+        transforms = _TRANSFORMS[:2] if has_pawns else _TRANSFORMS
+
+        def canonical_pair(white_king: int, black_king: int) -> bool:
+            if has_pawns:
+                return white_king & 7 <= 3
+            return _in_triangle(white_king) and (not _on_diagonal(white_king) or
+                                                 _below_diagonal(black_king))
+
+        self.pairs = [(white_king, black_king) for white_king in range(64) for black_king in range(64)
+                      if canonical_pair(white_king, black_king) and
+                      not KING_ATTACKS[white_king] >> black_king & 1 and white_king != black_king]
+        pair_index = {pair: i for i, pair in enumerate(self.pairs)}
+        # 每个王的位置组合可用的变换：[(格子映射表, 规范化后的组合序号)]，王相邻或重叠时为空
+        self._canonical: List[List[Tuple[List[int], int]]] = [[] for _ in range(64 * 64)]
+        for white_king in range(64):
+            for black_king in range(64):
+                for table in transforms:
+                    pair = pair_index.get((table[white_king], table[black_king]))
+                    if pair is not None:
+                        self._canonical[white_king * 64 + black_king].append((table, pair))
+        self.size = 2 * len(self.pairs)
+        for _i, pawn in self.others:
+            self.size *= 48 if pawn else 64
+
+    def encode(self, sqs: List[int], stm: int) -> Optional[int]:
+        """局面（各棋子所在格、走棋方）的下标，两王相邻或重叠时返回 None"""
+        best = None
+        for table, pair in self._canonical[sqs[self.kings[0]] * 64 + sqs[self.kings[1]]]:
+            index = stm * len(self.pairs) + pair
+            for i, pawn in self.others:
+                index = index * 48 + table[sqs[i]] - 8 if pawn else index * 64 + table[sqs[i]]
+            if best is None or index < best:
+                best = index
+        return best
+
+    def decode(self, index: int) -> Tuple[List[int], int]:
+        """下标对应的 (各棋子所在格, 走棋方)"""
+        sqs = [0] * len(self.pieces)
+        for i, pawn in reversed(self.others):
+            if pawn:
+                index, sq = divmod(index, 48)
+                sqs[i] = sq + 8
+            else:
+                index, sqs[i] = divmod(index, 64)
+        stm, pair = divmod(index, len(self.pairs))
+        sqs[self.kings[0]], sqs[self.kings[1]] = self.pairs[pair]
+        return sqs, stm
+
+
+def _side_signature(pieces: str) -> str:
+    """一方子力的规范写法（大写，按 KQRBNP 排列）"""
+    return ''.join(sorted(pieces.upper(), key=_PIECE_ORDER.index))
+
+
+def parse_name(name: str) -> Tuple[str, str]:
+    """解析残局名称（如 'KQvK'），返回 (白方子力, 黑方子力)
+
+    Raises:
+        ValueError: 名称格式错误或棋子数超过 MAX_PIECES
+    """
+    parts = name.upper().split('V')
+    if len(parts) != 2:
+        raise ValueError(f"Invalid ending: {name}")
+    white, black = (_side_signature(part) for part in parts)
+    for side in (white, black):
+        if side.count('K') != 1 or not set(side) <= set(_PIECE_ORDER):
+            raise ValueError(f"Invalid ending: {name}")
+    if len(white) + len(black) > MAX_PIECES:
+        raise ValueError(f"Endings with more than {MAX_PIECES} pieces are not supported: {name}")
+    return white, black
+
+
+def _is_insufficient(white: str, black: str) -> bool:
+    """子力不足以将杀的组合（王对王、单轻子对王），直接判和"""
+    extra = (white + black).replace('K', '')
+    return extra in ('', 'B', 'N')
+
+
+class Tablebase:
+    """只读的残局库目录，各残局文件在首次查询时内存映射"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        self.directory = directory
+        self._files: Dict[str, Tuple] = {}
+        self._tables: Dict[str, Optional[Tuple[mmap.mmap, _Layout]]] = {}
+        self.max_pieces = 0
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith(TABLE_SUFFIX):
+                    try:
+                        white, black = parse_name(filename[:-len(TABLE_SUFFIX)])
+                    except ValueError:
+                        continue
+                    self.max_pieces = max(self.max_pieces, len(white) + len(black))
+
+    def close(self):
+        for data, handle in self._files.values():
+            data.close()
+            handle.close()
+        self._files = {}
+        self._tables = {}
+
+    def _table(self, name: str) -> Optional[Tuple[mmap.mmap, _Layout]]:
+        """打开残局文件，返回 (数据, 布局)；文件不存在或大小与布局不符（旧格式）时返回 None"""
+        if name not in self._tables:
+            path = os.path.join(self.directory, name + TABLE_SUFFIX)
+            table = None
+            if os.path.exists(path):
+                white, black = parse_name(name)
+                layout = _Layout(white + black.lower())
+                try:
+                    handle = open(path, 'rb')
+                    data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    data = None
+                if data is not None:
+                    self._files[name] = (data, handle)
+                    if len(data) == layout.size:
+                        table = data, layout
+            self._tables[name] = table
+        return self._tables[name]
+
+    def probe(self, game: ChessLogic) -> Optional[Result]:
+        """查询局面，返回 (胜负, 距将杀的半回合数)，胜负以走棋方为准
+
+        局面不在残局库中（子力太多、没有对应文件、有易位权或可以吃过路兵）时返回 None。
+        """
+        if game.castling:
+            return None
+        occupied = game.occupancy[WHITE] | game.occupancy[BLACK]
+        if bin(occupied).count('1') > self.max_pieces:
+            return None
+        white_to_move = game.current_player == Player.WHITE
+        if game.ep_square is not None:
+            side = WHITE if white_to_move else BLACK
+            if PAWN_ATTACKS[1 - side][game.ep_square] & game.bitboards['P' if side == WHITE else 'p']:
+                return None
+        pieces = [(piece, sq) for piece, bb in game.bitboards.items() for sq in squares(bb)]
+        return self.probe_pieces(pieces, white_to_move)
+
+    def probe_pieces(self, pieces: List[Tuple[str, int]], white_to_move: bool) -> Optional[Result]:
+        """按棋子列表 [(棋子, 格子)] 查询局面"""
+        white = _side_signature(''.join(piece for piece, _sq in pieces if piece.isupper()))
+        black = _side_signature(''.join(piece for piece, _sq in pieces if piece.islower()))
+        if _is_insufficient(white, black):
+            return DRAW, 0
+
+        table = self._table(f"{white}v{black}")
+        if table is None:
+            # 黑方子力较强：翻转棋盘、交换颜色后查询
+            table = self._table(f"{black}v{white}")
+            if table is None:
+                return None
+            pieces = [(piece.swapcase(), sq ^ 56) for piece, sq in pieces]
+            white_to_move = not white_to_move
+
+        data, layout = table
+        index = _index(layout, pieces, white_to_move)
+        if index is None:
+            return None
+        byte = data[index]
+        if not byte:
+            return DRAW, 0
+        dtm = byte - 1
+        return (WIN if dtm & 1 else LOSS), dtm
+
+
+def _index(layout: _Layout, pieces: List[Tuple[str, int]], white_to_move: bool) -> Optional[int]:
+    """棋子列表在残局文件中的下标（两王相邻的非法局面为 None）"""
+    ordered = sorted(pieces, key=lambda item: (item[0].islower(),
+                                               _PIECE_ORDER.index(item[0].upper()), item[1]))
+    return layout.encode([sq for _piece, sq in ordered], WHITE if white_to_move else BLACK)
+
+
+def _attacks(piece: str, sq: int, occupied: int) -> int:
+    kind = piece.upper()
+    if kind == 'K':
+        return KING_ATTACKS[sq]
+    if kind == 'N':
+        return KNIGHT_ATTACKS[sq]
+    if kind == 'R':
+        return rook_attacks(sq, occupied)
+    if kind == 'B':
+        return bishop_attacks(sq, occupied)
+    if kind == 'Q':
+        return queen_attacks(sq, occupied)
+    return PAWN_ATTACKS[WHITE if piece == 'P' else BLACK][sq]
+
+
+class _Generator:
+    """单个残局文件的逆向分析"""
+
+    def __init__(self, white: str, black: str, subtables: Tablebase):
+        self.pieces = list(white) + list(black.lower())
+        self.colors = [WHITE] * len(white) + [BLACK] * len(black)
+        self.kings = (0, len(white))
+        self.layout = _Layout(white + black.lower())
+        self.subtables = subtables
+
+    def _attacked(self, target: int, by_color: int, sqs: List[int], occupied: int,
+                  skip: int = -1) -> bool:
+        """by_color 一方（不含被吃掉的 skip 号棋子）是否攻击 target"""
+        for i, piece in enumerate(self.pieces):
+            if i != skip and self.colors[i] == by_color and \
+                    _attacks(piece, sqs[i], occupied) >> target & 1:
+                return True
+        return False
+
+    def _is_legal(self, sqs: List[int], stm: int) -> bool:
+        """棋子不重叠、兵不在底线、不走棋的一方没有被将军"""
+        occupied = 0
+        for i, sq in enumerate(sqs):
+            if occupied >> sq & 1:
+                return False
+            if self.pieces[i] in 'Pp' and sq >> 3 in (0, 7):
+                return False
+            occupied |= 1 << sq
+        return not self._attacked(sqs[self.kings[1 - stm]], stm, sqs, occupied)
+
+    def _moves(self, sqs: List[int], stm: int) -> Iterator[Tuple[List[int], int, Optional[str], int]]:
+        """走棋方的全部合法走法，给出 (走后的格子, 被吃棋子序号或 -1, 升变棋子, 走子序号)"""
+        occupied = own = 0
+        for i, sq in enumerate(sqs):
+            occupied |= 1 << sq
+            if self.colors[i] == stm:
+                own |= 1 << sq
+        king = self.kings[stm]
+
+        for i, piece in enumerate(self.pieces):
+            if self.colors[i] != stm:
+                continue
+            sq = sqs[i]
+            if piece in 'Pp':
+                step = -8 if stm == WHITE else 8
+                targets = PAWN_ATTACKS[stm][sq] & occupied & ~own
+                one = sq + step
+                if not occupied >> one & 1:
+                    targets |= 1 << one
+                    two = one + step
+                    if sq >> 3 == (6 if stm == WHITE else 1) and not occupied >> two & 1:
+                        targets |= 1 << two
+            else:
+                targets = _attacks(piece, sq, occupied) & ~own
+
+            for to in squares(targets):
+                captured = sqs.index(to) if occupied >> to & 1 else -1
+                new_sqs = sqs[:]
+                new_sqs[i] = to
+                new_occupied = (occupied ^ (1 << sq)) | (1 << to)
+                if self._attacked(new_sqs[king], 1 - stm, new_sqs, new_occupied, captured):
+                    continue
+                if piece in 'Pp' and to >> 3 in (0, 7):
+                    for promotion in _PROMOTIONS:
+                        yield new_sqs, captured, promotion, i
+                else:
+                    yield new_sqs, captured, None, i
+
+    def _unmoves(self, sqs: List[int], stm: int) -> Iterator[List[int]]:
+        """表内（不吃子、不升变）能走到该局面的前一局面的格子"""
+        mover = 1 - stm
+        occupied = 0
+        for sq in sqs:
+            occupied |= 1 << sq
+        for i, piece in enumerate(self.pieces):
+            if self.colors[i] != mover:
+                continue
+            sq = sqs[i]
+            if piece == 'P':
+                origins = 0
+                if sq >> 3 <= 5 and not occupied >> (sq + 8) & 1:
+                    origins = 1 << (sq + 8)
+                    if sq >> 3 == 4 and not occupied >> (sq + 16) & 1:
+                        origins |= 1 << (sq + 16)
+            elif piece == 'p':
+                origins = 0
+                if sq >> 3 >= 2 and not occupied >> (sq - 8) & 1:
+                    origins = 1 << (sq - 8)
+                    if sq >> 3 == 3 and not occupied >> (sq - 16) & 1:
+                        origins |= 1 << (sq - 16)
+            else:
+                origins = _attacks(piece, sq, occupied) & ~occupied
+            for origin in squares(origins):
+                new_sqs = sqs[:]
+                new_sqs[i] = origin
+                yield new_sqs
+
+    def _probe_conversion(self, sqs: List[int], captured: int, promotion: Optional[str],
+                          mover: int, stm: int) -> Optional[Result]:
+        """吃子或升变后走到的子残局局面"""
+        pieces = []
+        for i, piece in enumerate(self.pieces):
+            if i == captured:
+                continue
+            if i == mover and promotion:
+                piece = promotion if piece.isupper() else promotion.lower()
+            pieces.append((piece, sqs[i]))
+        return self.subtables.probe_pieces(pieces, stm == WHITE)
+
+    def run(self, progress: Optional[Callable[[str], None]] = None) -> bytearray:
+        layout = self.layout
+        size = layout.size
+        values = bytearray(size)
+        remaining = bytearray(size)
+        # 各层待处理的局面：frontier 为已确定距离的局面，
+        # wins / losses 为子残局给出的候选胜局和"又一个走法导致失败"的事件
+        frontier: Dict[int, List[int]] = {}
+        wins: Dict[int, List[int]] = {}
+        losses: Dict[int, List[int]] = {}
+
+        for index in range(size):
+            sqs, stm = layout.decode(index)
+            # 非法局面，以及有多种规范写法时下标不是最小的那种，不参与分析
+            if not self._is_legal(sqs, stm) or layout.encode(sqs, stm) != index:
+                continue
+            # 对称的两个走法可能走到同一个规范局面：表内的后继局面只按不同的下标计数，
+            # 倒推时每个前驱局面也只减一次
+            successors = set()
+            conversions = 0
+            best_win = None
+            for new_sqs, captured, promotion, mover in self._moves(sqs, stm):
+                if captured < 0 and promotion is None:
+                    successors.add(layout.encode(new_sqs, 1 - stm))
+                    continue
+                conversions += 1
+                result = self._probe_conversion(new_sqs, captured, promotion, mover, 1 - stm)
+                if result is None:
+                    raise RuntimeError(f"Missing subtable for conversion from {self.pieces}")
+                outcome, dtm = result
+                if outcome == LOSS:
+                    if best_win is None or dtm + 1 < best_win:
+                        best_win = dtm + 1
+                elif outcome == WIN:
+                    losses.setdefault(dtm, []).append(index)
+            count = len(successors) + conversions
+            if not count:
+                if self._attacked(sqs[self.kings[stm]], 1 - stm, sqs,
+                                  sum(1 << sq for sq in sqs)):
+                    values[index] = 1
+                    frontier.setdefault(0, []).append(index)
+                continue
+            remaining[index] = count
+            if best_win is not None:
+                wins.setdefault(best_win, []).append(index)
+
+        level = 0
+        while frontier or wins or losses:
+            current = frontier.pop(level, [])
+            for index in wins.pop(level, []):
+                if not values[index]:
+                    values[index] = level + 1
+                    current.append(index)
+            following = []
+            for index in losses.pop(level, []):
+                if not values[index]:
+                    remaining[index] -= 1
+                    if not remaining[index]:
+                        values[index] = level + 2
+                        following.append(index)
+
+            for index in current:
+                sqs, stm = layout.decode(index)
+                predecessors = {layout.encode(prev_sqs, 1 - stm) for prev_sqs in self._unmoves(sqs, stm)
+                                if self._is_legal(prev_sqs, 1 - stm)}
+                for prev in predecessors:
+                    if values[prev]:
+                        continue
+                    if not level & 1:
+                        # 对方必败：走到这里的一方必胜
+                        values[prev] = level + 2
+                        following.append(prev)
+                    else:
+                        remaining[prev] -= 1
+                        if not remaining[prev]:
+                            values[prev] = level + 2
+                            following.append(prev)
+
+            if following:
+                frontier.setdefault(level + 1, []).extend(following)
+            if progress and current:
+                progress(f"  dtm {level:3d}: {len(current)} positions")
+            level += 1
+            if level > 254:
+                raise RuntimeError("Distance to mate does not fit in one byte")
+        return values
+
+
+def generate(name: str, directory: str = DEFAULT_DIRECTORY,
+             progress: Optional[Callable[[str], None]] = None) -> str:
+    """生成一个残局文件（先生成它所需的子残局），返回文件路径"""
+    white, black = parse_name(name)
+    path = os.path.join(directory, f"{white}v{black}{TABLE_SUFFIX}")
+    os.makedirs(directory, exist_ok=True)
+
+    # 吃子和升变得到的子残局
+    pieces = white + black.lower()
+    needed = set()
+    for i, piece in enumerate(pieces):
+        if piece in 'Kk':
+            continue
+        rest = pieces[:i] + pieces[i + 1:]
+        needed.add(rest)
+        if piece in 'Pp':
+            for promotion in _PROMOTIONS:
+                needed.add(rest + (promotion if piece == 'P' else promotion.lower()))
+    for material in sorted(needed, key=len):
+        sub_white = _side_signature(''.join(p for p in material if p.isupper()))
+        sub_black = _side_signature(''.join(p for p in material if p.islower()))
+        if _is_insufficient(sub_white, sub_black):
+            continue
+        if any(os.path.exists(os.path.join(directory, f"{a}v{b}{TABLE_SUFFIX}"))
+               for a, b in ((sub_white, sub_black), (sub_black, sub_white))):
+            continue
+        generate(f"{sub_white}v{sub_black}", directory, progress)
+
+    if progress:
+        progress(f"{white}v{black}:")
+    start = time.perf_counter()
+    subtables = Tablebase(directory)
+    try:
+        values = _Generator(white, black, subtables).run(progress)
+    finally:
+        subtables.close()
+
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(values)
+    os.replace(temp_path, path)
+    if progress:
+        progress(f"  written {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Chess endgame tablebase generator")
+    parser.add_argument('endings', nargs='*', help=f"endings to generate (default: {' '.join(DEFAULT_ENDINGS)})")
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help="tablebase directory")
+    parser.add_argument('--probe', metavar='FEN', help="probe a position instead of generating")
+    args = parser.parse_args(argv)
+
+    if args.probe:
+        tablebase = Tablebase(args.dir)
+        result = tablebase.probe(ChessLogic.from_fen(args.probe))
+        tablebase.close()
+        if result is None:
+            print("not in tablebase")
+            return 1
+        outcome, dtm = result
+        print({WIN: f"win, mate in {dtm} plies", LOSS: f"loss, mated in {dtm} plies",
+               DRAW: "draw"}[outcome])
+        return 0
+
+    try:
+        for name in args.endings or DEFAULT_ENDINGS:
+            generate(name, args.dir, print)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""国际象棋引擎的 UCI 协议前端
+
+通过标准输入/输出与 UCI 图形界面或对局工具（cutechess-cli、fastchess 等）通信，
+便于与其他引擎对弈、做棋力和速度的回归测试：
+    python -m games.chess.uci
+
+支持的命令：uci、isready、setoption、ucinewgame、position、go、stop、quit。
+go 支持 depth、movetime、wtime/btime/winc/binc/movestogo 和 infinite。
+搜索在后台线程中进行（stop 可随时打断），每完成一轮迭代加深输出一行
+info（depth、score、nodes、nps、time、pv）。
+"""
+
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .logic import ChessLogic, Player
+from .ai import ChessAI, DEFAULT_BOOK_PATH, DEFAULT_TABLEBASE_PATH, MATE_SCORE, MATE_BOUND, MAX_DEPTH
+from .move import move_name
+
+ENGINE_NAME = 'Mini Games Chess'
+ENGINE_AUTHOR = 'Mini Games Collection'
+MAX_THREADS = 64
+
+# 按棋钟分配时间时，假定还要走的步数和为网络延迟等保留的时间（毫秒）
+DEFAULT_MOVES_TO_GO = 30
+MOVE_OVERHEAD_MS = 50
+
+_GO_PARAMS = ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo')
+
+
+class UCIEngine:
+    """UCI 命令处理"""
+
+    def __init__(self, output: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            output: 输出一行文本，默认写到标准输出
+        """
+        self._output = output or (lambda line: print(line, flush=True))
+        self._output_lock = threading.Lock()
+        self.threads = 1
+        self.own_book = False
+        self.tablebase_path = DEFAULT_TABLEBASE_PATH
+        self.ai = self._create_ai()
+        self.game = ChessLogic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _create_ai(self) -> ChessAI:
+        return ChessAI(difficulty=4, workers=self.threads,
+                       book_path=DEFAULT_BOOK_PATH if self.own_book else None,
+                       tablebase_path=self.tablebase_path or None)
+
+    def send(self, line: str):
+        with self._output_lock:
+            self._output(line)
+
+    def handle(self, line: str) -> bool:
+        """处理一行命令，收到 quit 时返回 False"""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command = tokens[0]
+
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("option name OwnBook type check default false")
+            self.send(f"option name TablebasePath type string default {DEFAULT_TABLEBASE_PATH}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            self._set_option(tokens[1:])
+        elif command == 'ucinewgame':
+            self.stop()
+            self.ai.tt.clear()
+            self.ai.orderer.clear()
+            self.game = ChessLogic()
+        elif command == 'position':
+            self.stop()
+            self._set_position(tokens[1:])
+        elif command == 'go':
+            self.go(tokens[1:])
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.close()
+            return False
+        # 其余命令（debug、register、ponderhit 等）按协议忽略
+        return True
+
+    def _set_option(self, tokens: List[str]):
+        """setoption name <名称> [value <值>]"""
+        if 'name' not in tokens:
+            return
+        rest = tokens[tokens.index('name') + 1:]
+        if 'value' in rest:
+            name = ' '.join(rest[:rest.index('value')])
+            value = ' '.join(rest[rest.index('value') + 1:])
+        else:
+            name, value = ' '.join(rest), ''
+
+        self.stop()
+        key = name.lower()
+        if key == 'threads':
+            try:
+                self.threads = max(1, min(MAX_THREADS, int(value)))
+            except ValueError:
+                return
+            self.ai.workers = self.threads
+        elif key == 'ownbook':
+            self.own_book = value.lower() == 'true'
+            self.ai.close()
+            self.ai = self._create_ai()
+        elif key == 'tablebasepath':
+            self.tablebase_path = value
+            self.ai.close()
+            self.ai = self._create_ai()
+
+    def _set_position(self, tokens: List[str]):
+        """position startpos|fen <FEN> [moves <走法>...]"""
+        if not tokens:
+            return
+        moves_index = tokens.index('moves') if 'moves' in tokens else len(tokens)
+        try:
+            if tokens[0] == 'startpos':
+                game = ChessLogic()
+            elif tokens[0] == 'fen':
+                game = ChessLogic.from_fen(' '.join(tokens[1:moves_index]))
+            else:
+                return
+        except ValueError:
+            self.send("info string invalid fen")
+            return
+
+        for name in tokens[moves_index + 1:]:
+            move = next((m for m in game.generate_moves() if move_name(m) == name), None)
+            if move is None:
+                self.send(f"info string illegal move {name}")
+                break
+            game.push(move)
+        self.game = game
+
+    def go(self, tokens: List[str]):
+        """开始搜索，结束时输出 bestmove"""
+        self.stop()
+        params: Dict[str, int] = {}
+        for i, token in enumerate(tokens[:-1]):
+            if token in _GO_PARAMS:
+                try:
+                    params[token] = int(tokens[i + 1])
+                except ValueError:
+                    pass
+        infinite = 'infinite' in tokens
+
+        game = self.game.clone()
+        depth = max(1, min(MAX_DEPTH, params.get('depth', MAX_DEPTH)))
+        budget = None if infinite else self._time_budget(params, game.current_player == Player.WHITE)
+        ai = self.ai
+        ai.stop_check = self._stop.is_set
+        ai.on_iteration = self._send_info
+        self._stop.clear()
+
+        def run():
+            move = ai.search(game, float('inf') if budget is None else budget, depth)
+            # infinite 模式下必须等到 stop 才能给出结果
+            if infinite:
+                self._stop.wait()
+            self.send(f"bestmove {move_name(move) if move is not None else '0000'}")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _time_budget(params: Dict[str, int], white: bool) -> Optional[float]:
+        """本步的思考时间（毫秒），没有任何时间限制时返回 None"""
+        if 'movetime' in params:
+            return max(1, params['movetime'])
+        time_left = params.get('wtime' if white else 'btime')
+        if time_left is None:
+            return None
+        increment = params.get('winc' if white else 'binc', 0)
+        moves_to_go = max(1, params.get('movestogo', DEFAULT_MOVES_TO_GO))
+        budget = time_left / moves_to_go + increment * 3 / 4
+        return max(1, min(budget, time_left - MOVE_OVERHEAD_MS))
+
+    def _send_info(self, depth: int, score: int, nodes: int, elapsed: float, pv: List[int]):
+        if abs(score) >= MATE_BOUND:
+            moves = (MATE_SCORE - abs(score) + 1) // 2
+            score_text = f"mate {moves if score > 0 else -moves}"
+        else:
+            score_text = f"cp {score}"
+        nps = int(nodes / elapsed) if elapsed > 0 else 0
+        self.send(f"info depth {depth} score {score_text} nodes {nodes} nps {nps} "
+                  f"time {int(elapsed * 1000)} pv {' '.join(move_name(move) for move in pv)}")
+
+    def stop(self):
+        """停止当前搜索并等待 bestmove 输出"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.ai.close()
+
+
+def main() -> int:
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    else:
+        engine.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,12 +6,12 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, GLib
 
 import sys
-import threading
 sys.path.insert(0, str(__file__).rsplit('/', 3)[0])
 from i18n import _
 
 from .logic import ChessLogic, Player, GameState
 from .ai import ChessAI
+from ..search.worker import EngineWorker
 
 
 class GameMode:
@@ -33,9 +33,12 @@ class ChessUI:
         self.selected = None
         self.valid_moves = []
         self.mode = GameMode.PVP
-        self.ai = ChessAI(difficulty=2)
+        self.difficulty = 2
+        # AI 在常驻的工作进程中搜索，避免与 GTK 主循环争抢 GIL
+        self.engine = EngineWorker(ChessAI, ChessLogic)
         self.player_color = Player.WHITE  # 玩家颜色
         self.ai_thinking = False
+        self._ai_request = 0  # 当前AI请求编号，用于丢弃过期结果
         self.animating = False  # 动画进行中
 
         self.cells = []
@@ -78,6 +81,7 @@ class ChessUI:
         self.difficulty_combo.append_text(_("easy"))
         self.difficulty_combo.append_text(_("medium"))
         self.difficulty_combo.append_text(_("hard"))
+        self.difficulty_combo.append_text(_("expert"))
         self.difficulty_combo.set_active(1)
         self.difficulty_combo.connect("changed", self._on_difficulty_changed)
         self.difficulty_box.append(self.difficulty_combo)
@@ -165,16 +169,23 @@ class ChessUI:
 
     def _on_difficulty_changed(self, combo: Gtk.ComboBoxText):
         """难度切换"""
-        self.ai.difficulty = combo.get_active() + 1
+        self.difficulty = combo.get_active() + 1
         self.reset()
 
     def _on_undo_clicked(self, button: Gtk.Button):
         """悔棋按钮点击"""
-        if self.ai_thinking or self.logic.is_game_over() or self.animating:
+        if self.logic.is_game_over() or self.animating:
             return
 
-        # PVE模式下悔两步（玩家和AI各一步）
-        if self.mode == GameMode.PVE:
+        if self.ai_thinking:
+            # AI 思考中：取消搜索，只悔玩家刚走的一步
+            self.engine.cancel()
+            self.ai_thinking = False
+            if self.logic.can_undo():
+                self.logic.undo()
+        elif self.mode == GameMode.PVE:
+            # PVE模式下悔两步（玩家和AI各一步），后台思考的局面随之作废
+            self.engine.cancel()
             if self.logic.can_undo():
                 self.logic.undo()
             if self.logic.can_undo():
@@ -329,18 +340,20 @@ class ChessUI:
         """AI执行移动"""
         self.ai_thinking = True
         self.status_label.set_label(_("ai_thinking"))
-        self.undo_btn.set_sensitive(False)
-
-        def do_ai_move():
-            game_clone = self.logic.clone()
-            move = self.ai.get_best_move(game_clone)
-            GLib.idle_add(self._apply_ai_move, move)
+        self._ai_request += 1
+        request = self._ai_request
 
-        thread = threading.Thread(target=do_ai_move, daemon=True)
-        thread.start()
+        # 结果在工作进程的监听线程中返回，通过 idle_add 切回主线程
+        self.engine.search(
+            self.logic.snapshot(), self.difficulty,
+            lambda move: GLib.idle_add(self._apply_ai_move, move, request)
+        )
 
-    def _apply_ai_move(self, move):
+    def _apply_ai_move(self, move, request: int):
         """应用AI移动"""
+        # 已取消（悔棋、新游戏）的搜索结果直接丢弃
+        if not self.ai_thinking or request != self._ai_request:
+            return False
         self.ai_thinking = False
         if move:
             (from_pos, to_pos) = move
@@ -352,6 +365,9 @@ class ChessUI:
 
             # 执行逻辑移动
             self.logic.make_move(from_row, from_col, to_row, to_col)
+            # 玩家思考期间在后台猜测其应着并继续搜索
+            if not self.logic.is_game_over():
+                self.engine.ponder(self.logic.snapshot(), self.difficulty)
 
             # 播放动画
             def on_animation_done():
@@ -369,7 +385,7 @@ class ChessUI:
         """更新显示"""
         # 更新悔棋按钮状态
         self.undo_btn.set_sensitive(
-            self.logic.can_undo() and not self.ai_thinking and not self.animating
+            self.logic.can_undo() and not self.animating
         )
 
         # 获取上一步移动位置
@@ -422,7 +438,10 @@ class ChessUI:
             body = _("white_wins") if winner == Player.WHITE else _("black_wins")
         else:
             heading = _("game_over")
-            body = _("stalemate")
+            if self.logic.state == GameState.DRAW:
+                body = _("draw_fifty_moves") if self.logic.is_fifty_moves() else _("draw_repetition")
+            else:
+                body = _("stalemate")
 
         self.status_label.set_label(body)
 
@@ -434,8 +453,14 @@ class ChessUI:
         if self.on_game_over:
             self.on_game_over()
 
+    def stop(self):
+        """离开游戏页面：取消搜索和后台思考，结束 AI 工作进程"""
+        self.ai_thinking = False
+        self.engine.close()
+
     def reset(self):
         """重置游戏"""
+        self.engine.cancel()
         self.logic.reset()
         self.selected = None
         self.valid_moves = []
@@ -0,0 +1,22 @@
+"""国际象棋 Zobrist 哈希键
+
+每个 (棋子, 格子)、走棋方、易位权和过路兵所在列各对应一个 64 位随机数，
+局面哈希是所有成立特征对应随机数的异或。走子时只需异或变化的部分即可增量更新。
+随机数用固定种子生成，保证不同进程、不同次运行之间哈希一致。
+"""
+
+import random
+
+_rng = random.Random(0x5EED_C4E5)
+
+# ZOBRIST_PIECES[piece][sq]
+ZOBRIST_PIECES = {
+    piece: [_rng.getrandbits(64) for _ in range(64)]
+    for piece in 'PNBRQKpnbrqk'
+}
+# 黑方走棋时异或
+ZOBRIST_SIDE = _rng.getrandbits(64)
+# 易位权：白短、白长、黑短、黑长
+ZOBRIST_CASTLING = [_rng.getrandbits(64) for _ in range(4)]
+# 过路兵目标格所在列
+ZOBRIST_EP = [_rng.getrandbits(64) for _ in range(8)]
@@ -2,13 +2,14 @@
 
 解耦设计：
 - logic.py: 游戏逻辑
-- ai.py: AI引擎
+- tables.py: 走法预计算表（马腿、象眼、九宫、兵）
+- zobrist.py: Zobrist 哈希键
+- ai.py: AI引擎（迭代加深 Alpha-Beta + 渴望窗口 + 置换表）
 - ui.py: GTK/Adwaita UI
 """
 
 from .logic import ChineseChessLogic, Player, PieceType, GameState, Piece
 from .ai import ChineseChessAI
-from .ui import ChineseChessUI, GameMode
 
 
 class ChineseChess:
@@ -17,6 +18,7 @@ class ChineseChess:
     def __init__(self, score_manager):
         self.score_manager = score_manager
         self.logic = ChineseChessLogic()
+        from .ui import ChineseChessUI
         self.ui = ChineseChessUI(self.logic, on_game_over=self._on_game_over)
 
     def get_widget(self):
@@ -26,7 +28,7 @@ class ChineseChess:
         self.ui.reset()
 
     def stop(self):
-        pass
+        self.ui.stop()
 
     def _on_game_over(self):
         winner = self.logic.get_winner()
@@ -34,5 +36,13 @@ class ChineseChess:
             self.score_manager.record_score("chinese_chess", self.logic.move_count)
 
 
+def __getattr__(name):
+    # UI 依赖 GTK，按需导入，使 logic/ai/perft 等可以在无界面环境中使用
+    if name in ('ChineseChessUI', 'GameMode'):
+        from . import ui
+        return getattr(ui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ['ChineseChess', 'ChineseChessLogic', 'ChineseChessAI',
            'Player', 'PieceType', 'GameState', 'Piece', 'GameMode']
@@ -1,169 +1,267 @@
 """中国象棋AI模块"""
 
 import random
-import threading
-from typing import Optional, Tuple, List
-from .logic import ChineseChessLogic, Player, GameState, BOARD_ROWS, BOARD_COLS
+import time
+from typing import Optional, Tuple, List, Callable
+from .logic import ChineseChessLogic, RED, CODE_VALUES, move_to_tuple
+from ..search import TranspositionTable, MoveOrderer, EXACT, LOWER, UPPER
+
+
+MATE_SCORE = 100000
+MAX_DEPTH = 64
+INFINITY = MATE_SCORE + 1
+# 超过这个分数的是将杀分（MATE_SCORE - 距根节点的层数）
+MATE_BOUND = MATE_SCORE - 1000
+# 长将、长捉判负的分数：高于任何子力差，但不算将杀（不终止迭代加深）
+BAN_SCORE = MATE_BOUND - 1
+# 渴望窗口：从 ASPIRATION_MIN_DEPTH 层起，以上一轮的分数为中心、
+# ASPIRATION_WINDOW 为半宽搜索，落在窗口外时放宽窗口重搜
+ASPIRATION_MIN_DEPTH = 3
+ASPIRATION_WINDOW = 30
 
 
 class ChineseChessAI:
-    """中国象棋AI - Minimax + Alpha-Beta"""
+    """中国象棋AI - 迭代加深负极大值搜索（Alpha-Beta + 渴望窗口） + 置换表"""
 
     def __init__(self, difficulty: int = 2):
         self.difficulty = difficulty
-        # 降低搜索深度，中国象棋分支因子大
-        self._depth_map = {1: 1, 2: 2, 3: 3}
+        # 难度对应的最大搜索深度和默认思考时间（毫秒）；中国象棋分支因子大，中等难度只搜两层
+        self._depth_map = {1: 1, 2: 2, 3: MAX_DEPTH}
+        self._time_map = {1: 0, 2: 1000, 3: 2000}
+        # 置换表在多次走棋之间保留
+        self.tt = TranspositionTable()
+        self.orderer = MoveOrderer()
+        self.nodes = 0
+        self.completed_depth = 0
+        self._deadline = float('inf')
+        self._stopped = False
+        # 外部停止请求（例如工作进程中的取消），返回 True 时尽快结束搜索
+        self.stop_check: Optional[Callable[[], bool]] = None
 
     @property
     def search_depth(self) -> int:
         return self._depth_map.get(self.difficulty, 2)
 
-    def get_best_move(self, game: ChineseChessLogic) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
-        """获取最佳移动"""
-        moves = self._get_all_moves_fast(game)
+    @property
+    def time_budget_ms(self) -> int:
+        return self._time_map.get(self.difficulty, 1000)
+
+    def get_best_move(self, game: ChineseChessLogic,
+                      time_budget_ms: Optional[int] = None) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """获取最佳移动
+
+        从深度 1 开始迭代加深，直到达到难度的最大深度或用完时间预算，
+        返回最后一轮完成的搜索结果（超时的一轮中已证明更好的走法也会采用）。
+
+        Args:
+            game: 游戏状态（搜索过程中会被临时修改，结束后复原）
+            time_budget_ms: 思考时间预算（毫秒），为 None 时使用难度的默认值
+        """
+        # 不经过搜索的走法节点数为 0，避免沿用上一次搜索的统计
+        self.nodes = 0
+        self.completed_depth = 0
+        moves = game.generate_moves()
         if not moves:
             return None
 
         # 难度1：随机选择
         if self.difficulty == 1:
-            return random.choice(moves)
+            return move_to_tuple(random.choice(moves))
+
+        if len(moves) == 1:
+            return move_to_tuple(moves[0])
+
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        self._deadline = time.perf_counter() + time_budget_ms / 1000
+        self._stopped = False
+        self.tt.new_search()
+        self.orderer.new_search()
 
-        is_maximizing = game.current_player == Player.RED
         best_move = None
-        best_score = float('-inf') if is_maximizing else float('inf')
-
-        # 移动排序：优先考虑吃子移动
-        moves = self._order_moves(game, moves)
-
-        for (from_pos, to_pos) in moves:
-            # 快速执行移动（不验证）
-            captured = self._make_move_fast(game, from_pos, to_pos)
-
-            score = self._minimax(
-                game,
-                self.search_depth - 1,
-                float('-inf'),
-                float('inf'),
-                not is_maximizing
-            )
-
-            # 撤销移动
-            self._undo_move_fast(game, from_pos, to_pos, captured)
-
-            if is_maximizing:
-                if score > best_score:
-                    best_score = score
-                    best_move = (from_pos, to_pos)
+        score = 0
+        for depth in range(1, self.search_depth + 1):
+            if depth >= ASPIRATION_MIN_DEPTH and abs(score) < MATE_BOUND:
+                move, score = self._search_aspiration(game, moves, depth, best_move, score)
             else:
-                if score < best_score:
-                    best_score = score
-                    best_move = (from_pos, to_pos)
+                move, score = self._search_root(game, moves, depth, best_move, -INFINITY, INFINITY)
+            if move is not None:
+                best_move = move
+            if self._stopped:
+                break
+            self.completed_depth = depth
+            # 已找到将杀，不必继续加深
+            if abs(score) >= MATE_BOUND:
+                break
+
+        return move_to_tuple(best_move if best_move is not None else moves[0])
+
+    def predict_move(self, game: ChineseChessLogic) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """猜测走棋方的走法（后台思考时用来预测对手的应着）
+
+        优先取置换表中记录的最佳走法，没有时用十分之一的时间预算搜索一次。
+        """
+        move = self.tt.get_move(game.hash)
+        if move is not None and move in game.generate_moves():
+            return move_to_tuple(move)
+        return self.get_best_move(game, self.time_budget_ms // 10)
+
+    def _search_aspiration(self, game: ChineseChessLogic, moves: List[int], depth: int,
+                           pv_move: Optional[int], score: int) -> Tuple[Optional[int], int]:
+        """以上一轮分数为中心的渴望窗口搜索，分数落在窗口外时向失败的一侧放宽后重搜"""
+        delta = ASPIRATION_WINDOW
+        alpha, beta = score - delta, score + delta
+        while True:
+            move, result = self._search_root(game, moves, depth, pv_move, alpha, beta)
+            if self._stopped or alpha < result < beta:
+                return move, result
+            delta *= 4
+            if result <= alpha:
+                alpha = -INFINITY if result <= -MATE_BOUND else max(-INFINITY, result - delta)
+            else:
+                beta = INFINITY if result >= MATE_BOUND else min(INFINITY, result + delta)
+                pv_move = move
+
+    def _search_root(self, game: ChineseChessLogic, moves: List[int], depth: int,
+                     pv_move: Optional[int], alpha: int, beta: int) -> Tuple[Optional[int], int]:
+        """搜索根节点，返回 (最佳走法, 走棋方视角的分数)
+
+        最佳走法只取分数超过 alpha 的走法：整轮都低于窗口（fail low）时为 None。
+        时间用完时返回本轮已完整搜索过的走法中最好的一个。
+        """
+        alpha_orig = alpha
+        best_move = None
+        best_score = -INFINITY
+
+        # 移动排序：上一轮的最佳走法最先搜索
+        moves = self._order_moves(game, moves, 0, pv_move or self.tt.get_move(game.hash))
+
+        for move in moves:
+            game.push(move)
+            score = -self._negamax(game, depth - 1, 1, -beta, -alpha)
+            game.pop()
+            if self._stopped:
+                break
 
-        return best_move
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    best_move = move
+                    alpha = score
+                    if alpha >= beta:
+                        break
 
-    def _minimax(self, game: ChineseChessLogic, depth: int, alpha: float,
-                 beta: float, is_maximizing: bool) -> int:
-        """Minimax + Alpha-Beta"""
-        if depth == 0:
-            return self._evaluate_fast(game)
+        if not self._stopped:
+            self._store(game.hash, depth, alpha_orig, beta, best_score, best_move, 0)
+        return best_move, best_score
 
-        moves = self._get_all_moves_fast(game)
+    def _poll_stop(self):
+        """检查时间预算和外部停止请求"""
+        if time.perf_counter() >= self._deadline or (self.stop_check and self.stop_check()):
+            self._stopped = True
+
+    def _negamax(self, game: ChineseChessLogic, depth: int, ply: int, alpha: int, beta: int) -> int:
+        """负极大值搜索 + Alpha-Beta（分数以走棋方视角）"""
+        self.nodes += 1
+        if not self.nodes & 127:
+            self._poll_stop()
+        if self._stopped:
+            return 0
+        # 重复局面：按长将、长捉规则判负，其余按和棋处理，不再展开
+        if game.is_repetition():
+            _verdict, loser = game.judge_repetition()
+            if loser is None:
+                return 0
+            return -BAN_SCORE if loser == game.side else BAN_SCORE
+
+        if depth <= 0:
+            # 评估分随走子增量更新（红方视角）
+            return game.score if game.side == RED else -game.score
+
+        key = game.hash
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            _key, entry_depth, bound, score, tt_move, _gen = entry
+            if entry_depth >= depth:
+                score = _score_from_tt(score, ply)
+                if bound == EXACT:
+                    return score
+                if bound == LOWER and score >= beta:
+                    return score
+                if bound == UPPER and score <= alpha:
+                    return score
+
+        moves = game.generate_moves()
         if not moves:
-            # 无合法移动，检查是否被将死
-            if game.is_in_check(game.current_player):
-                return -100000 if is_maximizing else 100000
-            return 0  # 和棋
-
-        if is_maximizing:
-            max_eval = float('-inf')
-            for (from_pos, to_pos) in moves:
-                captured = self._make_move_fast(game, from_pos, to_pos)
-                eval_score = self._minimax(game, depth - 1, alpha, beta, False)
-                self._undo_move_fast(game, from_pos, to_pos, captured)
-
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            return max_eval
+            # 无合法移动：被将死判负，否则按和棋处理
+            return -MATE_SCORE + ply if game.is_in_check(game.current_player) else 0
+
+        moves = self._order_moves(game, moves, ply, tt_move)
+        alpha_orig = alpha
+        best_score = -INFINITY
+        best_move = None
+
+        for move in moves:
+            captured = game.push(move)
+            score = -self._negamax(game, depth - 1, ply + 1, -beta, -alpha)
+            game.pop()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not captured:
+                            self.orderer.record_cutoff(move, ply, depth)
+                        break
+
+        self._store(key, depth, alpha_orig, beta, best_score, best_move, ply)
+        return best_score
+
+    def _store(self, key: int, depth: int, alpha: int, beta: int, score: int,
+               move: Optional[int], ply: int):
+        """按分数相对搜索窗口的位置确定边界类型，存入置换表"""
+        if score <= alpha:
+            bound = UPPER
+        elif score >= beta:
+            bound = LOWER
         else:
-            min_eval = float('inf')
-            for (from_pos, to_pos) in moves:
-                captured = self._make_move_fast(game, from_pos, to_pos)
-                eval_score = self._minimax(game, depth - 1, alpha, beta, True)
-                self._undo_move_fast(game, from_pos, to_pos, captured)
-
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            return min_eval
-
-    def _get_all_moves_fast(self, game: ChineseChessLogic) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
-        """快速获取所有合法移动"""
-        moves = []
-        player = game.current_player
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = game.board[row][col]
-                if piece and piece.color == player:
-                    for move in game.get_valid_moves(row, col):
-                        moves.append(((row, col), move))
-        return moves
-
-    def _order_moves(self, game: ChineseChessLogic,
-                     moves: List[Tuple[Tuple[int, int], Tuple[int, int]]]) -> List:
-        """移动排序（吃子优先）"""
-        def score_move(move):
-            to_pos = move[1]
-            target = game.board[to_pos[0]][to_pos[1]]
+            bound = EXACT
+        self.tt.store(key, depth, bound, _score_to_tt(score, ply), move)
+
+    def _order_moves(self, game: ChineseChessLogic, moves: List[int], ply: int,
+                     tt_move: Optional[int] = None) -> List[int]:
+        """移动排序：置换表走法 > 吃子（MVV-LVA） > 杀手走法 > 历史启发"""
+        squares = game.squares
+        capture_scores = []
+        for move in moves:
+            target = squares[move & 127]
             if target:
-                return target.value
-            return 0
+                # 将/帅的价值过大，进攻方价值封顶以保证吃子分数为正
+                attacker = min(CODE_VALUES[squares[move >> 7]], 99)
+                capture_scores.append(CODE_VALUES[target] * 100 - attacker)
+            else:
+                capture_scores.append(0)
+        return self.orderer.order(moves, ply, tt_move, capture_scores)
 
-        return sorted(moves, key=score_move, reverse=True)
-
-    def _make_move_fast(self, game: ChineseChessLogic,
-                        from_pos: Tuple[int, int],
-                        to_pos: Tuple[int, int]):
-        """快速执行移动（不验证，返回被吃棋子）"""
-        piece = game.board[from_pos[0]][from_pos[1]]
-        captured = game.board[to_pos[0]][to_pos[1]]
-
-        game.board[to_pos[0]][to_pos[1]] = piece
-        game.board[from_pos[0]][from_pos[1]] = None
-        game.current_player = game.current_player.opposite()
-
-        return captured
-
-    def _undo_move_fast(self, game: ChineseChessLogic,
-                        from_pos: Tuple[int, int],
-                        to_pos: Tuple[int, int],
-                        captured):
-        """撤销移动"""
-        piece = game.board[to_pos[0]][to_pos[1]]
-        game.board[from_pos[0]][from_pos[1]] = piece
-        game.board[to_pos[0]][to_pos[1]] = captured
-        game.current_player = game.current_player.opposite()
-
-    def _evaluate_fast(self, game: ChineseChessLogic) -> int:
-        """快速评估局面"""
-        score = 0
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = game.board[row][col]
-                if piece:
-                    value = piece.value
-                    # 过河兵加分
-                    if piece.piece_type.value == 'soldier':
-                        if piece.color == Player.RED and row < 5:
-                            value += 20
-                        elif piece.color == Player.BLACK and row > 4:
-                            value += 20
-
-                    if piece.color == Player.RED:
-                        score += value
-                    else:
-                        score -= value
-
-        return score
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """将杀分存入置换表时改为相对当前节点的距离，使其与到达该局面的路径无关"""
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    """从置换表取出的将杀分换算回相对根节点的距离"""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
@@ -1,12 +1,19 @@
 """中国象棋游戏逻辑模块"""
 
 from enum import Enum
-from typing import Optional, List, Tuple
+from typing import Optional, List, Dict, Set, Tuple
+
+from .tables import (
+    GENERAL_MOVES, ADVISOR_MOVES, ELEPHANT_MOVES, HORSE_MOVES, SOLDIER_MOVES, RAYS,
+    HORSE_ATTACKS, SOLDIER_ATTACKS,
+)
+from .zobrist import ZOBRIST_PIECES, ZOBRIST_SIDE
 
 
 # 棋盘尺寸
 BOARD_COLS = 9
 BOARD_ROWS = 10
+BOARD_SIZE = BOARD_ROWS * BOARD_COLS
 
 
 class Player(Enum):
@@ -35,6 +42,7 @@ class GameState(Enum):
     RED_WINS = 1
     BLACK_WINS = 2
     STALEMATE = 3
+    DRAW = 4  # 重复局面且双方都不违例（或都违例）
 
 
 # 棋子字符
@@ -55,6 +63,18 @@ PIECE_CHARS = {
     (Player.BLACK, PieceType.SOLDIER): '卒',
 }
 
+# 快照中使用的棋子字母（红方大写，黑方小写）
+PIECE_LETTERS = {
+    PieceType.GENERAL: 'k',
+    PieceType.ADVISOR: 'a',
+    PieceType.ELEPHANT: 'b',
+    PieceType.HORSE: 'n',
+    PieceType.CHARIOT: 'r',
+    PieceType.CANNON: 'c',
+    PieceType.SOLDIER: 'p',
+}
+LETTER_PIECES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
 # 棋子价值
 PIECE_VALUES = {
     PieceType.GENERAL: 10000,
@@ -65,10 +85,70 @@ PIECE_VALUES = {
     PieceType.CANNON: 45,
     PieceType.SOLDIER: 10,
 }
+# 过河兵的加分
+SOLDIER_CROSSED_BONUS = 20
+
+# 棋盘上的棋子编码：低 3 位为兵种，黑方再加 BLACK_FLAG，0 为空格。
+# 格子编号 sq = row * BOARD_COLS + col
+EMPTY = 0
+GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT, CANNON, SOLDIER = range(1, 8)
+BLACK_FLAG = 8
+# 走棋方编号（棋子编码 >> 3）
+RED, BLACK = 0, 1
+
+PIECE_TYPES = (None, PieceType.GENERAL, PieceType.ADVISOR, PieceType.ELEPHANT,
+               PieceType.HORSE, PieceType.CHARIOT, PieceType.CANNON, PieceType.SOLDIER)
+TYPE_CODES = {piece_type: code for code, piece_type in enumerate(PIECE_TYPES) if piece_type}
+
+# 按棋子编码索引的价值（空格为 0）
+CODE_VALUES = [0] * 16
+for _code in range(1, 8):
+    CODE_VALUES[_code] = CODE_VALUES[_code | BLACK_FLAG] = PIECE_VALUES[PIECE_TYPES[_code]]
+
+# 棋子在每个格子上的评估分（红方视角：红方为正，黑方为负），
+# 局面评估即所有棋子分数之和，走子时增量更新
+SQUARE_SCORES = [[0] * BOARD_SIZE for _ in range(16)]
+for _code in range(1, 8):
+    for _sq in range(BOARD_SIZE):
+        _row = _sq // BOARD_COLS
+        _value = CODE_VALUES[_code]
+        SQUARE_SCORES[_code][_sq] = _value + (SOLDIER_CROSSED_BONUS if _code == SOLDIER and _row < 5 else 0)
+        SQUARE_SCORES[_code | BLACK_FLAG][_sq] = -(
+            _value + (SOLDIER_CROSSED_BONUS if _code == SOLDIER and _row > 4 else 0))
+
+# 重复局面的裁决
+REPETITION_DRAW = 0   # 和棋
+REPETITION_CHECK = 1  # 长将判负
+REPETITION_CHASE = 2  # 长捉判负
+
+# 走法标志：将军、捉子
+_GIVES_CHECK = 1
+_CHASES = 2
+# 判断捉子时比较兵种大小：车 > 马、炮 > 士、象、兵
+_CHASE_RANKS = (0, 0, 1, 1, 2, 3, 2, 1)
+# 走法标志缓存的最大条目数
+_FLAG_CACHE_LIMIT = 1 << 16
+
+_INITIAL_BACK_RANK = (CHARIOT, HORSE, ELEPHANT, ADVISOR, GENERAL, ADVISOR, ELEPHANT, HORSE, CHARIOT)
+
+
+def piece_code(piece_type: PieceType, color: Player) -> int:
+    """Piece 对应的棋子编码"""
+    return TYPE_CODES[piece_type] | (BLACK_FLAG if color == Player.BLACK else 0)
+
+
+def encode_move(from_sq: int, to_sq: int) -> int:
+    """走法打包为整数：起点格在高位，终点格在低 7 位"""
+    return from_sq << 7 | to_sq
+
+
+def move_to_tuple(move: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """转换为 ((起点行, 列), (终点行, 列))"""
+    return divmod(move >> 7, BOARD_COLS), divmod(move & 127, BOARD_COLS)
 
 
 class Piece:
-    """棋子类"""
+    """棋子类（供 UI 显示，棋盘内部使用整数编码）"""
 
     def __init__(self, piece_type: PieceType, color: Player):
         self.piece_type = piece_type
@@ -86,252 +166,414 @@ class Piece:
         return f"Piece({self.piece_type.value}, {self.color.value})"
 
 
+# 每种棋子编码对应的 Piece 对象（只读，多处共享）
+PIECE_VIEWS: List[Optional[Piece]] = [None] * 16
+for _code in range(1, 8):
+    PIECE_VIEWS[_code] = Piece(PIECE_TYPES[_code], Player.RED)
+    PIECE_VIEWS[_code | BLACK_FLAG] = Piece(PIECE_TYPES[_code], Player.BLACK)
+
+
 class ChineseChessLogic:
-    """中国象棋逻辑类"""
+    """中国象棋逻辑类
+
+    squares 是 90 个格子的整数数组（棋子编码见上），piece_squares 是双方
+    棋子所在格的集合，general_squares 是双方将/帅所在格，三者通过
+    _put_piece / push / pop 同步修改；score（局面评估分）和 hash（Zobrist
+    哈希）也随走子增量更新。push / pop 同时维护走子栈和重复局面计数，
+    搜索中的合法性检查只用不记历史的 _make / _unmake。get_piece 返回的 Piece 只用于显示。
+    """
 
     def __init__(self):
         self.reset()
 
     def reset(self):
         """重置游戏"""
-        self.board: List[List[Optional[Piece]]] = [
-            [None] * BOARD_COLS for _ in range(BOARD_ROWS)
-        ]
-        self.current_player = Player.RED
+        self.squares: List[int] = [EMPTY] * BOARD_SIZE
+        self.piece_squares: List[Set[int]] = [set(), set()]  # [红方, 黑方]
+        self.general_squares: List[Optional[int]] = [None, None]  # [帅, 将] 所在格
+        self.score = 0  # 红方视角的评估分
+        self.hash = 0  # Zobrist 哈希，随走子增量更新
+        self.side = RED  # 走棋方（RED / BLACK）
         self.state = GameState.PLAYING
+        self.repetition_verdict: Optional[int] = None  # 因重复局面结束时的裁决
         self.move_count = 0
         self.captured_red: List[Piece] = []
         self.captured_black: List[Piece] = []
         self.move_history: List[dict] = []  # 移动历史记录
+        # 走子栈：(走子前的哈希, 走法, 被吃棋子, 换下的重复计数表)
+        self._stack: List[tuple] = []
+        # 重复局面计数：哈希 -> 自上次不可逆走法以来出现的次数（不含当前局面）
+        self._repetitions: Dict[int, int] = {}
+        # (哈希, 走法) -> 走法标志，裁决重复局面时使用
+        self._flag_cache: Dict[Tuple[int, int], int] = {}
         self._setup_board()
 
     def _setup_board(self):
         """初始化棋盘"""
-        # 黑方（顶部）
-        self.board[0][0] = Piece(PieceType.CHARIOT, Player.BLACK)
-        self.board[0][1] = Piece(PieceType.HORSE, Player.BLACK)
-        self.board[0][2] = Piece(PieceType.ELEPHANT, Player.BLACK)
-        self.board[0][3] = Piece(PieceType.ADVISOR, Player.BLACK)
-        self.board[0][4] = Piece(PieceType.GENERAL, Player.BLACK)
-        self.board[0][5] = Piece(PieceType.ADVISOR, Player.BLACK)
-        self.board[0][6] = Piece(PieceType.ELEPHANT, Player.BLACK)
-        self.board[0][7] = Piece(PieceType.HORSE, Player.BLACK)
-        self.board[0][8] = Piece(PieceType.CHARIOT, Player.BLACK)
-        self.board[2][1] = Piece(PieceType.CANNON, Player.BLACK)
-        self.board[2][7] = Piece(PieceType.CANNON, Player.BLACK)
-        for col in [0, 2, 4, 6, 8]:
-            self.board[3][col] = Piece(PieceType.SOLDIER, Player.BLACK)
-
-        # 红方（底部）
-        self.board[9][0] = Piece(PieceType.CHARIOT, Player.RED)
-        self.board[9][1] = Piece(PieceType.HORSE, Player.RED)
-        self.board[9][2] = Piece(PieceType.ELEPHANT, Player.RED)
-        self.board[9][3] = Piece(PieceType.ADVISOR, Player.RED)
-        self.board[9][4] = Piece(PieceType.GENERAL, Player.RED)
-        self.board[9][5] = Piece(PieceType.ADVISOR, Player.RED)
-        self.board[9][6] = Piece(PieceType.ELEPHANT, Player.RED)
-        self.board[9][7] = Piece(PieceType.HORSE, Player.RED)
-        self.board[9][8] = Piece(PieceType.CHARIOT, Player.RED)
-        self.board[7][1] = Piece(PieceType.CANNON, Player.RED)
-        self.board[7][7] = Piece(PieceType.CANNON, Player.RED)
-        for col in [0, 2, 4, 6, 8]:
-            self.board[6][col] = Piece(PieceType.SOLDIER, Player.RED)
+        for col, piece in enumerate(_INITIAL_BACK_RANK):
+            self._put_piece(col, piece | BLACK_FLAG)  # 黑方（顶部）
+            self._put_piece(9 * BOARD_COLS + col, piece)  # 红方（底部）
+        for col in (1, 7):
+            self._put_piece(2 * BOARD_COLS + col, CANNON | BLACK_FLAG)
+            self._put_piece(7 * BOARD_COLS + col, CANNON)
+        for col in (0, 2, 4, 6, 8):
+            self._put_piece(3 * BOARD_COLS + col, SOLDIER | BLACK_FLAG)
+            self._put_piece(6 * BOARD_COLS + col, SOLDIER)
+
+    def _put_piece(self, sq: int, piece: int):
+        self.squares[sq] = piece
+        self.piece_squares[piece >> 3].add(sq)
+        if piece & 7 == GENERAL:
+            self.general_squares[piece >> 3] = sq
+        self.score += SQUARE_SCORES[piece][sq]
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+
+    @property
+    def current_player(self) -> Player:
+        return Player.RED if self.side == RED else Player.BLACK
+
+    @current_player.setter
+    def current_player(self, player: Player):
+        side = RED if player == Player.RED else BLACK
+        if side != self.side:
+            self.side = side
+            self.hash ^= ZOBRIST_SIDE
+
+    def _compute_hash(self) -> int:
+        """从头计算局面哈希（用于校验增量更新）"""
+        key = ZOBRIST_SIDE if self.side == BLACK else 0
+        for sq, piece in enumerate(self.squares):
+            key ^= ZOBRIST_PIECES[piece][sq]
+        return key
 
     def get_piece(self, row: int, col: int) -> Optional[Piece]:
-        return self.board[row][col]
+        return PIECE_VIEWS[self.squares[row * BOARD_COLS + col]]
 
-    def _is_in_palace(self, row: int, col: int, color: Player) -> bool:
-        """是否在九宫格内"""
-        if col < 3 or col > 5:
-            return False
-        if color == Player.RED:
-            return row >= 7
-        return row <= 2
-
-    def _is_on_own_side(self, row: int, color: Player) -> bool:
-        """是否在己方区域"""
-        if color == Player.RED:
-            return row >= 5
-        return row <= 4
-
-    def _get_piece_moves(self, row: int, col: int, piece: Piece) -> List[Tuple[int, int]]:
-        """获取棋子的基本移动（不考虑将军）"""
+    def _get_piece_moves(self, sq: int, piece: int) -> List[int]:
+        """获取棋子的基本移动目标格（不考虑将军），遍历预计算的走法表"""
+        squares = self.squares
+        side = piece >> 3
+        piece_type = piece & 7
         moves = []
-        color = piece.color
-
-        if piece.piece_type == PieceType.GENERAL:
-            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                nr, nc = row + dr, col + dc
-                if 0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS:
-                    if self._is_in_palace(nr, nc, color):
-                        target = self.board[nr][nc]
-                        if target is None or target.color != color:
-                            moves.append((nr, nc))
-
-        elif piece.piece_type == PieceType.ADVISOR:
-            for dr, dc in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-                nr, nc = row + dr, col + dc
-                if 0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS:
-                    if self._is_in_palace(nr, nc, color):
-                        target = self.board[nr][nc]
-                        if target is None or target.color != color:
-                            moves.append((nr, nc))
-
-        elif piece.piece_type == PieceType.ELEPHANT:
-            for dr, dc, edr, edc in [(-2, -2, -1, -1), (-2, 2, -1, 1),
-                                      (2, -2, 1, -1), (2, 2, 1, 1)]:
-                nr, nc = row + dr, col + dc
-                er, ec = row + edr, col + edc
-                if 0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS:
-                    if self._is_on_own_side(nr, color):
-                        if self.board[er][ec] is None:
-                            target = self.board[nr][nc]
-                            if target is None or target.color != color:
-                                moves.append((nr, nc))
-
-        elif piece.piece_type == PieceType.HORSE:
-            for dr, dc, lr, lc in [(-2, -1, -1, 0), (-2, 1, -1, 0),
-                                    (-1, -2, 0, -1), (-1, 2, 0, 1),
-                                    (1, -2, 0, -1), (1, 2, 0, 1),
-                                    (2, -1, 1, 0), (2, 1, 1, 0)]:
-                nr, nc = row + dr, col + dc
-                leg_r, leg_c = row + lr, col + lc
-                if 0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS:
-                    if self.board[leg_r][leg_c] is None:
-                        target = self.board[nr][nc]
-                        if target is None or target.color != color:
-                            moves.append((nr, nc))
-
-        elif piece.piece_type == PieceType.CHARIOT:
-            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                for i in range(1, max(BOARD_ROWS, BOARD_COLS)):
-                    nr, nc = row + dr * i, col + dc * i
-                    if not (0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS):
-                        break
-                    target = self.board[nr][nc]
-                    if target is None:
-                        moves.append((nr, nc))
-                    elif target.color != color:
-                        moves.append((nr, nc))
-                        break
+
+        if piece_type == CHARIOT:
+            for ray in RAYS[sq]:
+                for to_sq in ray:
+                    target = squares[to_sq]
+                    if not target:
+                        moves.append(to_sq)
                     else:
+                        if target >> 3 != side:
+                            moves.append(to_sq)
                         break
 
-        elif piece.piece_type == PieceType.CANNON:
-            for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+        elif piece_type == CANNON:
+            for ray in RAYS[sq]:
                 jumped = False
-                for i in range(1, max(BOARD_ROWS, BOARD_COLS)):
-                    nr, nc = row + dr * i, col + dc * i
-                    if not (0 <= nr < BOARD_ROWS and 0 <= nc < BOARD_COLS):
-                        break
-                    target = self.board[nr][nc]
+                for to_sq in ray:
+                    target = squares[to_sq]
                     if not jumped:
-                        if target is None:
-                            moves.append((nr, nc))
+                        if not target:
+                            moves.append(to_sq)
                         else:
-                            jumped = True
-                    else:
-                        if target is not None:
-                            if target.color != color:
-                                moves.append((nr, nc))
-                            break
-
-        elif piece.piece_type == PieceType.SOLDIER:
-            forward = -1 if color == Player.RED else 1
-            crossed = not self._is_on_own_side(row, color)
-
-            nr = row + forward
-            if 0 <= nr < BOARD_ROWS:
-                target = self.board[nr][col]
-                if target is None or target.color != color:
-                    moves.append((nr, col))
-
-            if crossed:
-                for dc in [-1, 1]:
-                    nc = col + dc
-                    if 0 <= nc < BOARD_COLS:
-                        target = self.board[row][nc]
-                        if target is None or target.color != color:
-                            moves.append((row, nc))
-
-        return moves
-
-    def _find_general(self, color: Player) -> Optional[Tuple[int, int]]:
-        """找到将/帅位置"""
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = self.board[row][col]
-                if piece and piece.color == color and piece.piece_type == PieceType.GENERAL:
-                    return (row, col)
-        return None
-
-    def _generals_facing(self) -> bool:
-        """两将是否对面"""
-        red_pos = self._find_general(Player.RED)
-        black_pos = self._find_general(Player.BLACK)
+                            jumped = True  # 炮架
+                    elif target:
+                        if target >> 3 != side:
+                            moves.append(to_sq)
+                        break
 
-        if not red_pos or not black_pos:
-            return False
-        if red_pos[1] != black_pos[1]:
-            return False
+        elif piece_type == HORSE:
+            for to_sq, leg in HORSE_MOVES[sq]:
+                if not squares[leg]:
+                    target = squares[to_sq]
+                    if not target or target >> 3 != side:
+                        moves.append(to_sq)
+
+        elif piece_type == ELEPHANT:
+            for to_sq, eye in ELEPHANT_MOVES[side][sq]:
+                if not squares[eye]:
+                    target = squares[to_sq]
+                    if not target or target >> 3 != side:
+                        moves.append(to_sq)
+
+        else:
+            if piece_type == SOLDIER:
+                targets = SOLDIER_MOVES[side][sq]
+            elif piece_type == GENERAL:
+                targets = GENERAL_MOVES[side][sq]
+            else:
+                targets = ADVISOR_MOVES[side][sq]
+            for to_sq in targets:
+                target = squares[to_sq]
+                if not target or target >> 3 != side:
+                    moves.append(to_sq)
 
-        col = red_pos[1]
-        min_row = min(red_pos[0], black_pos[0])
-        max_row = max(red_pos[0], black_pos[0])
+        return moves
 
-        for row in range(min_row + 1, max_row):
-            if self.board[row][col] is not None:
-                return False
-        return True
+    def _side_in_check(self, side: int) -> bool:
+        """side 一方是否被将军
 
-    def is_in_check(self, color: Player) -> bool:
-        """检查是否被将军"""
-        general_pos = self._find_general(color)
-        if not general_pos:
+        从将/帅所在格向外查找：四条直线上的第一个子是车（或对面的将，即“白脸将”），
+        第二个子是炮；反向查马（马腿无子）和兵。
+        """
+        general_sq = self.general_squares[side]
+        if general_sq is None:
             return True
 
-        enemy = color.opposite()
+        squares = self.squares
+        flag = BLACK_FLAG if side == RED else 0
+        chariot = CHARIOT | flag
+        cannon = CANNON | flag
+        general = GENERAL | flag
 
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = self.board[row][col]
-                if piece and piece.color == enemy:
-                    moves = self._get_piece_moves(row, col, piece)
-                    if general_pos in moves:
+        for ray in RAYS[general_sq]:
+            screened = False
+            for sq in ray:
+                piece = squares[sq]
+                if piece:
+                    if screened:
+                        if piece == cannon:
+                            return True
+                        break
+                    if piece == chariot or piece == general:
                         return True
+                    screened = True
 
-        if self._generals_facing():
-            return True
+        horse = HORSE | flag
+        for sq, leg in HORSE_ATTACKS[general_sq]:
+            if squares[sq] == horse and not squares[leg]:
+                return True
 
+        soldier = SOLDIER | flag
+        for sq in SOLDIER_ATTACKS[side ^ 1][general_sq]:
+            if squares[sq] == soldier:
+                return True
         return False
 
-    def _would_be_in_check(self, from_row: int, from_col: int,
-                           to_row: int, to_col: int, color: Player) -> bool:
-        """移动后是否会被将"""
-        piece = self.board[from_row][from_col]
-        captured = self.board[to_row][to_col]
-        self.board[from_row][from_col] = None
-        self.board[to_row][to_col] = piece
-
-        in_check = self.is_in_check(color)
-
-        self.board[from_row][from_col] = piece
-        self.board[to_row][to_col] = captured
-
-        return in_check
+    def is_in_check(self, color: Player) -> bool:
+        """检查是否被将军"""
+        return self._side_in_check(RED if color == Player.RED else BLACK)
+
+    def _make(self, move: int) -> int:
+        """在棋盘上走一步（只改棋盘，不检查合法性），返回被吃棋子的编码"""
+        from_sq = move >> 7
+        to_sq = move & 127
+        squares = self.squares
+        piece = squares[from_sq]
+        captured = squares[to_sq]
+        side = piece >> 3
+
+        own = self.piece_squares[side]
+        own.discard(from_sq)
+        own.add(to_sq)
+        if piece & 7 == GENERAL:
+            self.general_squares[side] = to_sq
+        if captured:
+            self.piece_squares[side ^ 1].discard(to_sq)
+            # 只有未经合法性检查的走法才可能吃将
+            if captured & 7 == GENERAL:
+                self.general_squares[side ^ 1] = None
+        squares[to_sq] = piece
+        squares[from_sq] = EMPTY
+        self.score += SQUARE_SCORES[piece][to_sq] - SQUARE_SCORES[piece][from_sq] - SQUARE_SCORES[captured][to_sq]
+        zobrist = ZOBRIST_PIECES[piece]
+        self.hash ^= zobrist[from_sq] ^ zobrist[to_sq] ^ ZOBRIST_PIECES[captured][to_sq] ^ ZOBRIST_SIDE
+        self.side ^= 1
+        return captured
+
+    def _unmake(self, move: int, captured: int):
+        """撤销 _make 走的一步"""
+        from_sq = move >> 7
+        to_sq = move & 127
+        squares = self.squares
+        piece = squares[to_sq]
+        side = piece >> 3
+
+        own = self.piece_squares[side]
+        own.discard(to_sq)
+        own.add(from_sq)
+        if piece & 7 == GENERAL:
+            self.general_squares[side] = from_sq
+        if captured:
+            self.piece_squares[side ^ 1].add(to_sq)
+            if captured & 7 == GENERAL:
+                self.general_squares[side ^ 1] = to_sq
+        squares[from_sq] = piece
+        squares[to_sq] = captured
+        self.score -= SQUARE_SCORES[piece][to_sq] - SQUARE_SCORES[piece][from_sq] - SQUARE_SCORES[captured][to_sq]
+        zobrist = ZOBRIST_PIECES[piece]
+        self.hash ^= zobrist[from_sq] ^ zobrist[to_sq] ^ ZOBRIST_PIECES[captured][to_sq] ^ ZOBRIST_SIDE
+        self.side ^= 1
+
+    def push(self, move: int) -> int:
+        """走一步（不检查合法性）并记入走子栈，返回被吃棋子的编码
+
+        吃子和兵卒前进是不可逆走法：之前的局面不可能再出现，换用新的重复计数表，
+        旧表保存在走子栈中由 pop 恢复。
+        """
+        key = self.hash
+        captured = self._make(move)
+        to_sq = move & 127
+        if captured or (self.squares[to_sq] & 7 == SOLDIER and abs(to_sq - (move >> 7)) == BOARD_COLS):
+            saved = self._repetitions
+            self._repetitions = {}
+        else:
+            saved = None
+            repetitions = self._repetitions
+            repetitions[key] = repetitions.get(key, 0) + 1
+        self._stack.append((key, move, captured, saved))
+        return captured
+
+    def pop(self):
+        """撤销 push 走的最后一步"""
+        key, move, captured, saved = self._stack.pop()
+        self._unmake(move, captured)
+        if saved is not None:
+            self._repetitions = saved
+        else:
+            repetitions = self._repetitions
+            count = repetitions[key] - 1
+            if count:
+                repetitions[key] = count
+            else:
+                del repetitions[key]
+
+    def is_repetition(self, count: int = 1) -> bool:
+        """当前局面（同一走棋方）自上次不可逆走法以来是否已出现过至少 count 次"""
+        return self._repetitions.get(self.hash, 0) >= count
+
+    def judge_repetition(self) -> Tuple[int, Optional[int]]:
+        """按亚洲规则（简化）裁决当前的重复局面，返回 (裁决, 判负一方)
+
+        取当前局面上一次出现以来的循环，逐步检查双方的走法：
+        - 一方每步都将军（长将）而另一方不是，长将方判负；双方都长将为和棋；
+        - 否则一方每步都在将军或捉子、且至少捉了一次（长捉、一将一捉）
+          而另一方不是，该方判负；
+        - 其余情况为和棋。
+        调用前应确认 is_repetition()；判负一方为 RED / BLACK，和棋时为 None。
+        """
+        stack = self._stack
+        key = self.hash
+        start = len(stack) - 1
+        while stack[start][0] != key:
+            start -= 1
+        cycle = [record[1] for record in stack[start:]]
+
+        # 循环中都是可逆走法（没有吃子）：退回循环起点，再逐步重走并标记每一步
+        for move in reversed(cycle):
+            self._unmake(move, EMPTY)
+        all_checks = [True, True]
+        all_threats = [True, True]
+        for move in cycle:
+            side = self.side
+            flags = self._move_flags(move)
+            all_checks[side] = all_checks[side] and flags == _GIVES_CHECK
+            all_threats[side] = all_threats[side] and flags != 0
+            self._make(move)
+
+        checkers = [side for side in (RED, BLACK) if all_checks[side]]
+        if len(checkers) == 2:
+            return REPETITION_DRAW, None
+        if checkers:
+            return REPETITION_CHECK, checkers[0]
+        chasers = [side for side in (RED, BLACK) if all_threats[side]]
+        if len(chasers) == 1:
+            return REPETITION_CHASE, chasers[0]
+        return REPETITION_DRAW, None
+
+    def _move_flags(self, move: int) -> int:
+        """走法是将军（_GIVES_CHECK）、捉子（_CHASES）还是都不是（0），结果按局面缓存"""
+        cache_key = (self.hash, move)
+        flags = self._flag_cache.get(cache_key)
+        if flags is not None:
+            return flags
+
+        side = self.side
+        threatened = self._chased_squares(side)
+        self._make(move)
+        if self._side_in_check(side ^ 1):
+            flags = _GIVES_CHECK
+        elif self._chased_squares(side) - threatened:
+            flags = _CHASES
+        else:
+            flags = 0
+        self._unmake(move, EMPTY)
+
+        if len(self._flag_cache) >= _FLAG_CACHE_LIMIT:
+            self._flag_cache.clear()
+        self._flag_cache[cache_key] = flags
+        return flags
+
+    def _chased_squares(self, side: int) -> Set[int]:
+        """side 一方正在“捉”的对方棋子所在格
+
+        捉：车、马、炮、士、象可以合法吃掉对方的子，且该子无根（吃后对方不能
+        合法地吃回），或者兵种比进攻的子大（如马、炮捉车）。将帅和兵卒允许长捉；
+        将帅和未过河的兵卒不算被捉。
+        """
+        squares = self.squares
+        chased = set()
+        for sq in list(self.piece_squares[side]):
+            attacker = squares[sq]
+            attacker_type = attacker & 7
+            if attacker_type == GENERAL or attacker_type == SOLDIER:
+                continue
+            for to_sq in self._get_piece_moves(sq, attacker):
+                target = squares[to_sq]
+                target_type = target & 7
+                if not target or target_type == GENERAL or to_sq in chased:
+                    continue
+                if target_type == SOLDIER and (to_sq >= 45 if target >> 3 == RED else to_sq < 45):
+                    continue
+                move = sq << 7 | to_sq
+                self._make(move)
+                if not self._side_in_check(side) and (
+                        _CHASE_RANKS[target_type] > _CHASE_RANKS[attacker_type]
+                        or not self._can_capture_on(to_sq, side ^ 1)):
+                    chased.add(to_sq)
+                self._unmake(move, target)
+        return chased
+
+    def _can_capture_on(self, sq: int, side: int) -> bool:
+        """side 一方能否合法地吃掉 sq 上的子"""
+        squares = self.squares
+        for from_sq in list(self.piece_squares[side]):
+            if sq in self._get_piece_moves(from_sq, squares[from_sq]):
+                move = from_sq << 7 | sq
+                captured = self._make(move)
+                legal = not self._side_in_check(side)
+                self._unmake(move, captured)
+                if legal:
+                    return True
+        return False
 
-    def get_valid_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
-        """获取有效移动（排除被将）"""
-        piece = self.board[row][col]
+    def _legal_targets(self, sq: int) -> List[int]:
+        """sq 上棋子的合法目标格（排除走后被将）"""
+        piece = self.squares[sq]
         if not piece:
             return []
+        side = piece >> 3
+        targets = []
+        for to_sq in self._get_piece_moves(sq, piece):
+            move = sq << 7 | to_sq
+            captured = self._make(move)
+            if not self._side_in_check(side):
+                targets.append(to_sq)
+            self._unmake(move, captured)
+        return targets
+
+    def generate_moves(self) -> List[int]:
+        """走棋方的所有合法走法（整数编码）"""
+        moves = []
+        # 遍历副本：生成过程中会临时走子，修改棋子集合
+        for sq in sorted(self.piece_squares[self.side]):
+            for to_sq in self._legal_targets(sq):
+                moves.append(sq << 7 | to_sq)
+        return moves
 
-        moves = self._get_piece_moves(row, col, piece)
-        valid = []
-        for move in moves:
-            if not self._would_be_in_check(row, col, move[0], move[1], piece.color):
-                valid.append(move)
-        return valid
+    def get_valid_moves(self, row: int, col: int) -> List[Tuple[int, int]]:
+        """获取有效移动（排除被将）"""
+        return [divmod(to_sq, BOARD_COLS) for to_sq in self._legal_targets(row * BOARD_COLS + col)]
 
     def make_move(self, from_row: int, from_col: int,
                   to_row: int, to_col: int) -> bool:
@@ -339,31 +581,26 @@ class ChineseChessLogic:
         if (to_row, to_col) not in self.get_valid_moves(from_row, from_col):
             return False
 
-        piece = self.board[from_row][from_col]
-        captured = self.board[to_row][to_col]
-
-        # 保存移动记录用于悔棋
-        move_record = {
-            'from_pos': (from_row, from_col),
-            'to_pos': (to_row, to_col),
-            'piece': Piece(piece.piece_type, piece.color),
-            'captured': Piece(captured.piece_type, captured.color) if captured else None,
-        }
+        move = encode_move(from_row * BOARD_COLS + from_col, to_row * BOARD_COLS + to_col)
+        piece = self.squares[move >> 7]
+        captured = self.push(move)
 
         if captured:
-            if captured.color == Player.RED:
-                self.captured_red.append(captured)
+            if captured >> 3 == RED:
+                self.captured_red.append(PIECE_VIEWS[captured])
             else:
-                self.captured_black.append(captured)
-
-        self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = None
+                self.captured_black.append(PIECE_VIEWS[captured])
 
         self.move_count += 1
-        self.current_player = self.current_player.opposite()
 
-        # 保存移动记录
-        self.move_history.append(move_record)
+        # 保存移动记录用于悔棋
+        self.move_history.append({
+            'from_pos': (from_row, from_col),
+            'to_pos': (to_row, to_col),
+            'move': move,
+            'piece': piece,
+            'captured': captured,
+        })
 
         self._check_game_over()
         return True
@@ -374,27 +611,20 @@ class ChineseChessLogic:
             return False
 
         record = self.move_history.pop()
-
-        from_row, from_col = record['from_pos']
-        to_row, to_col = record['to_pos']
-        piece = record['piece']
         captured = record['captured']
-
-        # 恢复棋子位置
-        self.board[from_row][from_col] = piece
-        self.board[to_row][to_col] = captured
+        self.pop()
 
         # 恢复被吃棋子的记录
         if captured:
-            if captured.color == Player.RED:
+            if captured >> 3 == RED:
                 self.captured_red.pop()
             else:
                 self.captured_black.pop()
 
         # 恢复其他状态
         self.move_count -= 1
-        self.current_player = self.current_player.opposite()
         self.state = GameState.PLAYING
+        self.repetition_verdict = None
 
         return True
 
@@ -402,85 +632,124 @@ class ChineseChessLogic:
         """是否可以悔棋"""
         return len(self.move_history) > 0
 
-    def _has_legal_moves(self, color: Player) -> bool:
+    def _has_legal_moves(self, side: int) -> bool:
         """是否有合法移动"""
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = self.board[row][col]
-                if piece and piece.color == color:
-                    if self.get_valid_moves(row, col):
-                        return True
+        for sq in sorted(self.piece_squares[side]):
+            if self._legal_targets(sq):
+                return True
         return False
 
     def _check_game_over(self):
-        """检查游戏结束"""
-        if not self._has_legal_moves(self.current_player):
-            winner = self.current_player.opposite()
-            if self.is_in_check(self.current_player):
-                self.state = (GameState.RED_WINS if winner == Player.RED
-                              else GameState.BLACK_WINS)
+        """检查游戏结束：将死、困毙，或同一局面第三次出现时按长将、长捉规则裁决"""
+        if not self._has_legal_moves(self.side):
+            if self._side_in_check(self.side):
+                self.state = GameState.RED_WINS if self.side == BLACK else GameState.BLACK_WINS
             else:
                 self.state = GameState.STALEMATE
+        elif self.is_repetition(2):
+            verdict, loser = self.judge_repetition()
+            self.repetition_verdict = verdict
+            if loser is None:
+                self.state = GameState.DRAW
+            else:
+                self.state = GameState.RED_WINS if loser == BLACK else GameState.BLACK_WINS
 
     def get_all_moves(self, player: Optional[Player] = None) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
         """获取所有合法移动"""
-        if player is None:
-            player = self.current_player
-        moves = []
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = self.board[row][col]
-                if piece and piece.color == player:
-                    for move in self.get_valid_moves(row, col):
-                        moves.append(((row, col), move))
-        return moves
+        if player is not None and player != self.current_player:
+            self.side ^= 1
+            moves = self.generate_moves()
+            self.side ^= 1
+        else:
+            moves = self.generate_moves()
+        return [move_to_tuple(move) for move in moves]
+
+    def _reversible_start(self) -> int:
+        """走子栈中最后一次不可逆走法之后的位置"""
+        start = len(self._stack)
+        while start and self._stack[start - 1][3] is None:
+            start -= 1
+        return start
 
     def clone(self) -> 'ChineseChessLogic':
-        """克隆游戏状态"""
+        """克隆游戏状态（保留上次不可逆走法以来的走子记录，用于判断重复局面）"""
         new_game = ChineseChessLogic.__new__(ChineseChessLogic)
-        new_game.board = [[None] * BOARD_COLS for _ in range(BOARD_ROWS)]
-        for r in range(BOARD_ROWS):
-            for c in range(BOARD_COLS):
-                p = self.board[r][c]
-                if p:
-                    new_game.board[r][c] = Piece(p.piece_type, p.color)
-        new_game.current_player = self.current_player
+        new_game.squares = self.squares[:]
+        new_game.piece_squares = [set(self.piece_squares[RED]), set(self.piece_squares[BLACK])]
+        new_game.general_squares = self.general_squares[:]
+        new_game.score = self.score
+        new_game.hash = self.hash
+        new_game.side = self.side
         new_game.state = self.state
+        new_game.repetition_verdict = self.repetition_verdict
         new_game.move_count = self.move_count
-        new_game.captured_red = [Piece(p.piece_type, p.color) for p in self.captured_red]
-        new_game.captured_black = [Piece(p.piece_type, p.color) for p in self.captured_black]
+        new_game.captured_red = self.captured_red[:]
+        new_game.captured_black = self.captured_black[:]
+        new_game.move_history = []
+        new_game._stack = self._stack[self._reversible_start():]
+        new_game._repetitions = dict(self._repetitions)
+        new_game._flag_cache = {}
         return new_game
 
+    def snapshot(self) -> tuple:
+        """导出紧凑的局面快照（用于进程间传递）
+
+        除棋盘外还包含上次不可逆走法以来的走法，恢复后仍能判断重复局面。
+        """
+        chars = []
+        for piece in self.squares:
+            if not piece:
+                chars.append('.')
+            else:
+                letter = PIECE_LETTERS[PIECE_TYPES[piece & 7]]
+                chars.append(letter if piece & BLACK_FLAG else letter.upper())
+        side = 'w' if self.side == RED else 'b'
+        moves = tuple(record[1] for record in self._stack[self._reversible_start():])
+        return (''.join(chars), side, self.move_count, moves)
+
+    @classmethod
+    def from_snapshot(cls, data: tuple) -> 'ChineseChessLogic':
+        """从 snapshot() 的结果恢复局面"""
+        board, side, move_count, moves = data
+        game = cls.__new__(cls)
+        game.squares = [EMPTY] * BOARD_SIZE
+        game.piece_squares = [set(), set()]
+        game.general_squares = [None, None]
+        game.score = 0
+        game.hash = 0
+        game.state = GameState.PLAYING
+        game.repetition_verdict = None
+        game.captured_red = []
+        game.captured_black = []
+        game.move_history = []
+        game._stack = []
+        game._repetitions = {}
+        game._flag_cache = {}
+        for sq, letter in enumerate(board):
+            if letter != '.':
+                color = Player.RED if letter.isupper() else Player.BLACK
+                game._put_piece(sq, piece_code(LETTER_PIECES[letter.lower()], color))
+        game.side = RED if side == 'w' else BLACK
+        if game.side == BLACK:
+            game.hash ^= ZOBRIST_SIDE
+        # 这些走法都不吃子：先退回到第一步之前，再依次走一遍重建重复计数
+        for move in reversed(moves):
+            game._unmake(move, EMPTY)
+        for move in moves:
+            game.push(move)
+        game.move_count = move_count
+        game._check_game_over()
+        return game
+
     def evaluate(self) -> int:
         """评估局面（正值对红方有利）"""
         if self.state == GameState.RED_WINS:
             return 100000
         elif self.state == GameState.BLACK_WINS:
             return -100000
-        elif self.state == GameState.STALEMATE:
+        elif self.state == GameState.STALEMATE or self.state == GameState.DRAW:
             return 0
-
-        score = 0
-        for row in range(BOARD_ROWS):
-            for col in range(BOARD_COLS):
-                piece = self.board[row][col]
-                if piece:
-                    value = piece.value
-                    # 位置奖励
-                    if piece.piece_type == PieceType.SOLDIER:
-                        if piece.color == Player.RED:
-                            if row < 5:  # 过河
-                                value += 20
-                        else:
-                            if row > 4:
-                                value += 20
-
-                    if piece.color == Player.RED:
-                        score += value
-                    else:
-                        score -= value
-
-        return score
+        return self.score
 
     def is_game_over(self) -> bool:
         return self.state != GameState.PLAYING
@@ -0,0 +1,147 @@
+"""中国象棋走法预计算表
+
+格子编号：sq = row * 9 + col，与 ChineseChessLogic.squares 一致
+（row 0 为黑方底线，row 9 为红方底线）。程序启动时为每个格子预先算好
+各兵种的目标格，以及马腿、象眼等需要检查的阻挡格；走法生成时只需遍历表，
+不再逐个判断九宫、河界和棋盘边界。
+
+按走棋方区分的表以 [side][sq] 索引（side 0 为红方，1 为黑方）。
+HORSE_ATTACKS、SOLDIER_ATTACKS 是反向表：能攻击某格的马、兵所在格，
+用于从将/帅所在格出发判断是否被将军。
+"""
+
+from typing import List, Tuple
+
+BOARD_COLS = 9
+BOARD_ROWS = 10
+BOARD_SIZE = BOARD_ROWS * BOARD_COLS
+
+# 将、车、炮的四个方向：上、下、左、右
+_ORTHOGONAL = ((-1, 0), (1, 0), (0, -1), (0, 1))
+_DIAGONAL = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+# 象：(行增量, 列增量)，象眼在中点
+_ELEPHANT_STEPS = ((-2, -2), (-2, 2), (2, -2), (2, 2))
+# 马：(行增量, 列增量, 马腿行增量, 马腿列增量)
+_HORSE_STEPS = ((-2, -1, -1, 0), (-2, 1, -1, 0),
+                (-1, -2, 0, -1), (-1, 2, 0, 1),
+                (1, -2, 0, -1), (1, 2, 0, 1),
+                (2, -1, 1, 0), (2, 1, 1, 0))
+
+
+def _on_board(row: int, col: int) -> bool:
+    return 0 <= row < BOARD_ROWS and 0 <= col < BOARD_COLS
+
+
+def _in_palace(row: int, col: int, side: int) -> bool:
+    return 3 <= col <= 5 and (7 <= row <= 9 if side == 0 else 0 <= row <= 2)
+
+
+def _on_own_side(row: int, side: int) -> bool:
+    return row >= 5 if side == 0 else row <= 4
+
+
+def _palace_table(steps) -> List[List[List[int]]]:
+    """将/帅、士/仕：九宫内的目标格"""
+    table = []
+    for side in (0, 1):
+        per_square = []
+        for sq in range(BOARD_SIZE):
+            row, col = divmod(sq, BOARD_COLS)
+            per_square.append([(row + dr) * BOARD_COLS + col + dc for dr, dc in steps
+                               if _in_palace(row + dr, col + dc, side)])
+        table.append(per_square)
+    return table
+
+
+def _elephant_table() -> List[List[List[Tuple[int, int]]]]:
+    """象/相：己方半场内的 (目标格, 象眼格)"""
+    table = []
+    for side in (0, 1):
+        per_square = []
+        for sq in range(BOARD_SIZE):
+            row, col = divmod(sq, BOARD_COLS)
+            per_square.append([((row + dr) * BOARD_COLS + col + dc,
+                                (row + dr // 2) * BOARD_COLS + col + dc // 2)
+                               for dr, dc in _ELEPHANT_STEPS
+                               if _on_board(row + dr, col + dc) and _on_own_side(row + dr, side)])
+        table.append(per_square)
+    return table
+
+
+def _horse_table() -> List[List[Tuple[int, int]]]:
+    """马：(目标格, 马腿格)"""
+    table = []
+    for sq in range(BOARD_SIZE):
+        row, col = divmod(sq, BOARD_COLS)
+        table.append([((row + dr) * BOARD_COLS + col + dc, (row + lr) * BOARD_COLS + col + lc)
+                      for dr, dc, lr, lc in _HORSE_STEPS if _on_board(row + dr, col + dc)])
+    return table
+
+
+def _soldier_table() -> List[List[List[int]]]:
+    """兵/卒：向前一步，过河后还可以左右走"""
+    table = []
+    for side in (0, 1):
+        forward = -1 if side == 0 else 1
+        per_square = []
+        for sq in range(BOARD_SIZE):
+            row, col = divmod(sq, BOARD_COLS)
+            targets = []
+            if _on_board(row + forward, col):
+                targets.append(sq + forward * BOARD_COLS)
+            if not _on_own_side(row, side):
+                targets.extend(sq + dc for dc in (-1, 1) if _on_board(row, col + dc))
+            per_square.append(targets)
+        table.append(per_square)
+    return table
+
+
+def _ray_table() -> List[List[List[int]]]:
+    """车、炮：每个格子四个方向上由近及远的格子"""
+    table = []
+    for sq in range(BOARD_SIZE):
+        row, col = divmod(sq, BOARD_COLS)
+        rays = []
+        for dr, dc in _ORTHOGONAL:
+            ray = []
+            r, c = row + dr, col + dc
+            while _on_board(r, c):
+                ray.append(r * BOARD_COLS + c)
+                r += dr
+                c += dc
+            rays.append(ray)
+        table.append(rays)
+    return table
+
+
+GENERAL_MOVES = _palace_table(_ORTHOGONAL)
+ADVISOR_MOVES = _palace_table(_DIAGONAL)
+ELEPHANT_MOVES = _elephant_table()
+HORSE_MOVES = _horse_table()
+SOLDIER_MOVES = _soldier_table()
+RAYS = _ray_table()
+
+
+def _horse_attack_table() -> List[List[Tuple[int, int]]]:
+    """能走到每个格子的马：(马所在格, 马腿格)"""
+    table: List[List[Tuple[int, int]]] = [[] for _ in range(BOARD_SIZE)]
+    for sq in range(BOARD_SIZE):
+        for to_sq, leg in HORSE_MOVES[sq]:
+            table[to_sq].append((sq, leg))
+    return table
+
+
+def _soldier_attack_table() -> List[List[List[int]]]:
+    """能走到每个格子的兵/卒所在格，按兵所属一方区分"""
+    table = []
+    for side in (0, 1):
+        per_square: List[List[int]] = [[] for _ in range(BOARD_SIZE)]
+        for sq in range(BOARD_SIZE):
+            for to_sq in SOLDIER_MOVES[side][sq]:
+                per_square[to_sq].append(sq)
+        table.append(per_square)
+    return table
+
+
+HORSE_ATTACKS = _horse_attack_table()
+SOLDIER_ATTACKS = _soldier_attack_table()
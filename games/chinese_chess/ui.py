@@ -6,12 +6,14 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, GLib
 
 import sys
-import threading
 sys.path.insert(0, str(__file__).rsplit('/', 3)[0])
 from i18n import _
 
-from .logic import ChineseChessLogic, Player, GameState, BOARD_ROWS, BOARD_COLS
+from .logic import (
+    ChineseChessLogic, Player, GameState, BOARD_ROWS, BOARD_COLS, REPETITION_CHECK, REPETITION_CHASE,
+)
 from .ai import ChineseChessAI
+from ..search.worker import EngineWorker
 
 
 class GameMode:
@@ -32,9 +34,12 @@ class ChineseChessUI:
         self.selected = None
         self.valid_moves = []
         self.mode = GameMode.PVP
-        self.ai = ChineseChessAI(difficulty=2)
+        self.difficulty = 2
+        # AI 在常驻的工作进程中搜索，避免与 GTK 主循环争抢 GIL
+        self.engine = EngineWorker(ChineseChessAI, ChineseChessLogic)
         self.player_color = Player.RED
         self.ai_thinking = False
+        self._ai_request = 0  # 当前AI请求编号，用于丢弃过期结果
         self.animating = False  # 动画进行中
         self.last_move = None  # 记录上一步移动 (from_pos, to_pos)
 
@@ -163,16 +168,23 @@ class ChineseChessUI:
             self.reset()
 
     def _on_difficulty_changed(self, combo: Gtk.ComboBoxText):
-        self.ai.difficulty = combo.get_active() + 1
+        self.difficulty = combo.get_active() + 1
         self.reset()
 
     def _on_undo_clicked(self, button: Gtk.Button):
         """悔棋按钮点击"""
-        if self.ai_thinking or self.logic.is_game_over() or self.animating:
+        if self.logic.is_game_over() or self.animating:
             return
 
-        # PVE模式下悔两步（玩家和AI各一步）
-        if self.mode == GameMode.PVE:
+        if self.ai_thinking:
+            # AI 思考中：取消搜索，只悔玩家刚走的一步
+            self.engine.cancel()
+            self.ai_thinking = False
+            if self.logic.can_undo():
+                self.logic.undo()
+        elif self.mode == GameMode.PVE:
+            # PVE模式下悔两步（玩家和AI各一步），后台思考的局面随之作废
+            self.engine.cancel()
             if self.logic.can_undo():
                 self.logic.undo()
             if self.logic.can_undo():
@@ -350,19 +362,19 @@ class ChineseChessUI:
     def _ai_move(self):
         self.ai_thinking = True
         self.status_label.set_label(_("ai_thinking"))
-        self.undo_btn.set_sensitive(False)
-
-        def do_ai_move():
-            # 克隆游戏状态供AI使用，避免线程问题
-            game_clone = self.logic.clone()
-            move = self.ai.get_best_move(game_clone)
-            GLib.idle_add(self._apply_ai_move, move)
+        self._ai_request += 1
+        request = self._ai_request
 
-        # 使用线程执行AI计算
-        thread = threading.Thread(target=do_ai_move, daemon=True)
-        thread.start()
+        # 结果在工作进程的监听线程中返回，通过 idle_add 切回主线程
+        self.engine.search(
+            self.logic.snapshot(), self.difficulty,
+            lambda move: GLib.idle_add(self._apply_ai_move, move, request)
+        )
 
-    def _apply_ai_move(self, move):
+    def _apply_ai_move(self, move, request: int):
+        # 已取消（悔棋、新游戏）的搜索结果直接丢弃
+        if not self.ai_thinking or request != self._ai_request:
+            return False
         self.ai_thinking = False
         if move:
             (from_pos, to_pos) = move
@@ -378,6 +390,9 @@ class ChineseChessUI:
 
             # 执行逻辑移动
             self.logic.make_move(from_row, from_col, to_row, to_col)
+            # 玩家思考期间在后台猜测其应着并继续搜索
+            if not self.logic.is_game_over():
+                self.engine.ponder(self.logic.snapshot(), self.difficulty)
 
             # 播放动画
             def on_animation_done():
@@ -394,7 +409,7 @@ class ChineseChessUI:
     def update_display(self):
         # 更新悔棋按钮状态
         self.undo_btn.set_sensitive(
-            self.logic.can_undo() and not self.ai_thinking and not self.animating
+            self.logic.can_undo() and not self.animating
         )
 
         # 获取上一步移动位置
@@ -436,11 +451,16 @@ class ChineseChessUI:
     def _show_game_over(self):
         winner = self.logic.get_winner()
         if winner:
-            heading = _("xiangqi_checkmate")
+            if self.logic.repetition_verdict == REPETITION_CHECK:
+                heading = _("xiangqi_perpetual_check")
+            elif self.logic.repetition_verdict == REPETITION_CHASE:
+                heading = _("xiangqi_perpetual_chase")
+            else:
+                heading = _("xiangqi_checkmate")
             body = _("xiangqi_red_wins") if winner == Player.RED else _("xiangqi_black_wins")
         else:
             heading = _("game_over")
-            body = _("xiangqi_stalemate")
+            body = _("draw_repetition") if self.logic.state == GameState.DRAW else _("xiangqi_stalemate")
 
         self.status_label.set_label(body)
 
@@ -452,7 +472,13 @@ class ChineseChessUI:
         if self.on_game_over:
             self.on_game_over()
 
+    def stop(self):
+        """离开游戏页面：取消搜索和后台思考，结束 AI 工作进程"""
+        self.ai_thinking = False
+        self.engine.close()
+
     def reset(self):
+        self.engine.cancel()
         self.logic.reset()
         self.selected = None
         self.valid_moves = []
@@ -0,0 +1,17 @@
+"""中国象棋 Zobrist 哈希键
+
+每个 (棋子编码, 格子) 和走棋方各对应一个 64 位随机数，局面哈希是所有成立特征
+对应随机数的异或。走子时只需异或变化的部分即可增量更新。
+随机数用固定种子生成，保证不同进程、不同次运行之间哈希一致。
+"""
+
+import random
+
+_rng = random.Random(0x5EED_C4E6)
+
+# ZOBRIST_PIECES[棋子编码][sq]；编码 0（空格）和未使用的编码全为 0，异或时不影响哈希
+ZOBRIST_PIECES = [[0] * 90 for _ in range(16)]
+for _code in list(range(1, 8)) + list(range(9, 16)):
+    ZOBRIST_PIECES[_code] = [_rng.getrandbits(64) for _ in range(90)]
+# 黑方走棋时异或
+ZOBRIST_SIDE = _rng.getrandbits(64)
@@ -0,0 +1,14 @@
+"""通用博弈搜索组件
+
+国际象棋与中国象棋 AI 共用：
+- tt.py: 置换表
+- ordering.py: 走法排序（杀手走法 + 历史启发）
+- worker.py: 常驻 AI 工作进程（由 UI 直接导入）
+- tournament.py: 引擎自对弈比赛（python -m games.search.tournament）
+"""
+
+from .tt import TranspositionTable, EXACT, LOWER, UPPER
+from .ordering import MoveOrderer, sort_by_scores
+
+__all__ = ['TranspositionTable', 'EXACT', 'LOWER', 'UPPER',
+           'MoveOrderer', 'sort_by_scores']
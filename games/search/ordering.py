@@ -0,0 +1,83 @@
+"""走法排序模块
+
+Alpha-Beta 剪枝的效率取决于好走法是否排在前面。排序优先级：
+1. 置换表中记录的最佳走法
+2. 吃子走法，按 MVV-LVA（先吃价值高的子，再用价值低的子去吃）
+3. 本层的两个杀手走法（曾在同一层引起 beta 截断的非吃子走法）
+4. 其余非吃子走法按历史启发分数排序
+
+本模块与具体棋种无关：走法只需可哈希、可比较相等，吃子分数由调用方给出。
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+TT_MOVE_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 36
+KILLER_SCORES = (1 << 35, (1 << 35) - 1)
+HISTORY_LIMIT = 1 << 30
+
+
+def sort_by_scores(moves: Sequence, scores: List[int]) -> List:
+    """按分数从高到低排序走法（分数相同保持原顺序）"""
+    order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+    return [moves[i] for i in order]
+
+
+class MoveOrderer:
+    """走法排序器（杀手走法 + 历史启发）"""
+
+    def __init__(self, max_ply: int = 128):
+        self.max_ply = max_ply
+        self.killers: List[List[Optional[object]]] = [[None, None] for _ in range(max_ply)]
+        self.history: Dict[object, int] = {}
+
+    def clear(self):
+        """清空所有排序信息"""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.history = {}
+
+    def new_search(self):
+        """开始新一轮搜索：清空杀手走法，历史分数减半以淡化旧信息"""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        self.history = {move: score >> 1 for move, score in self.history.items() if score > 1}
+
+    def order(self, moves: Sequence, ply: int, tt_move=None,
+              capture_scores: Optional[List[int]] = None) -> List:
+        """排序走法
+
+        Args:
+            moves: 待排序的走法
+            ply: 当前节点距根节点的层数
+            tt_move: 置换表中记录的最佳走法
+            capture_scores: 与 moves 一一对应的 MVV-LVA 分数，非吃子为 0
+        """
+        killer1, killer2 = self.killers[ply] if ply < self.max_ply else (None, None)
+        history = self.history
+        scores = []
+        for i, move in enumerate(moves):
+            if move == tt_move:
+                scores.append(TT_MOVE_SCORE)
+            elif capture_scores and capture_scores[i]:
+                scores.append(CAPTURE_SCORE + capture_scores[i])
+            elif move == killer1:
+                scores.append(KILLER_SCORES[0])
+            elif move == killer2:
+                scores.append(KILLER_SCORES[1])
+            else:
+                scores.append(history.get(move, 0))
+        return sort_by_scores(moves, scores)
+
+    def record_cutoff(self, move, ply: int, depth: int):
+        """记录引起 beta 截断的非吃子走法"""
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        score = self.history.get(move, 0) + depth * depth
+        if score > HISTORY_LIMIT:
+            # 防止分数无限增长：整体减半
+            self.history = {m: s >> 1 for m, s in self.history.items()}
+            score >>= 1
+        self.history[move] = score
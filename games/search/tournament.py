@@ -0,0 +1,307 @@
+"""引擎自对弈比赛
+
+在进程池中让两个 AI 配置（引擎 A、引擎 B）从一组开局局面出发对弈，
+统计 Elo 差（含 95% 置信区间）、平均每秒节点数和每步用时分布，
+用来判断对 AI 的改动是否让它更强或更快。
+
+开局局面由固定种子的随机走子生成，每个开局 A、B 各执先一次，
+抵消开局本身的优劣。每次运行结束后向结果日志（JSON Lines）追加一行，
+记录代码版本、配置和结果，便于比较不同版本的引擎。
+
+用法：
+    python -m games.search.tournament --game chess \\
+        --engine-a difficulty=3,time=200 --engine-b difficulty=2 --games 200
+    python -m games.search.tournament --game xiangqi --engine-a difficulty=3 --engine-b difficulty=2
+
+引擎配置为逗号分隔的 key=value：time 为每步思考时间（毫秒，只对有时间
+预算的 AI 有效），其余作为 AI 构造参数（如 difficulty、workers）。
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 棋种：(逻辑模块, 逻辑类, AI 模块, AI 类)
+GAMES = {
+    'chess': ('games.chess.logic', 'ChessLogic', 'games.chess.ai', 'ChessAI'),
+    'xiangqi': ('games.chinese_chess.logic', 'ChineseChessLogic',
+                'games.chinese_chess.ai', 'ChineseChessAI'),
+}
+
+DEFAULT_LOG = 'tournament.jsonl'
+# 超过这个半回合数仍未分出胜负的对局判和
+DEFAULT_MAX_PLIES = 300
+DEFAULT_OPENING_PLIES = 4
+# 估计得分方差时胜、和、负各加的虚拟局数
+VARIANCE_PRIOR = 0.5
+
+Spec = Dict[str, object]
+
+
+def parse_spec(text: str) -> Spec:
+    """解析引擎配置（如 'difficulty=3,time=200'）
+
+    Raises:
+        ValueError: 格式错误
+    """
+    spec: Spec = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        if '=' not in item:
+            raise ValueError(f"Invalid engine option: {item}")
+        key, value = (part.strip() for part in item.split('=', 1))
+        if value.lower() == 'none':
+            spec[key] = None
+        else:
+            try:
+                spec[key] = int(value)
+            except ValueError:
+                spec[key] = value
+    return spec
+
+
+def _load_classes(game_name: str):
+    logic_module, logic_class, ai_module, ai_class = GAMES[game_name]
+    return (getattr(importlib.import_module(logic_module), logic_class),
+            getattr(importlib.import_module(ai_module), ai_class))
+
+
+def _create_engine(ai_class, spec: Spec):
+    """按配置创建 AI；支持并行搜索的 AI 默认单进程（进程池的工作进程不能再创建子进程）"""
+    kwargs = {key: value for key, value in spec.items() if key != 'time'}
+    if 'workers' in inspect.signature(ai_class).parameters:
+        kwargs.setdefault('workers', 1)
+    return ai_class(**kwargs)
+
+
+def make_opening(logic_class, index: int, plies: int, seed: int):
+    """第 index 个开局：从初始局面随机走 plies 步（同一种子下结果固定）"""
+    rng = random.Random(seed * 1000003 + index)
+    while True:
+        game = logic_class()
+        for _ in range(plies):
+            moves = game.get_all_moves()
+            if not moves or game.is_game_over():
+                break
+            (from_row, from_col), (to_row, to_col) = rng.choice(moves)
+            game.make_move(from_row, from_col, to_row, to_col)
+        if not game.is_game_over():
+            return game
+
+
+def _play_game(task: Tuple) -> Dict:
+    """进程池任务：下一局，返回 A 的得分、步数和双方每步的用时与节点数"""
+    game_name, opening, a_first, spec_a, spec_b, opening_plies, seed, max_plies = task
+    logic_class, ai_class = _load_classes(game_name)
+    game = make_opening(logic_class, opening, opening_plies, seed)
+    engines = {'a': _create_engine(ai_class, spec_a), 'b': _create_engine(ai_class, spec_b)}
+    budgets = {'a': spec_a.get('time'), 'b': spec_b.get('time')}
+    first_player = game.current_player
+    times: Dict[str, List[float]] = {'a': [], 'b': []}
+    nodes = {'a': 0, 'b': 0}
+
+    plies = 0
+    while not game.is_game_over() and plies < max_plies:
+        side = 'a' if (game.current_player == first_player) == a_first else 'b'
+        engine = engines[side]
+        options = {}
+        if budgets[side] is not None and hasattr(engine, 'time_budget_ms'):
+            options['time_budget_ms'] = budgets[side]
+        start = time.perf_counter()
+        move = engine.get_best_move(game.clone(), **options)
+        times[side].append((time.perf_counter() - start) * 1000)
+        nodes[side] += getattr(engine, 'nodes', 0)
+        if move is None:
+            break
+        (from_row, from_col), (to_row, to_col) = move
+        game.make_move(from_row, from_col, to_row, to_col)
+        plies += 1
+
+    for engine in engines.values():
+        close = getattr(engine, 'close', None)
+        if close is not None:
+            close()
+
+    winner = game.get_winner()
+    if winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if (winner == first_player) == a_first else 0.0
+    return {'opening': opening, 'a_first': a_first, 'score': score, 'plies': plies,
+            'times': times, 'nodes': nodes}
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> Tuple[float, float]:
+    """A 相对 B 的 Elo 差及其 95% 置信区间的半宽
+
+    得分率 s 对应 Elo 差 -400 * log10(1 / s - 1)；误差由每局得分（1、0.5、0）
+    的标准误差换算而来。全胜或全负时 Elo 差为无穷大。
+
+    估计方差时胜、和、负各加 VARIANCE_PRIOR 局虚拟对局：否则全是和棋
+    （或样本很小）时方差为 0，得到不符合实际的 ±0 误差。
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / games
+
+    def to_elo(s: float) -> float:
+        if s <= 0:
+            return -math.inf
+        if s >= 1:
+            return math.inf
+        return 400 * math.log10(s / (1 - s))
+
+    if score in (0, 1):
+        return to_elo(score), math.inf
+    prior = VARIANCE_PRIOR
+    variance = ((wins + prior) * (1 - score) ** 2 + (draws + prior) * (0.5 - score) ** 2 +
+                (losses + prior) * score ** 2) / (games + 3 * prior)
+    margin = 1.96 * math.sqrt(variance / games)
+    elo = to_elo(score)
+    error = (to_elo(min(1.0, score + margin)) - to_elo(max(0.0, score - margin))) / 2
+    return elo, error
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """每步用时分布：平均值、中位数、90%/99% 分位数和最大值（毫秒）"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {'mean': round(sum(ordered) / len(ordered), 1), 'p50': round(at(0.5), 1),
+            'p90': round(at(0.9), 1), 'p99': round(at(0.99), 1), 'max': round(ordered[-1], 1)}
+
+
+def _revision() -> Optional[str]:
+    """当前代码的 git 版本（不在 git 仓库中时为 None）"""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        output = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=root,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def run_tournament(game_name: str, spec_a: Spec, spec_b: Spec, games: int, workers: int,
+                   opening_plies: int = DEFAULT_OPENING_PLIES, seed: int = 0,
+                   max_plies: int = DEFAULT_MAX_PLIES, progress=None) -> Dict:
+    """进行比赛，返回结果汇总（即写入日志的记录）"""
+    tasks = [(game_name, index // 2, index % 2 == 0, spec_a, spec_b, opening_plies, seed, max_plies)
+             for index in range(games)]
+    results = []
+    wins = draws = losses = 0
+    start = time.perf_counter()
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(workers) as pool:
+        for result in pool.imap_unordered(_play_game, tasks):
+            results.append(result)
+            if result['score'] == 1:
+                wins += 1
+            elif result['score'] == 0:
+                losses += 1
+            else:
+                draws += 1
+            if progress:
+                elo, error = elo_difference(wins, draws, losses)
+                progress(f"{len(results)}/{games}  +{wins} ={draws} -{losses}  "
+                         f"elo {elo:+.1f} +/- {error:.1f}")
+
+    elo, error = elo_difference(wins, draws, losses)
+    engines = {}
+    for side, spec in (('a', spec_a), ('b', spec_b)):
+        times = [t for result in results for t in result['times'][side]]
+        nodes = sum(result['nodes'][side] for result in results)
+        total_ms = sum(times)
+        engines[side] = {
+            'spec': spec,
+            'moves': len(times),
+            'nps': int(nodes / (total_ms / 1000)) if total_ms else 0,
+            'time_ms': percentiles(times),
+        }
+
+    results.sort(key=lambda result: (result['opening'], not result['a_first']))
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _revision(),
+        'game': game_name,
+        'games': len(results),
+        'seed': seed,
+        'opening_plies': opening_plies,
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+        # 全胜或全负时 Elo 差无法估计，记为 null
+        'elo': round(elo, 1) if math.isfinite(elo) else None,
+        'elo_error': round(error, 1) if math.isfinite(error) else None,
+        'engines': engines,
+        'seconds': round(time.perf_counter() - start, 1),
+        # 每局：[开局序号, A 是否先走, A 的结果（W/D/L）, 半回合数]
+        'results': [[result['opening'], int(result['a_first']),
+                     'W' if result['score'] == 1 else 'L' if result['score'] == 0 else 'D',
+                     result['plies']] for result in results],
+    }
+
+
+def format_summary(record: Dict) -> str:
+    elo, error = elo_difference(record['wins'], record['draws'], record['losses'])
+    lines = [f"{record['game']} @ {record['revision']}: {record['games']} games in {record['seconds']}s",
+             f"A vs B: +{record['wins']} ={record['draws']} -{record['losses']}  "
+             f"elo {elo:+.1f} +/- {error:.1f}"]
+    for side in ('a', 'b'):
+        engine = record['engines'][side]
+        spec = ','.join(f"{key}={value}" for key, value in engine['spec'].items())
+        times = ' '.join(f"{key} {value}" for key, value in engine['time_ms'].items())
+        lines.append(f"{side.upper()} [{spec}]: {engine['moves']} moves, {engine['nps']} nps, ms/move {times}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Engine self-play tournament")
+    parser.add_argument('--game', choices=sorted(GAMES), default='chess')
+    parser.add_argument('--engine-a', default='difficulty=3,time=200', help="engine A options")
+    parser.add_argument('--engine-b', default='difficulty=2', help="engine B options")
+    parser.add_argument('--games', type=int, default=100, help="number of games (rounded up to pairs)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--opening-plies', type=int, default=DEFAULT_OPENING_PLIES,
+                        help="random plies played to create each opening")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES,
+                        help="adjudicate a draw after this many plies")
+    parser.add_argument('--seed', type=int, default=0, help="opening seed")
+    parser.add_argument('--log', default=DEFAULT_LOG, help="JSON Lines result log ('' to disable)")
+    parser.add_argument('--quiet', action='store_true', help="no per-game progress")
+    args = parser.parse_args(argv)
+
+    try:
+        spec_a = parse_spec(args.engine_a)
+        spec_b = parse_spec(args.engine_b)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    games = max(2, args.games + args.games % 2)
+    record = run_tournament(args.game, spec_a, spec_b, games, max(1, args.workers),
+                            args.opening_plies, args.seed, args.max_plies,
+                            None if args.quiet else print)
+    print(format_summary(record))
+    if args.log:
+        with open(args.log, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
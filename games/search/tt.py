@@ -0,0 +1,83 @@
+"""置换表模块
+
+置换表以局面哈希为键，缓存已搜索局面的结果，避免通过不同走子顺序到达的
+同一局面被重复搜索。
+"""
+
+from typing import List, Optional, Tuple
+
+# 分数边界类型
+EXACT = 0  # 精确值
+LOWER = 1  # 下界（发生了 beta 截断）
+UPPER = 2  # 上界（所有走法都没有超过 alpha）
+
+# 表项：(key, depth, bound, score, move, generation)
+Entry = Tuple[int, int, int, int, object, int]
+
+
+class TranspositionTable:
+    """固定大小的置换表
+
+    表按两格一组（bucket）组织：
+    - 第一格为深度优先：只有更深的结果或上一轮搜索留下的旧结果才会被替换，
+      被替换的表项降级到第二格；
+    - 第二格总是替换，保证最近的结果也能被记住。
+    """
+
+    def __init__(self, size_bits: int = 18):
+        """
+        Args:
+            size_bits: 表大小为 2 ** size_bits 个表项
+        """
+        self.size = 1 << size_bits
+        self._mask = (self.size - 1) & ~1
+        self.table: List[Optional[Entry]] = [None] * self.size
+        self.generation = 0
+
+    def clear(self):
+        """清空置换表"""
+        self.table = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """开始新一轮搜索，使之前的表项变为可替换"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key: int) -> Optional[Entry]:
+        """查找局面，未命中返回 None"""
+        index = key & self._mask
+        entry = self.table[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.table[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move=None):
+        """保存搜索结果"""
+        table = self.table
+        index = key & self._mask
+        first = table[index]
+
+        if first is not None and first[0] == key:
+            # 同一局面：保留更深的结果，但没有最佳走法时沿用旧的
+            if depth < first[1] and first[5] == self.generation:
+                return
+            if move is None:
+                move = first[4]
+            table[index] = (key, depth, bound, score, move, self.generation)
+            return
+
+        if first is None or depth >= first[1] or first[5] != self.generation:
+            if first is not None:
+                table[index + 1] = first
+            table[index] = (key, depth, bound, score, move, self.generation)
+            return
+
+        table[index + 1] = (key, depth, bound, score, move, self.generation)
+
+    def get_move(self, key: int):
+        """获取局面记录的最佳走法"""
+        entry = self.probe(key)
+        return entry[4] if entry else None
@@ -0,0 +1,232 @@
+"""常驻 AI 工作进程
+
+AI 搜索是纯 Python 计算，放在 UI 进程的线程里会与 GTK 主循环争抢 GIL，
+导致思考期间动画卡顿。EngineWorker 在独立进程中常驻一个 AI 实例：
+- 局面以紧凑快照（logic.snapshot()）的形式传给工作进程；
+- AI 实例（包括置换表）在多次走棋之间保留；
+- 取消时递增共享的任务编号，工作进程中的搜索定期检查并尽快停止；
+- 结果由后台线程接收后交给回调，回调中的过期结果会被丢弃；
+- 后台思考（ponder）：AI 走完后猜测对手的应着，在猜到的局面上继续搜索。
+  对手确实这样走时直接沿用这次搜索（已经算完则立即返回结果），
+  否则取消它，新的搜索仍能用上已经预热的置换表。
+"""
+
+import atexit
+import multiprocessing
+import threading
+import time
+from typing import Callable, Optional
+
+# 后台思考的时间上限为 AI 每步时间预算的倍数：对手迟迟不走时也不会一直占用 CPU
+PONDER_BUDGET_FACTOR = 4
+
+# 后台思考的结果尚未返回
+_NO_RESULT = object()
+
+
+def _worker_main(conn, current_job, ponder_hit, engine_class, logic_class):
+    """工作进程主循环"""
+    engine = engine_class()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message[0] == 'quit':
+            break
+
+        command, job_id, snapshot, difficulty, options = message
+        if current_job.value != job_id:
+            continue  # 任务在开始前就已被取消
+
+        engine.difficulty = difficulty
+        engine.stop_check = lambda job_id=job_id: current_job.value != job_id
+        game = logic_class.from_snapshot(snapshot)
+        if command == 'ponder':
+            _ponder(conn, engine, game, job_id, current_job, ponder_hit, options)
+            continue
+        move = engine.get_best_move(game, **options)
+        conn.send(('result', job_id, move))
+
+    # AI 可能持有自己的进程池（并行搜索）
+    close = getattr(engine, 'close', None)
+    if close is not None:
+        close()
+
+
+def _ponder(conn, engine, game, job_id: int, current_job, ponder_hit, options: dict):
+    """后台思考：猜测对手的应着，在走完应着的局面上搜索
+
+    猜到的局面先发回 UI 进程，用于判断对手的实际走法是否命中。命中后
+    （ponder_hit 被设为本任务编号）按 AI 的时间预算计时，计时从后台思考
+    开始算起，对手思考的时间也算作 AI 的思考时间。
+    """
+    predict = getattr(engine, 'predict_move', None)
+    reply = predict(game) if predict is not None else engine.get_best_move(game)
+    if reply is None or current_job.value != job_id:
+        return
+    (from_row, from_col), (to_row, to_col) = reply
+    if not game.make_move(from_row, from_col, to_row, to_col) or game.is_game_over():
+        return
+    conn.send(('ponder', job_id, game.snapshot()))
+
+    # 没有时间预算的 AI（固定深度）搜索完即停止
+    budget = options.get('time_budget_ms', getattr(engine, 'time_budget_ms', None))
+    start = time.perf_counter()
+
+    def stop_check() -> bool:
+        if current_job.value != job_id:
+            return True
+        if budget is not None and ponder_hit.value == job_id:
+            return time.perf_counter() - start >= budget / 1000
+        return False
+
+    engine.stop_check = stop_check
+    if budget is not None:
+        options = dict(options, time_budget_ms=budget * PONDER_BUDGET_FACTOR)
+    move = engine.get_best_move(game, **options)
+    conn.send(('result', job_id, move))
+
+
+class EngineWorker:
+    """在独立进程中运行 AI 搜索"""
+
+    def __init__(self, engine_class, logic_class):
+        """
+        Args:
+            engine_class: AI 类（需提供 difficulty、stop_check 和 get_best_move）
+            logic_class: 逻辑类（需提供 from_snapshot）
+        """
+        self.engine_class = engine_class
+        self.logic_class = logic_class
+        # 使用 spawn 启动，避免在带有 GTK 线程的进程中 fork
+        self._ctx = multiprocessing.get_context('spawn')
+        self._current_job = self._ctx.Value('i', 0, lock=False)
+        # 后台思考命中时设为该任务的编号
+        self._ponder_hit = self._ctx.Value('i', 0, lock=False)
+        self._lock = threading.Lock()
+        self._pending: Optional[tuple] = None  # (job_id, callback)
+        # 当前后台思考：任务编号（0 表示没有）、难度、猜到的局面和已返回的结果
+        self._ponder_job = 0
+        self._ponder_difficulty = 0
+        self._ponder_snapshot = None
+        self._ponder_result = _NO_RESULT
+        self._process = None
+        self._conn = None
+        self._listener = None
+
+    def _ensure_started(self):
+        """按需启动工作进程"""
+        if self._process is not None and self._process.is_alive():
+            return
+        self._conn, child_conn = self._ctx.Pipe()
+        # 不设为守护进程：守护进程不能再创建子进程（AI 的并行搜索需要进程池），
+        # 改为在退出时显式关闭
+        self._process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._current_job, self._ponder_hit,
+                  self.engine_class, self.logic_class),
+        )
+        self._process.start()
+        atexit.register(self.close)
+        child_conn.close()
+        self._listener = threading.Thread(target=self._listen, args=(self._conn,), daemon=True)
+        self._listener.start()
+
+    def _listen(self, conn):
+        """后台线程：接收工作进程返回的结果"""
+        while True:
+            try:
+                kind, job_id, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if kind == 'ponder':
+                    if job_id == self._ponder_job:
+                        self._ponder_snapshot = payload
+                    continue
+                if self._pending is None or self._pending[0] != job_id:
+                    # 后台思考的结果先保存，等对手走棋时再判断是否命中
+                    if job_id == self._ponder_job:
+                        self._ponder_result = payload
+                    continue  # 已取消或过期的结果
+                callback = self._pending[1]
+                self._pending = None
+            callback(payload)
+
+    def search(self, snapshot, difficulty: int, callback: Callable, **options) -> int:
+        """提交搜索任务，返回任务编号
+
+        之前未完成的任务会被取消。callback(move) 在后台线程中调用，
+        UI 代码需要自行通过 GLib.idle_add 切换回主线程。
+        局面与后台思考猜到的局面相同时沿用后台思考的搜索。
+        """
+        self._ensure_started()
+        with self._lock:
+            if (self._ponder_job and self._ponder_job == self._current_job.value and
+                    self._ponder_snapshot == snapshot and self._ponder_difficulty == difficulty):
+                job_id = self._ponder_job
+                result = self._ponder_result
+                self._ponder_job = 0
+                if result is _NO_RESULT:
+                    # 搜索还在进行：转为正式搜索，结果照常回调
+                    self._pending = (job_id, callback)
+                    self._ponder_hit.value = job_id
+                    return job_id
+            else:
+                job_id = self._current_job.value + 1
+                self._current_job.value = job_id
+                self._pending = (job_id, callback)
+                self._ponder_job = 0
+                result = _NO_RESULT
+
+        if result is not _NO_RESULT:
+            callback(result)
+        else:
+            self._conn.send(('search', job_id, snapshot, difficulty, options))
+        return job_id
+
+    def ponder(self, snapshot, difficulty: int, **options) -> int:
+        """对手思考时在后台搜索，返回任务编号
+
+        snapshot 为轮到对手走棋的局面。之前未完成的任务会被取消；
+        之后的 search() 局面不命中时后台思考自动取消。
+        """
+        self._ensure_started()
+        with self._lock:
+            job_id = self._current_job.value + 1
+            self._current_job.value = job_id
+            self._pending = None
+            self._ponder_job = job_id
+            self._ponder_difficulty = difficulty
+            self._ponder_snapshot = None
+            self._ponder_result = _NO_RESULT
+        self._conn.send(('ponder', job_id, snapshot, difficulty, options))
+        return job_id
+
+    def cancel(self):
+        """取消正在进行的搜索和后台思考，其结果不会再回调"""
+        with self._lock:
+            self._current_job.value += 1
+            self._pending = None
+            self._ponder_job = 0
+
+    def is_busy(self) -> bool:
+        """是否有等待结果的任务"""
+        return self._pending is not None
+
+    def close(self):
+        """结束工作进程"""
+        self.cancel()
+        if self._process is None:
+            return
+        try:
+            self._conn.send(('quit',))
+        except (OSError, BrokenPipeError):
+            pass
+        self._process.join(timeout=1)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+        self._process = None
+        atexit.unregister(self.close)
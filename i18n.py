@@ -64,6 +64,8 @@ TRANSLATIONS = {
         "black_in_check": "黑方被将军！",
         "checkmate": "将死！",
         "stalemate": "和棋（逼和）",
+        "draw_repetition": "和棋（三次重复局面）",
+        "draw_fifty_moves": "和棋（五十步规则）",
 
         # 中国象棋
         "game_chinese_chess": "中国象棋",
@@ -76,6 +78,8 @@ TRANSLATIONS = {
         "xiangqi_black_in_check": "黑方被将军！",
         "xiangqi_checkmate": "将死！",
         "xiangqi_stalemate": "困毙（和棋）",
+        "xiangqi_perpetual_check": "长将判负",
+        "xiangqi_perpetual_chase": "长捉判负",
 
         # 三子棋
         "game_tic_tac_toe": "三子棋",
@@ -96,6 +100,7 @@ TRANSLATIONS = {
         "easy": "简单",
         "medium": "中等",
         "hard": "困难",
+        "expert": "专家",
         "ai_thinking": "AI思考中...",
         "undo": "悔棋",
         "no_undo": "无法悔棋",
@@ -160,6 +165,8 @@ TRANSLATIONS = {
         "black_in_check": "Black is in check!",
         "checkmate": "Checkmate!",
         "stalemate": "Stalemate (Draw)",
+        "draw_repetition": "Draw by threefold repetition",
+        "draw_fifty_moves": "Draw by fifty-move rule",
 
         # 中国象棋
         "game_chinese_chess": "Chinese Chess",
@@ -172,6 +179,8 @@ TRANSLATIONS = {
         "xiangqi_black_in_check": "Black is in check!",
         "xiangqi_checkmate": "Checkmate!",
         "xiangqi_stalemate": "Stalemate (Draw)",
+        "xiangqi_perpetual_check": "Perpetual check loses",
+        "xiangqi_perpetual_chase": "Perpetual chase loses",
 
         # 三子棋
         "game_tic_tac_toe": "Tic Tac Toe",
@@ -192,6 +201,7 @@ TRANSLATIONS = {
         "easy": "Easy",
         "medium": "Medium",
         "hard": "Hard",
+        "expert": "Expert",
         "ai_thinking": "AI thinking...",
         "undo": "Undo",
         "no_undo": "Cannot undo",